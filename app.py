@@ -1,83 +1,769 @@
-from flask import Flask, render_template, request, jsonify
+from flask import (
+    Blueprint, Flask, Response, current_app, g, render_template, request, jsonify,
+    stream_with_context, url_for
+)
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
+from bson import ObjectId
+from backends import LazyBackend
 from mysql_db import MySQLDatabase
+from mysql_replicas import read_from_primary
 from mongodb_db import MongoDBDatabase
+from result_cache import ResultCache
+from serialization import CardJSONProvider
+from sync import sync_status
+from card_schema import CARD_FIELDS, LIST_FIELDS, parse_fields, validate_card, validate_changes
+from export import EXPORT_FORMATS, export_chunks, ndjson_chunks
+from importer import IMPORT_FORMATS, BulkImporter, format_for, read_records
+from write_queue import WRITE_QUEUE_MODES, WriteQueue, WriteQueueFull, WriteQueueUnavailable
+from price_history import history_result, parse_price_query
+from columnar_index import ColumnarIndex, collation_key
+from compression import (
+    PrecompressedCache, compress_response, encode, negotiate, set_encoded_body
+)
+from metrics import (
+    RequestMetrics, phase, record_phase, request_phases, server_timing, start_request
+)
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from datetime import timezone
+import base64
+import contextvars
+import gzip
+import io
+import itertools
+import config
+import hashlib
 import json
+import os
+import time
+import weakref
 
-app = Flask(__name__)
-CORS(app)
+# Key of the per-app Services in app.extensions
+SERVICES_KEY = 'graphics_cards'
 
-# Initialize database connections
-mysql_db = MySQLDatabase()
-mongodb_db = MongoDBDatabase()
+class Services:
+    """Per-process state behind one app: database backends, caches, metrics
+    and the compare executor. Rebuilt in forked children (see _after_fork), so
+    worker processes never share sockets, threads or locks with their parent.
+    """
+    
+    def __init__(self, settings):
+        self.settings = settings
+        self._build()
+    
+    def _build(self):
+        settings = self.settings
+        # Database backends, connected on first use rather than at import time
+        self.mysql_db = LazyBackend(lambda: MySQLDatabase(settings=settings))
+        self.mongodb_db = LazyBackend(lambda: MongoDBDatabase(settings=settings))
+        # Listing results keyed by backend, normalized filters and page
+        self.result_cache = ResultCache(
+            max_entries=settings['RESULT_CACHE_MAX_ENTRIES'],
+            max_bytes=settings['RESULT_CACHE_MAX_BYTES'],
+            ttl=settings['RESULT_CACHE_TTL']
+        )
+        # Request counts and latency histograms served at /metrics
+        self.request_metrics = RequestMetrics()
+        # Finished response bodies of unfiltered listings, keyed by ETag and encoding
+        self.precompressed_cache = PrecompressedCache(max_entries=settings['PRECOMPRESSED_CACHE_ENTRIES'],
+                                                      ttl=settings['PRECOMPRESSED_CACHE_TTL'])
+        # Runs the per-backend queries of /api/compare/cards side by side
+        self.compare_executor = ThreadPoolExecutor(
+            max_workers=settings['COMPARE_MAX_WORKERS'], thread_name_prefix='compare'
+        )
+        # Group commit of single-card creates, when WRITE_QUEUE_MODE is not 'off'
+        mode = settings['WRITE_QUEUE_MODE']
+        if mode not in WRITE_QUEUE_MODES:
+            raise ValueError(f"Unknown WRITE_QUEUE_MODE '{mode}' (use {', '.join(WRITE_QUEUE_MODES)})")
+        self.write_queues = {} if mode == 'off' else {
+            name: WriteQueue(
+                name, backend,
+                max_batch=settings['WRITE_QUEUE_MAX_BATCH'],
+                max_delay=settings['WRITE_QUEUE_MAX_DELAY_MS'] / 1000,
+                max_pending=settings['WRITE_QUEUE_MAX_PENDING'],
+                status_entries=settings['WRITE_QUEUE_STATUS_ENTRIES'],
+                data_errors=backend_class.DATA_ERRORS
+            ) for name, backend, backend_class in (('mysql', self.mysql_db, MySQLDatabase),
+                                                   ('mongodb', self.mongodb_db, MongoDBDatabase))
+        }
+        # Filter columns held in memory for filtered listings, when enabled
+        self.columnar_indexes = {} if not settings['COLUMNAR_INDEX_ENABLED'] else {
+            name: ColumnarIndex(
+                name, backend, integer_ids=name == 'mysql', fold=collation_key if name == 'mysql' else None,
+                refresh_interval=settings['COLUMNAR_INDEX_REFRESH_INTERVAL'],
+                reload_interval=settings['COLUMNAR_INDEX_RELOAD_INTERVAL']
+            ) for name, backend in (('mysql', self.mysql_db), ('mongodb', self.mongodb_db))
+        }
+    
+    def after_fork(self):
+        """Start the child with fresh state. Backends the parent already created
+        are dropped without closing them: their sockets are still the parent's.
+        """
+        self._build()
+    
+    def close(self):
+        """Finish running compare queries, write queued cards, stop the columnar
+        index pollers and close the connection pools
+        """
+        self.compare_executor.shutdown(wait=True, cancel_futures=True)
+        for write_queue in self.write_queues.values():
+            write_queue.close()
+        for index in self.columnar_indexes.values():
+            index.close()
+        self.mysql_db.close()
+        self.mongodb_db.close()
 
-@app.route('/')
+# Services of every app created in this process, rebuilt after a fork
+_all_services = weakref.WeakSet()
+
+def _after_fork():
+    for services in list(_all_services):
+        services.after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+def _services():
+    return current_app.extensions[SERVICES_KEY]
+
+# The current app's services, for use inside requests
+mysql_db = LocalProxy(lambda: _services().mysql_db)
+mongodb_db = LocalProxy(lambda: _services().mongodb_db)
+result_cache = LocalProxy(lambda: _services().result_cache)
+request_metrics = LocalProxy(lambda: _services().request_metrics)
+precompressed_cache = LocalProxy(lambda: _services().precompressed_cache)
+compare_executor = LocalProxy(lambda: _services().compare_executor)
+
+api = Blueprint('api', __name__)
+
+# config.py values read once per process by the modules that use them (batch
+# sizes, search, compression, import, sync and server settings); an app cannot
+# override them, so create_app refuses to
+PROCESS_SETTINGS = (
+    'BULK_BATCH_SIZE', 'STREAM_BATCH_SIZE', 'IMPORT_BATCH_SIZE', 'IMPORT_MAX_PENDING_BATCHES',
+    'IMPORT_MAX_REPORTED_ERRORS', 'PRICE_HISTORY_PARTITIONS_AHEAD', 'PRICE_HISTORY_RETENTION_MONTHS',
+    'SEARCH_MIN_TOKEN_LENGTH', 'COMPRESSION_MIN_SIZE', 'COMPRESSION_GZIP_LEVEL',
+    'COMPRESSION_BROTLI_LEVEL', 'COMPRESSION_ZSTD_LEVEL', 'SYNC_BATCH_SIZE', 'SYNC_INTERVAL',
+    'SYNC_OVERLAP_SECONDS', 'SYNC_TOMBSTONE_RETENTION_DAYS', 'WEB_BIND', 'WEB_WORKERS',
+    'WEB_THREADS', 'WEB_TIMEOUT', 'WEB_GRACEFUL_TIMEOUT',
+)
+
+def create_app(settings=None):
+    """Build the Flask app with its own backends, caches and metrics.
+    settings: overrides for values from config.py (e.g. {'MYSQL_HOST': ...,
+    'RESULT_CACHE_TTL': 0}); backends still connect lazily, on first use.
+    Raises ValueError for PROCESS_SETTINGS, which only the environment sets.
+    """
+    fixed = sorted(name for name in (settings or {})
+                   if name in PROCESS_SETTINGS and settings[name] != getattr(config, name))
+    if fixed:
+        raise ValueError(f"{', '.join(fixed)} cannot be set per app; set them in the environment")
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config.from_mapping(settings or {})
+    app.json = CardJSONProvider(app)
+    CORS(app)
+    services = Services(app.config)
+    app.extensions[SERVICES_KEY] = services
+    _all_services.add(services)
+    app.register_blueprint(api)
+    return app
+
+def close_app(app):
+    """Release an app's pools and threads (on worker exit)"""
+    app.extensions[SERVICES_KEY].close()
+
+# Cookie holding when a client last wrote to MySQL; its reads go to the
+# primary for MYSQL_REPLICA_STICKY_SECONDS afterwards, whichever process serves them
+WROTE_COOKIE = 'mysql_wrote_at'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+@api.before_app_request
+def _start_timing():
+    g.request_start = time.perf_counter()
+    start_request()
+
+@api.before_app_request
+def _route_reads():
+    """Read-your-writes: send a client's reads to the MySQL primary right after it wrote"""
+    try:
+        wrote_at = float(request.cookies.get(WROTE_COOKIE, 0))
+    except ValueError:
+        wrote_at = 0
+    read_from_primary(time.time() - wrote_at < current_app.config['MYSQL_REPLICA_STICKY_SECONDS'])
+
+def _replica_settling(version):
+    """Whether this request's MySQL reads may come from a replica behind
+    `version` (the one its ETag was built from): one that has not caught up
+    with this process's latest write, or that served another version. Such
+    results are not cached.
+    """
+    return bool(mysql_db.initialized and mysql_db.replicas
+                and (mysql_db.replicas.settling() or mysql_db.replica_behind(version)))
+
+@api.after_app_request
+def _remember_write(response):
+    if (request.path.startswith('/api/mysql/') and request.method in WRITE_METHODS
+            and response.status_code < 400 and mysql_db.initialized and mysql_db.replicas):
+        sticky_seconds = current_app.config['MYSQL_REPLICA_STICKY_SECONDS']
+        response.set_cookie(WROTE_COOKIE, f"{time.time():.3f}", max_age=int(sticky_seconds) + 1,
+                            httponly=True, samesite='Lax')
+    return response
+
+@api.after_app_request
+def _record_timing(response):
+    """Add a Server-Timing header and record the request in request_metrics.
+    For streamed responses this covers the time to the first chunk.
+    """
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    total = time.perf_counter() - start
+    phases = request_phases()
+    response.headers['Server-Timing'] = server_timing(phases, total)
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if route.startswith('/api/mysql/'):
+        backend = 'mysql'
+    elif route.startswith('/api/mongodb/'):
+        backend = 'mongodb'
+    elif route.startswith('/api/compare/'):
+        backend = 'both'
+    else:
+        backend = 'none'
+    request_metrics.observe(route, backend, request.method, response.status_code, total, phases)
+    return response
+
+@api.after_app_request
+def _compress(response):
+    """Compress response bodies for clients that accept it"""
+    with phase('compress'):
+        return compress_response(response, request.accept_encodings)
+
+@api.route('/')
 def index():
     """Serve the dashboard page"""
     return render_template('dashboard.html')
 
-def _parse_filters():
-    """Parse search/filter query params from request."""
+# Query parameters _parse_filters reads, with the type of each value
+FILTER_PARAMS = {'search': str, 'manufacturer': str, 'memory_type': str,
+                 'memory_min': int, 'memory_max': int, 'price_min': float, 'price_max': float}
+
+def _parse_filters(strict=False):
+    """Parse search/filter query params from request.
+    Listings skip values that do not parse; with strict=True (bulk changes)
+    they raise ValueError instead, so a typo never widens what is matched.
+    """
     filters = {}
-    if request.args.get('search'):
-        filters['search'] = request.args.get('search').strip()
-    if request.args.get('manufacturer'):
-        filters['manufacturer'] = request.args.get('manufacturer').strip()
-    if request.args.get('memory_type'):
-        filters['memory_type'] = request.args.get('memory_type').strip()
-    try:
-        if request.args.get('memory_min') not in (None, ''):
-            filters['memory_min'] = int(request.args.get('memory_min'))
-    except (TypeError, ValueError):
-        pass
+    for name, kind in FILTER_PARAMS.items():
+        value = request.args.get(name)
+        if value is None or value.strip() == '':
+            continue
+        try:
+            filters[name] = value.strip() if kind is str else kind(value)
+        except (TypeError, ValueError):
+            if strict:
+                raise ValueError(f"{name} must be {'an integer' if kind is int else 'a number'}") from None
+    return filters if filters else None
+
+def _parse_fields():
+    """Parse the ?fields= projection; listings default to LIST_FIELDS.
+    Raises ValueError for fields outside the graphics_cards schema.
+    """
+    if 'fields' not in request.args:
+        return LIST_FIELDS
+    return parse_fields(request.args.get('fields'))
+
+def _encode_cursor(last_card):
+    """Encode the position of the last card on a page as an opaque cursor.
+    Relevance-ordered (full-text) pages also record the card's relevance.
+    """
+    position = {'id': last_card['id']}
+    if last_card.get('relevance') is not None:
+        position['relevance'] = float(last_card['relevance'])
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    """Decode a cursor produced by _encode_cursor; raises ValueError if malformed"""
     try:
-        if request.args.get('memory_max') not in (None, ''):
-            filters['memory_max'] = int(request.args.get('memory_max'))
-    except (TypeError, ValueError):
-        pass
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        return position['id'], position.get('relevance')
+    except (TypeError, KeyError, AttributeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def _parse_page(id_type):
+    """Parse limit/cursor query params into (limit, after_id, after_relevance).
+    id_type: 'int' for MySQL ids, 'objectid' for MongoDB ids
+    Raises ValueError for a malformed cursor.
+    """
+    default_size = current_app.config['API_DEFAULT_PAGE_SIZE']
     try:
-        if request.args.get('price_min') not in (None, ''):
-            filters['price_min'] = float(request.args.get('price_min'))
+        limit = int(request.args.get('limit', default_size))
     except (TypeError, ValueError):
-        pass
+        limit = default_size
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+    after_id = None
+    after_relevance = None
+    if request.args.get('cursor'):
+        after_id, after_relevance = _decode_cursor(request.args.get('cursor'))
+        if id_type == 'int' and (isinstance(after_id, bool) or not isinstance(after_id, int)):
+            raise ValueError('Invalid cursor')
+        if id_type == 'objectid' and not (isinstance(after_id, str) and ObjectId.is_valid(after_id)):
+            raise ValueError('Invalid cursor')
+        if after_relevance is not None and (isinstance(after_relevance, bool)
+                                            or not isinstance(after_relevance, (int, float))):
+            raise ValueError('Invalid cursor')
+    return limit, after_id, after_relevance
+
+def _parse_bulk_cards():
+    """Extract the list of cards from a bulk request body.
+    Accepts a JSON array or an object with a 'cards' array; returns None otherwise.
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('cards')
+    return data if isinstance(data, list) else None
+
+def _bulk_response(results):
+    """Build the JSON envelope for a bulk create"""
+    failed = sum(1 for result in results if 'error' in result)
+    return jsonify({
+        'success': True,
+        'inserted': len(results) - failed,
+        'failed': failed,
+        'results': results
+    })
+
+# Query parameters of a filter-based PATCH/DELETE besides the filters
+BULK_CHANGE_PARAMS = ('dry_run', 'max_rows', 'all')
+
+def _parse_bulk_change(with_changes):
+    """Parse a filter-based PATCH/DELETE into (filters, changes, max_rows, dry_run).
+    Filters come from the query string like listings, but unknown parameters
+    and unparseable values are rejected; the body may carry '$set', 'dry_run',
+    'max_rows' and 'all' (the last three also as query params). Matching every
+    card needs an explicit all=1. Raises ValueError for an invalid request.
+    """
+    unknown = sorted(set(request.args) - set(FILTER_PARAMS) - set(BULK_CHANGE_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown parameter(s): {', '.join(unknown)}")
+    filters = _parse_filters(strict=True)
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        raise ValueError('Expected a JSON object')
+    every = body.get('all', request.args.get('all', ''))
+    if not filters and not (every is True or str(every).lower() in ('1', 'true', 'yes')):
+        raise ValueError('At least one filter is required (pass all=1 to change every card)')
+    changes = None
+    if with_changes:
+        changes = body.get('$set')
+        error = validate_changes(changes)
+        if error:
+            raise ValueError(error)
+        changes = {field: (None if value == '' else value) for field, value in changes.items()}
+    dry_run = body.get('dry_run', request.args.get('dry_run', ''))
+    dry_run = dry_run is True or str(dry_run).lower() in ('1', 'true', 'yes')
+    max_affected = current_app.config['BULK_MAX_AFFECTED_ROWS']
     try:
-        if request.args.get('price_max') not in (None, ''):
-            filters['price_max'] = float(request.args.get('price_max'))
+        max_rows = int(body.get('max_rows', request.args.get('max_rows', max_affected)))
     except (TypeError, ValueError):
-        pass
-    return filters if filters else None
+        raise ValueError('max_rows must be an integer')
+    max_rows = max(0, min(max_rows, max_affected))
+    return filters, changes, max_rows, dry_run
+
+def _bulk_change_response(result, max_rows, dry_run, verb):
+    """Build the JSON envelope for a filter-based PATCH/DELETE"""
+    if not dry_run and not result['applied']:
+        return jsonify({
+            'success': False,
+            'error': f"{result['matched']} cards match, more than max_rows ({max_rows}); nothing was {verb}",
+            'matched': result['matched']
+        }), 409
+    return jsonify({
+        'success': True,
+        'dry_run': dry_run,
+        'matched': result['matched'],
+        verb: result['affected']
+    })
+
+def _next_cursor(cards, limit):
+    """Trim a limit + 1 row fetch to one page and build the next cursor"""
+    if len(cards) > limit:
+        del cards[limit:]
+        return _encode_cursor(cards[-1])
+    return None
+
+def _etag(backend, version, *key):
+    """ETag for a response built from `version` of a backend's data.
+    key: everything else the response depends on (filters, page, fields, format)
+    """
+    raw = json.dumps([backend, version, ResultCache.make_key(*key)], default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def _not_modified(etag):
+    """304 response if the client already holds `etag`, else None"""
+    if request.if_none_match.contains_weak(etag):
+        return _cache_headers(Response(status=304), etag)
+    return None
+
+def _cache_headers(response, etag):
+    """Attach the ETag and Cache-Control hints to a listing response"""
+    response.set_etag(etag, weak=True)
+    max_age = current_app.config['HTTP_CACHE_MAX_AGE']
+    if max_age > 0:
+        response.headers['Cache-Control'] = f'private, max-age={max_age}'
+    else:
+        # Cache, but revalidate with If-None-Match on every use
+        response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept')
+    return response
+
+def _encoded_json(body, content_encoding):
+    """JSON response around an already serialized (and maybe compressed) body"""
+    response = Response(mimetype='application/json')
+    set_encoded_body(response, body, content_encoding)
+    return response
+
+def _wants_stream():
+    """Whether the client asked for a streamed NDJSON listing
+    (?stream=1 or Accept: application/x-ndjson)"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+def _ndjson_response(rows):
+    """Stream rows as newline-delimited JSON, one card per line.
+    The first row is fetched eagerly so connection and query errors still
+    produce an error response instead of a truncated 200.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    chunks = ndjson_chunks(itertools.chain([first], rows)) if first is not None else iter(())
+    return Response(stream_with_context(chunks), mimetype='application/x-ndjson')
+
+def _export_response(backend, db):
+    """Stream every card matching the filters as a CSV or NDJSON download.
+    ?format=csv|ndjson (default csv), ?fields= (default every column), ?limit=,
+    ?gzip=1 for a .gz file; otherwise clients accepting gzip get the stream
+    gzipped as Content-Encoding. Rows come from iter_all's server-side
+    cursor, so memory use does not grow with the size of the export.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False,
+                        'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        fields = parse_fields(request.args['fields']) if 'fields' in request.args else CARD_FIELDS
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+        if limit is not None and limit < 1:
+            raise ValueError('limit must be positive')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    gzip_file = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    gzip_encoding = not gzip_file and request.accept_encodings['gzip'] > 0
+    
+    rows = db.iter_all(filters=_parse_filters(), limit=limit, fields=fields)
+    # Fetch the first row now so connection and query errors still produce
+    # an error response instead of a truncated 200
+    first = next(rows, None)
+    
+    def matching():
+        if first is not None:
+            yield first
+            yield from rows
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"graphics_cards-{backend}-{time.strftime('%Y%m%d-%H%M%S')}.{extension}"
+    if gzip_file:
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    chunks = export_chunks(matching(), export_format, fields, gzip=gzip_file or gzip_encoding)
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if gzip_encoding:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Content-Types of a gzip-compressed upload
+GZIP_TYPES = ('application/gzip', 'application/x-gzip')
+
+def _import_response(backend, db):
+    """Import a CSV or NDJSON upload into one backend, streaming it in batches.
+    The file is the raw request body (Content-Type text/csv or
+    application/x-ndjson, or ?format=) or a multipart 'file' field.
+    ?skip=N skips the first N records: after a failed upload, resend the file
+    with the 'position' of the previous report to resume.
+    Gzip-compressed uploads (a .gz file name, a gzip Content-Type or a raw body
+    with Content-Encoding: gzip) are decompressed as they are read.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        import_format = request.args.get('format') or format_for(upload.filename, upload.mimetype)
+        raw = upload.stream
+        compressed = (upload.filename or '').lower().endswith('.gz') or upload.mimetype in GZIP_TYPES
+    else:
+        import_format = request.args.get('format') or format_for(None, request.mimetype)
+        raw = request.stream
+        encoding = (request.headers.get('Content-Encoding') or 'identity').strip().lower()
+        if encoding not in ('identity', 'gzip', 'x-gzip'):
+            return jsonify({'success': False,
+                            'error': f"Unsupported Content-Encoding '{encoding}' (use gzip)"}), 415
+        compressed = encoding != 'identity' or request.mimetype in GZIP_TYPES
+    if compressed:
+        raw = gzip.GzipFile(fileobj=raw, mode='rb')
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'success': False,
+                        'error': f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
+    try:
+        skip = int(request.args.get('skip', 0))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'skip must be an integer'}), 400
+    
+    # The writer threads run outside the app context: hand them the backend itself
+    importer = BulkImporter({backend: db._get_current_object()}, skip=skip)
+    stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    report = importer.run(read_records(stream, import_format))
+    if 'error' in report:
+        return jsonify({'success': False, 'error': report.pop('error'), 'data': report}), 500
+    return jsonify({'success': True, 'data': report})
 
 # MySQL Routes
-@app.route('/api/mysql/cards', methods=['GET'])
+
+def _create_response(backend, db):
+    """Create one card, directly or through the backend's write queue.
+    Queued creates answer with the card's id once its batch is committed, or
+    with 202 and a status URL in WRITE_QUEUE_MODE=async.
+    """
+    data = request.json
+    write_queue = _services().write_queues.get(backend)
+    if write_queue is None:
+        card_id = db.create(data)
+        return jsonify({'success': True, 'id': card_id, 'message': 'Card created successfully'})
+    # Checked here so a bad card fails its own request rather than a batch
+    error = validate_card(data)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    try:
+        if current_app.config['WRITE_QUEUE_MODE'] == 'async':
+            ticket = write_queue.submit_tracked(data)
+            status_url = url_for(f'api.{backend}_write_status', ticket=ticket)
+            response = jsonify({'success': True, 'ticket': ticket, 'status_url': status_url,
+                                'message': 'Card queued'})
+            response.status_code = 202
+            response.headers['Location'] = status_url
+            return response
+        queued_at = time.perf_counter()
+        future = write_queue.submit(data)
+        timeout = current_app.config['WRITE_QUEUE_WAIT_TIMEOUT']
+        try:
+            card_id = future.result(timeout=timeout)
+        except FutureTimeout:
+            raise WriteQueueUnavailable(f"{backend} write not confirmed within {timeout:g}s; "
+                                        "the card may still be created") from None
+        finally:
+            record_phase('queue', time.perf_counter() - queued_at)
+    except (WriteQueueFull, WriteQueueUnavailable) as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    return jsonify({'success': True, 'id': card_id, 'message': 'Card created successfully'})
+
+def _prices_response(db, card_id):
+    """Price history of one card over ?from=&to=, as raw snapshots or rollups (?bucket=)"""
+    try:
+        start, end, bucket = parse_price_query(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if db.read_one(card_id, ('id',)) is None:
+        return jsonify({'success': False, 'error': 'Card not found'}), 404
+    max_points = current_app.config['PRICE_HISTORY_MAX_POINTS']
+    start_price, rows = db.read_prices(card_id, start, end, bucket, max_points)
+    data = {'id': card_id, 'from': start, 'to': end, 'bucket': bucket}
+    data.update(history_result(start_price, rows, bucket, max_points))
+    return jsonify({'success': True, 'data': data})
+
+def _write_status_response(backend, ticket):
+    """Outcome of a create accepted with 202 (kept by the worker that accepted it)"""
+    write_queue = _services().write_queues.get(backend)
+    status = write_queue.status(ticket) if write_queue is not None else None
+    if status is None:
+        return jsonify({'success': False, 'error': 'Unknown ticket'}), 404
+    return jsonify({'success': True, 'data': status})
+
+def _read_cards(backend, db, filters, limit, after_id, after_relevance, fields):
+    """A listing page: ids from the columnar index when it can answer the
+    filters, otherwise from the database's own query
+    """
+    index = _services().columnar_indexes.get(backend)
+    if index is not None and after_relevance is None:
+        cards = index.read_all(filters, limit, after_id=after_id, fields=fields)
+        if cards is not None:
+            return cards
+    return db.read_all(filters=filters, limit=limit, after_id=after_id,
+                       after_relevance=after_relevance, fields=fields)
+
+@api.route('/api/mysql/cards', methods=['GET'])
 def mysql_get_all():
     """Get graphics cards from MySQL with optional search/filters"""
     try:
         filters = _parse_filters()
-        cards = mysql_db.read_all(filters=filters)
-        for card in cards:
-            if 'price_usd' in card and card['price_usd'] is not None:
-                card['price_usd'] = float(card['price_usd'])
-            if 'release_date' in card and card['release_date']:
-                card['release_date'] = str(card['release_date'])
-            if 'created_at' in card and card['created_at']:
-                card['created_at'] = str(card['created_at'])
-            if 'updated_at' in card and card['updated_at']:
-                card['updated_at'] = str(card['updated_at'])
-        return jsonify({'success': True, 'data': cards})
+        try:
+            limit, after_id, after_relevance = _parse_page('int')
+            fields = _parse_fields()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        stream = _wants_stream()
+        version = mysql_db.version()
+        etag = _etag('mysql', version, filters, limit, after_id, after_relevance,
+                     fields, stream, 'limit' in request.args)
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        if stream:
+            # Streams return every match unless a limit is given explicitly
+            stream_limit = limit if 'limit' in request.args else None
+            rows = mysql_db.iter_all(filters=filters, limit=stream_limit,
+                                     after_id=after_id, after_relevance=after_relevance,
+                                     fields=fields)
+            return _cache_headers(_ndjson_response(rows), etag)
+        # Unfiltered listings are what every dashboard load asks for: keep the
+        # finished body so repeats skip serialization and compression
+        precompress = filters is None
+        encoding = negotiate(request.accept_encodings)
+        if precompress:
+            cached = precompressed_cache.get(etag, encoding)
+            if cached is not None:
+                return _cache_headers(_encoded_json(*cached), etag)
+        # Keyed by the version the ETag was built from, so writes by other
+        # processes never leave an old page behind a new ETag
+        cache_key = ResultCache.make_key(filters, limit, after_id, after_relevance, fields, version)
+        generation = mysql_db.generation
+        page = result_cache.get('mysql', generation, cache_key)
+        fresh = page is None
+        if fresh:
+            cards = _read_cards('mysql', mysql_db, filters, limit + 1, after_id, after_relevance, fields)
+            with phase('convert'):
+                next_cursor = _next_cursor(cards, limit)
+            page = {'data': cards, 'next_cursor': next_cursor}
+        with phase('serialize'):
+            response = jsonify({'success': True, 'data': page['data'], 'next_cursor': page['next_cursor']})
+        # Sized by the body just serialized, rather than serializing it again
+        if fresh and not _replica_settling(version):
+            result_cache.put('mysql', generation, cache_key, page, len(response.get_data()))
+        if precompress:
+            with phase('compress'):
+                body, content_encoding = encode(response.get_data(), encoding)
+            # Only a body built for exactly this ETag's version may be reused under it
+            if mysql_db.version() == version and not _replica_settling(version):
+                precompressed_cache.put(etag, encoding, body, content_encoding)
+            set_encoded_body(response, body, content_encoding)
+        return _cache_headers(response, etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mysql/cards/facets', methods=['GET'])
+def mysql_facets():
+    """Get grouped counts and price statistics from MySQL for the current filters"""
+    try:
+        filters = _parse_filters()
+        version = mysql_db.version()
+        etag = _etag('mysql', version, filters, 'facets')
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        cache_key = ResultCache.make_key(filters, 'facets', version)
+        generation = mysql_db.generation
+        facets = result_cache.get('mysql', generation, cache_key)
+        fresh = facets is None
+        if fresh:
+            facets = mysql_db.facets(filters=filters)
+        response = jsonify({'success': True, 'data': facets})
+        if fresh and not _replica_settling(version):
+            result_cache.put('mysql', generation, cache_key, facets, len(response.get_data()))
+        return _cache_headers(response, etag)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/mysql/cards', methods=['POST'])
+@api.route('/api/mysql/cards/export', methods=['GET'])
+def mysql_export():
+    """Stream MySQL cards matching the filters as CSV or NDJSON"""
+    try:
+        return _export_response('mysql', mysql_db)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mysql/cards', methods=['POST'])
 def mysql_create():
     """Create a new graphics card in MySQL"""
     try:
-        data = request.json
-        card_id = mysql_db.create(data)
-        return jsonify({'success': True, 'id': card_id, 'message': 'Card created successfully'})
+        return _create_response('mysql', mysql_db)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mysql/writes/<ticket>', methods=['GET'])
+def mysql_write_status(ticket):
+    """Status of a MySQL create accepted with 202"""
+    return _write_status_response('mysql', ticket)
+
+@api.route('/api/mysql/cards', methods=['PATCH'])
+def mysql_update_matching():
+    """Update every MySQL card matching the filters with one statement"""
+    try:
+        try:
+            filters, changes, max_rows, dry_run = _parse_bulk_change(with_changes=True)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        result = mysql_db.update_where(filters, changes, max_rows, dry_run=dry_run)
+        return _bulk_change_response(result, max_rows, dry_run, 'modified')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mysql/cards', methods=['DELETE'])
+def mysql_delete_matching():
+    """Delete every MySQL card matching the filters with one statement"""
+    try:
+        try:
+            filters, _, max_rows, dry_run = _parse_bulk_change(with_changes=False)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        result = mysql_db.delete_where(filters, max_rows, dry_run=dry_run)
+        return _bulk_change_response(result, max_rows, dry_run, 'deleted')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mysql/cards/import', methods=['POST'])
+def mysql_import():
+    """Import a CSV/NDJSON upload into MySQL in batches"""
+    try:
+        return _import_response('mysql', mysql_db)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mysql/cards/bulk', methods=['POST'])
+def mysql_create_bulk():
+    """Create many graphics cards in MySQL with batched inserts"""
+    try:
+        cards = _parse_bulk_cards()
+        if cards is None:
+            return jsonify({'success': False, 'error': 'Expected a JSON array of cards'}), 400
+        results = mysql_db.create_many(cards)
+        return _bulk_response(results)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/mysql/cards/<int:card_id>', methods=['PUT'])
+@api.route('/api/mysql/cards/<int:card_id>/prices', methods=['GET'])
+def mysql_prices(card_id):
+    """Price history of a MySQL card"""
+    try:
+        return _prices_response(mysql_db, card_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mysql/cards/<int:card_id>', methods=['PUT'])
 def mysql_update(card_id):
     """Update a graphics card in MySQL"""
     try:
@@ -90,7 +776,7 @@ def mysql_update(card_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/mysql/cards/<int:card_id>', methods=['DELETE'])
+@api.route('/api/mysql/cards/<int:card_id>', methods=['DELETE'])
 def mysql_delete(card_id):
     """Delete a graphics card from MySQL"""
     try:
@@ -102,28 +788,176 @@ def mysql_delete(card_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@api.route('/api/mysql/pool', methods=['GET'])
+def mysql_pool_stats():
+    """Get MySQL connection pool statistics"""
+    data = mysql_db.pool_stats()
+    replicas = mysql_db.replica_stats()
+    if replicas:
+        data = dict(data, replicas=replicas)
+    return jsonify({'success': True, 'data': data})
+
 # MongoDB Routes
-@app.route('/api/mongodb/cards', methods=['GET'])
+@api.route('/api/mongodb/cards', methods=['GET'])
 def mongodb_get_all():
     """Get graphics cards from MongoDB with optional search/filters"""
     try:
         filters = _parse_filters()
-        cards = mongodb_db.read_all(filters=filters)
-        return jsonify({'success': True, 'data': cards})
+        try:
+            limit, after_id, after_relevance = _parse_page('objectid')
+            fields = _parse_fields()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        stream = _wants_stream()
+        version = mongodb_db.version()
+        etag = _etag('mongodb', version, filters, limit, after_id, after_relevance,
+                     fields, stream, 'limit' in request.args)
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        if stream:
+            # Streams return every match unless a limit is given explicitly
+            stream_limit = limit if 'limit' in request.args else None
+            rows = mongodb_db.iter_all(filters=filters, limit=stream_limit,
+                                       after_id=after_id, after_relevance=after_relevance,
+                                       fields=fields)
+            return _cache_headers(_ndjson_response(rows), etag)
+        # Unfiltered listings are what every dashboard load asks for: keep the
+        # finished body so repeats skip serialization and compression
+        precompress = filters is None
+        encoding = negotiate(request.accept_encodings)
+        if precompress:
+            cached = precompressed_cache.get(etag, encoding)
+            if cached is not None:
+                return _cache_headers(_encoded_json(*cached), etag)
+        # Keyed by the version the ETag was built from, so writes by other
+        # processes never leave an old page behind a new ETag
+        cache_key = ResultCache.make_key(filters, limit, after_id, after_relevance, fields, version)
+        generation = mongodb_db.generation
+        page = result_cache.get('mongodb', generation, cache_key)
+        fresh = page is None
+        if fresh:
+            cards = _read_cards('mongodb', mongodb_db, filters, limit + 1, after_id, after_relevance, fields)
+            with phase('convert'):
+                next_cursor = _next_cursor(cards, limit)
+            page = {'data': cards, 'next_cursor': next_cursor}
+        with phase('serialize'):
+            response = jsonify({'success': True, 'data': page['data'], 'next_cursor': page['next_cursor']})
+        # Sized by the body just serialized, rather than serializing it again
+        if fresh:
+            result_cache.put('mongodb', generation, cache_key, page, len(response.get_data()))
+        if precompress:
+            with phase('compress'):
+                body, content_encoding = encode(response.get_data(), encoding)
+            # Only a body built for exactly this ETag's version may be reused under it
+            if mongodb_db.version() == version:
+                precompressed_cache.put(etag, encoding, body, content_encoding)
+            set_encoded_body(response, body, content_encoding)
+        return _cache_headers(response, etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mongodb/cards/facets', methods=['GET'])
+def mongodb_facets():
+    """Get grouped counts and price statistics from MongoDB for the current filters"""
+    try:
+        filters = _parse_filters()
+        version = mongodb_db.version()
+        etag = _etag('mongodb', version, filters, 'facets')
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        cache_key = ResultCache.make_key(filters, 'facets', version)
+        generation = mongodb_db.generation
+        facets = result_cache.get('mongodb', generation, cache_key)
+        fresh = facets is None
+        if fresh:
+            facets = mongodb_db.facets(filters=filters)
+        response = jsonify({'success': True, 'data': facets})
+        if fresh:
+            result_cache.put('mongodb', generation, cache_key, facets, len(response.get_data()))
+        return _cache_headers(response, etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mongodb/cards/export', methods=['GET'])
+def mongodb_export():
+    """Stream MongoDB cards matching the filters as CSV or NDJSON"""
+    try:
+        return _export_response('mongodb', mongodb_db)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/mongodb/cards', methods=['POST'])
+@api.route('/api/mongodb/cards', methods=['POST'])
 def mongodb_create():
     """Create a new graphics card in MongoDB"""
     try:
-        data = request.json
-        card_id = mongodb_db.create(data)
-        return jsonify({'success': True, 'id': card_id, 'message': 'Card created successfully'})
+        return _create_response('mongodb', mongodb_db)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/mongodb/cards/<card_id>', methods=['PUT'])
+@api.route('/api/mongodb/writes/<ticket>', methods=['GET'])
+def mongodb_write_status(ticket):
+    """Status of a MongoDB create accepted with 202"""
+    return _write_status_response('mongodb', ticket)
+
+@api.route('/api/mongodb/cards', methods=['PATCH'])
+def mongodb_update_matching():
+    """Update every MongoDB card matching the filters with one statement"""
+    try:
+        try:
+            filters, changes, max_rows, dry_run = _parse_bulk_change(with_changes=True)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        result = mongodb_db.update_where(filters, changes, max_rows, dry_run=dry_run)
+        return _bulk_change_response(result, max_rows, dry_run, 'modified')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mongodb/cards', methods=['DELETE'])
+def mongodb_delete_matching():
+    """Delete every MongoDB card matching the filters with one statement"""
+    try:
+        try:
+            filters, _, max_rows, dry_run = _parse_bulk_change(with_changes=False)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        result = mongodb_db.delete_where(filters, max_rows, dry_run=dry_run)
+        return _bulk_change_response(result, max_rows, dry_run, 'deleted')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mongodb/cards/import', methods=['POST'])
+def mongodb_import():
+    """Import a CSV/NDJSON upload into MongoDB in batches"""
+    try:
+        return _import_response('mongodb', mongodb_db)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mongodb/cards/bulk', methods=['POST'])
+def mongodb_create_bulk():
+    """Create many graphics cards in MongoDB with batched inserts"""
+    try:
+        cards = _parse_bulk_cards()
+        if cards is None:
+            return jsonify({'success': False, 'error': 'Expected a JSON array of cards'}), 400
+        results = mongodb_db.create_many(cards)
+        return _bulk_response(results)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mongodb/cards/<card_id>/prices', methods=['GET'])
+def mongodb_prices(card_id):
+    """Price history of a MongoDB card"""
+    try:
+        if not ObjectId.is_valid(card_id):
+            return jsonify({'success': False, 'error': 'Card not found'}), 404
+        return _prices_response(mongodb_db, card_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/mongodb/cards/<card_id>', methods=['PUT'])
 def mongodb_update(card_id):
     """Update a graphics card in MongoDB"""
     try:
@@ -136,7 +970,7 @@ def mongodb_update(card_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/mongodb/cards/<card_id>', methods=['DELETE'])
+@api.route('/api/mongodb/cards/<card_id>', methods=['DELETE'])
 def mongodb_delete(card_id):
     """Delete a graphics card from MongoDB"""
     try:
@@ -148,9 +982,172 @@ def mongodb_delete(card_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Cross-backend Routes
+def _timed_read(read_all, filters, limit, fields):
+    """Run one backend's listing query; returns (cards, elapsed_ms).
+    Runs in a copy of the request's context, with phase timings of its own:
+    the request records the elapsed time once, as db_<backend>.
+    """
+    start_request()
+    start = time.perf_counter()
+    cards = read_all(filters=filters, limit=limit, fields=fields)
+    return cards, (time.perf_counter() - start) * 1000
+
+def _compare_summary(mysql_cards, mongodb_cards, fields):
+    """Diff two result sets, matching cards by name (ids differ per backend)"""
+    summary = {'mysql_count': len(mysql_cards), 'mongodb_count': len(mongodb_cards)}
+    if 'name' not in fields:
+        return summary
+    mysql_by_name = {card.get('name'): card for card in mysql_cards}
+    mongodb_by_name = {card.get('name'): card for card in mongodb_cards}
+    common = mysql_by_name.keys() & mongodb_by_name.keys()
+    compared = [field for field in fields if field not in ('id', 'created_at', 'updated_at')]
+    mismatched = []
+    for name in sorted(common):
+        differing = [field for field in compared
+                     if mysql_by_name[name].get(field) != mongodb_by_name[name].get(field)]
+        if differing:
+            mismatched.append({'name': name, 'fields': differing})
+    summary.update({
+        'in_both': len(common),
+        'only_in_mysql': sorted(mysql_by_name.keys() - common),
+        'only_in_mongodb': sorted(mongodb_by_name.keys() - common),
+        'mismatched': mismatched,
+    })
+    return summary
+
+@api.route('/api/compare/cards', methods=['GET'])
+def compare_cards():
+    """Query both backends concurrently and diff the results"""
+    try:
+        filters = _parse_filters()
+        try:
+            limit, _, _ = _parse_page('int')
+            fields = _parse_fields()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        start = time.perf_counter()
+        futures = {
+            # Run in a copy of the request's context, so replica stickiness applies
+            'mysql': compare_executor.submit(contextvars.copy_context().run, _timed_read,
+                                             mysql_db.read_all, filters, limit, fields),
+            'mongodb': compare_executor.submit(contextvars.copy_context().run, _timed_read,
+                                               mongodb_db.read_all, filters, limit, fields),
+        }
+        timeout = current_app.config['COMPARE_TIMEOUT']
+        wait(futures.values(), timeout=timeout)
+        results = {}
+        timings = {}
+        errors = {}
+        for backend, future in futures.items():
+            if not future.done():
+                # A query already running cannot be interrupted; it finishes in the background
+                future.cancel()
+                errors[backend] = f"Timed out after {timeout:g}s"
+                continue
+            try:
+                cards, elapsed_ms = future.result()
+            except Exception as e:
+                errors[backend] = str(e)
+                continue
+            # Each worker timed its read into its own phases, not the request's
+            record_phase(f'db_{backend}', elapsed_ms / 1000)
+            results[backend] = cards
+            timings[backend] = round(elapsed_ms, 2)
+        timings['total'] = round((time.perf_counter() - start) * 1000, 2)
+        response = {'success': not errors, 'data': results, 'timings_ms': timings}
+        if errors:
+            response['errors'] = errors
+        if len(results) == 2:
+            with phase('convert'):
+                response['diff'] = _compare_summary(results['mysql'], results['mongodb'], fields)
+        with phase('serialize'):
+            return jsonify(response), (200 if results else 502)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get listing result cache statistics"""
+    data = result_cache.stats()
+    data['precompressed'] = precompressed_cache.stats()
+    return jsonify({'success': True, 'data': data})
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, pool and cache metrics in the Prometheus text format.
+    Backends not used yet by this worker are left out rather than connected.
+    """
+    cache = result_cache.stats()
+    gauges = {}
+    if mysql_db.initialized:
+        pool = mysql_db.pool_stats() or {}
+        for key in ('size', 'in_use', 'idle', 'waiting', 'checkouts', 'timeouts',
+                    'created', 'discarded', 'reaped', 'reconnects'):
+            gauges[f'mysql_pool_{key}'] = (f"MySQL connection pool {key.replace('_', ' ')}", pool.get(key))
+        gauges['mysql_pool_wait_seconds_sum'] = ('Total time spent waiting for a pooled connection',
+                                                 pool.get('wait_ms', {}).get('sum', 0) / 1000)
+    for key in ('entries', 'bytes', 'hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+        gauges[f'result_cache_{key}'] = (f"Listing result cache {key}", cache.get(key))
+    replicas = mysql_db.replica_stats() if mysql_db.initialized else None
+    if replicas:
+        gauges['mysql_replica_primary_reads'] = ('Reads that went to the primary although replicas are configured',
+                                                 replicas['primary_reads'])
+        for name, key, help_text in (
+                ('healthy', 'healthy', 'Whether the replica is serving reads (1) or skipped (0)'),
+                ('lag_seconds', 'lag_s', 'Replication lag at the last health check'),
+                ('latency_ms', 'latency_ms', 'Moving-average read latency in milliseconds'),
+                ('reads', 'reads', 'Reads served by the replica'),
+                ('failures', 'failures', 'Times the replica was marked unhealthy after a failed read')):
+            gauges[f'mysql_replica_{name}'] = (help_text, {
+                (('replica', replica['name']),): replica[key] for replica in replicas['replicas']
+            })
+    gauges['backend_write_generation'] = ('Writes seen per backend since startup', {
+        (('backend', name),): backend.generation
+        for name, backend in (('mysql', mysql_db), ('mongodb', mongodb_db)) if backend.initialized
+    })
+    last_sync = sync_status(mongodb_db) if mongodb_db.initialized else None
+    if last_sync:
+        gauges['sync_lag_seconds'] = ('How far MongoDB trails MySQL after the last sync run',
+                                      last_sync.get('lag_s'))
+        gauges['sync_rows_per_second'] = ('Throughput of the last sync run', last_sync.get('rows_per_s'))
+        gauges['sync_last_run_timestamp_seconds'] = (
+            'When the last sync run finished',
+            last_sync['finished_at'].replace(tzinfo=timezone.utc).timestamp()
+        )
+    histograms = {}
+    queues = {name: write_queue.stats() for name, write_queue in _services().write_queues.items()}
+    if queues:
+        for key, help_text in (('depth', 'Cards queued or being written by the group-commit writer'),
+                               ('written', 'Queued creates written'),
+                               ('failed', 'Queued creates that failed'),
+                               ('rejected', 'Creates refused because the write queue was full'),
+                               ('fallbacks', 'Batches retried card by card after the batch write failed')):
+            gauges[f'write_queue_{key}'] = (help_text, {
+                (('backend', name),): stats[key] for name, stats in queues.items()
+            })
+        for key, help_text in (('flush_size', 'Cards written per group-commit flush'),
+                               ('flush_seconds', 'Duration of group-commit flushes'),
+                               ('wait_seconds', 'Time from queueing a create to its batch being written')):
+            histograms[f'write_queue_{key}'] = (help_text, {
+                (('backend', name),): stats[key] for name, stats in queues.items()
+            })
+    indexes = {name: index.stats() for name, index in _services().columnar_indexes.items()}
+    if indexes:
+        for key, help_text in (('rows', 'Cards held by the columnar index snapshot'),
+                               ('overlay_rows', 'Changed cards polled since the snapshot was built'),
+                               ('age_s', 'Seconds since the columnar index last polled for changes'),
+                               ('served', 'Filtered listings answered from the columnar index'),
+                               ('fallbacks', 'Filtered listings the columnar index left to the database')):
+            gauges[f'columnar_index_{key}'] = (help_text, {
+                (('backend', name),): stats[key] for name, stats in indexes.items()
+            })
+    return Response(request_metrics.render(gauges, histograms), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
+    # Development server; see wsgi.py and gunicorn.conf.py for production
+    app = create_app()
     try:
         app.run(debug=True, host='0.0.0.0', port=5000)
     finally:
-        mysql_db.close()
-        mongodb_db.close()
+        close_app(app)
@@ -0,0 +1,45 @@
+"""
+Lazily created database backends, so importing the app does no database work
+"""
+import threading
+
+
+class LazyBackend:
+    """Stands in for a database object and creates it on first use.
+
+    factory: callable returning the backend (e.g. MySQLDatabase)
+
+    Attribute access is forwarded to the backend, creating it on the first
+    access. A failed creation is retried on the next access, so a worker
+    started while a database is down recovers once it comes back.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self):
+        """Whether the backend has been created (without creating it)"""
+        return self._instance is not None
+
+    def get(self):
+        """The backend, created now if this is the first use"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def close(self):
+        """Close the backend if it was ever created"""
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None:
+            instance.close()
@@ -0,0 +1,5 @@
+"""
+Load and latency benchmarks for the MySQL and MongoDB backends.
+
+    python -m benchmarks.run --help
+"""
@@ -0,0 +1,97 @@
+"""
+Filtered listings from the columnar index versus each backend's own query.
+
+Optionally loads N generated cards, builds the index, then runs the filter
+requests of the standard workload both ways: read_all() with its SQL /
+aggregation filter, and the index selecting ids plus read_by_ids() for the
+page. Reports p50/p95 per backend and checks both return the same cards.
+
+Usage:
+    python -m benchmarks.columnar [--rows 0] [--backend both|mysql|mongodb]
+                                  [--queries 500] [--limit 20]
+"""
+import argparse
+import time
+import urllib.parse
+
+from benchmarks.datagen import generate_cards
+from benchmarks.load import load_cards
+from benchmarks.workload import build_requests, percentile
+from card_schema import LIST_FIELDS
+from columnar_index import ColumnarIndex
+
+NUMERIC_FILTERS = {'memory_min': int, 'memory_max': int, 'price_min': float, 'price_max': float}
+
+
+def workload_filters(count, seed=7):
+    """Filter dicts of the workload's 'filter' requests (unfiltered ones dropped)"""
+    filters = []
+    for _, _, path, _ in build_requests('mysql', count, mix={'filter': 1}, seed=seed):
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(path).query))
+        if params:
+            filters.append({key: NUMERIC_FILTERS.get(key, str)(value) for key, value in params.items()})
+    return filters
+
+
+def _timings(read, filters, limit):
+    latencies = []
+    pages = []
+    for query in filters:
+        start = time.perf_counter()
+        cards = read(query, limit)
+        latencies.append(time.perf_counter() - start)
+        pages.append([card['id'] for card in cards])
+    latencies.sort()
+    return {
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+    }, pages
+
+
+def run_backend(name, db, filters, limit):
+    index = ColumnarIndex(name, db, integer_ids=name == 'mysql')
+    start = time.perf_counter()
+    index.reload()
+    load_s = time.perf_counter() - start
+    database, expected = _timings(lambda query, size: db.read_all(query, size, fields=LIST_FIELDS),
+                                  filters, limit)
+    columnar, pages = _timings(lambda query, size: index.read_all(query, size, fields=LIST_FIELDS) or [],
+                               filters, limit)
+    index.close()
+    mismatches = sum(1 for got, want in zip(pages, expected) if got != want)
+    return {'rows': index.stats()['rows'], 'load_s': round(load_s, 3), 'database': database,
+            'columnar': columnar, 'mismatches': mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=0, help='generated cards to load first (0 uses the data already loaded)')
+    parser.add_argument('--backend', choices=('both', 'mysql', 'mongodb'), default='both')
+    parser.add_argument('--queries', type=int, default=500, help='filter requests to run')
+    parser.add_argument('--limit', type=int, default=20, help='page size')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    filters = workload_filters(args.queries)
+    for backend in (['mysql', 'mongodb'] if args.backend == 'both' else [args.backend]):
+        if backend == 'mysql':
+            from mysql_db import MySQLDatabase
+            db = MySQLDatabase()
+        else:
+            from mongodb_db import MongoDBDatabase
+            db = MongoDBDatabase()
+        try:
+            if args.rows:
+                loaded = load_cards(db, generate_cards(args.rows, seed=args.seed))
+                print(f"{backend}: loaded {loaded['rows']} cards ({loaded['rows_per_s']} rows/s)")
+            result = run_backend(backend, db, filters, args.limit)
+        finally:
+            db.close()
+        print(f"[OK] {backend}: {result['rows']} cards indexed in {result['load_s']}s; "
+              f"database p50 {result['database']['p50_ms']} ms, p95 {result['database']['p95_ms']} ms; "
+              f"columnar p50 {result['columnar']['p50_ms']} ms, p95 {result['columnar']['p95_ms']} ms; "
+              f"{result['mismatches']} of {len(filters)} pages differ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Synthetic graphics card generator with controllable distributions
+"""
+import math
+import random
+from datetime import date, timedelta
+
+# Manufacturer -> share of the catalogue
+DEFAULT_MANUFACTURERS = {'NVIDIA': 0.55, 'AMD': 0.35, 'Intel': 0.10}
+
+# Memory size (GB) -> share of the catalogue
+DEFAULT_MEMORY_SIZES = {4: 0.05, 6: 0.08, 8: 0.22, 10: 0.05, 12: 0.2, 16: 0.2,
+                        20: 0.06, 24: 0.09, 32: 0.03, 48: 0.02}
+
+MEMORY_TYPES = ('GDDR6', 'GDDR6X', 'GDDR5', 'GDDR5X', 'HBM2', 'HBM3')
+
+# Manufacturer -> (product family, model prefix)
+PRODUCT_LINES = {
+    'NVIDIA': ('GeForce', 'RTX'),
+    'AMD': ('Radeon', 'RX'),
+    'Intel': ('Arc', 'A'),
+}
+
+
+def parse_weights(text, key_type=str):
+    """Parse 'A=0.5,B=0.3' into {'A': 0.5, 'B': 0.3}"""
+    weights = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        key, _, value = part.partition('=')
+        weights[key_type(key.strip())] = float(value or 1)
+    return weights
+
+
+def generate_cards(count, seed=42, manufacturers=None, memory_sizes=None,
+                   price_median=550.0, price_sigma=0.6):
+    """Yield `count` deterministic synthetic cards.
+    manufacturers / memory_sizes: value -> relative weight
+    price_median / price_sigma: log-normal price distribution (USD)
+    Cards are yielded one at a time, so any count fits in memory.
+    """
+    rng = random.Random(seed)
+    manufacturers = manufacturers or DEFAULT_MANUFACTURERS
+    memory_sizes = memory_sizes or DEFAULT_MEMORY_SIZES
+    makers = list(manufacturers)
+    maker_weights = list(manufacturers.values())
+    sizes = list(memory_sizes)
+    size_weights = list(memory_sizes.values())
+    mu = math.log(price_median)
+    first_release = date(2016, 1, 1)
+    for i in range(count):
+        manufacturer = rng.choices(makers, maker_weights)[0]
+        family, prefix = PRODUCT_LINES.get(manufacturer, ('', 'GPU'))
+        model = f"{prefix} {rng.randint(1, 9)}{rng.randint(0, 9)}{rng.choice(['50', '60', '70', '80', '90'])}"
+        core_clock = rng.randint(1100, 2600)
+        yield {
+            'name': ' '.join(part for part in (manufacturer, family, model) if part) + f" #{i}",
+            'manufacturer': manufacturer,
+            'model': model,
+            'memory_gb': rng.choices(sizes, size_weights)[0],
+            'memory_type': rng.choice(MEMORY_TYPES),
+            'core_clock_mhz': core_clock,
+            'boost_clock_mhz': core_clock + rng.randint(100, 400),
+            'price_usd': round(rng.lognormvariate(mu, price_sigma), 2),
+            'release_date': first_release + timedelta(days=rng.randint(0, 3650)),
+        }
@@ -0,0 +1,32 @@
+"""
+Bulk loading of generated cards into the MySQL and MongoDB backends
+"""
+import itertools
+import time
+
+from config import BULK_BATCH_SIZE
+
+
+def load_cards(db, cards, chunk_size=BULK_BATCH_SIZE * 10):
+    """Insert an iterable of cards through db.create_many() in chunks.
+    Only one chunk is held in memory at a time.
+    Returns {'rows', 'errors', 'elapsed_s', 'rows_per_s'}.
+    """
+    cards = iter(cards)
+    rows = errors = 0
+    start = time.perf_counter()
+    while True:
+        chunk = list(itertools.islice(cards, chunk_size))
+        if not chunk:
+            break
+        results = db.create_many(chunk)
+        failed = sum(1 for result in results if 'error' in result)
+        errors += failed
+        rows += len(chunk) - failed
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'rows_per_s': round(rows / elapsed, 1) if elapsed else None,
+    }
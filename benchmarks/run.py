@@ -0,0 +1,180 @@
+"""
+Reproducible load and latency benchmark for both backends.
+
+Generates N synthetic cards, loads them into MySQL and/or MongoDB, then
+drives the card endpoints with a mixed list/filter/search/write workload and
+writes p50/p95/p99 latency, throughput and peak RSS per backend to a JSON
+report. Point .env at scratch databases - the loaded cards are not removed.
+
+Usage:
+    python -m benchmarks.run [--rows 10000] [--backend both|mysql|mongodb]
+                             [--mode client|http] [--url http://127.0.0.1:5000]
+                             [--requests 2000] [--concurrency 8]
+                             [--mix list=40,filter=30,search=20,write=10]
+                             [--output report.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+from benchmarks.datagen import (
+    DEFAULT_MANUFACTURERS, DEFAULT_MEMORY_SIZES, generate_cards, parse_weights
+)
+from benchmarks.workload import (
+    DEFAULT_MIX, ClientDriver, HttpDriver, build_requests, run_workload, summarize
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb(pid=None):
+    """Peak resident set size in MB of this process, or of `pid` (Linux only)"""
+    if pid is not None:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return None
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _generate(options):
+    return generate_cards(
+        options['rows'], seed=options['seed'],
+        manufacturers=options['manufacturers'], memory_sizes=options['memory_sizes'],
+        price_median=options['price_median'], price_sigma=options['price_sigma']
+    )
+
+
+def benchmark_backend(backend, options):
+    """Load and drive one backend in this process; returns its report section"""
+    from app import SERVICES_KEY, close_app, create_app
+    from benchmarks.load import load_cards
+
+    app = create_app()
+    services = app.extensions[SERVICES_KEY]
+    try:
+        report = {'backend': backend}
+        if not options['skip_load']:
+            db = services.mysql_db if backend == 'mysql' else services.mongodb_db
+            print(f"[{backend}] loading {options['rows']} cards...")
+            report['load'] = load_cards(db, _generate(options))
+            print(f"[{backend}] loaded {report['load']['rows']} rows "
+                  f"({report['load']['rows_per_s']} rows/s)")
+
+        requests = build_requests(backend, options['requests'], options['mix'], options['seed'])
+        if options['mode'] == 'http':
+            driver = HttpDriver(options['url'])
+        else:
+            driver = ClientDriver(app)
+        print(f"[{backend}] {len(requests)} requests, concurrency {options['concurrency']}...")
+        samples, elapsed = run_workload(driver, requests, options['concurrency'])
+        report.update(summarize(samples, elapsed))
+        report['peak_rss_mb'] = peak_rss_mb(options['server_pid'] if options['mode'] == 'http' else None)
+    finally:
+        close_app(app)
+    return report
+
+
+def _child(backend, options, queue):
+    try:
+        queue.put(benchmark_backend(backend, options))
+    except Exception as e:
+        queue.put({'backend': backend, 'error': str(e)})
+
+
+def run_isolated(backend, options):
+    """Run one backend in a child process so its peak RSS is its own"""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_child, args=(backend, options, queue))
+    process.start()
+    report = queue.get()
+    process.join()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='generated cards to load (1k - 10M)')
+    parser.add_argument('--backend', choices=('both', 'mysql', 'mongodb'), default='both')
+    parser.add_argument('--mode', choices=('client', 'http'), default='client',
+                        help='Flask test client in-process, or real HTTP against --url')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server for --mode http')
+    parser.add_argument('--server-pid', type=int, help='server process to read peak RSS from (--mode http)')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per backend')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mix', default='list=40,filter=30,search=20,write=10',
+                        help='operation weights: list, filter, search, write')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--manufacturers', help='e.g. NVIDIA=0.6,AMD=0.3,Intel=0.1')
+    parser.add_argument('--memory-sizes', help='e.g. 8=0.3,12=0.3,16=0.4')
+    parser.add_argument('--price-median', type=float, default=550.0)
+    parser.add_argument('--price-sigma', type=float, default=0.6)
+    parser.add_argument('--skip-load', action='store_true', help='benchmark the data already loaded')
+    parser.add_argument('--output', default='benchmark_report.json', help='JSON report path')
+    args = parser.parse_args()
+
+    mix = parse_weights(args.mix)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f"unknown operation(s) in --mix: {', '.join(sorted(unknown))}")
+
+    options = {
+        'rows': args.rows,
+        'seed': args.seed,
+        'manufacturers': parse_weights(args.manufacturers) if args.manufacturers else DEFAULT_MANUFACTURERS,
+        'memory_sizes': parse_weights(args.memory_sizes, int) if args.memory_sizes else DEFAULT_MEMORY_SIZES,
+        'price_median': args.price_median,
+        'price_sigma': args.price_sigma,
+        'skip_load': args.skip_load,
+        'mode': args.mode,
+        'url': args.url,
+        'server_pid': args.server_pid,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'mix': mix,
+    }
+    backends = ['mysql', 'mongodb'] if args.backend == 'both' else [args.backend]
+
+    report = {
+        'meta': {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': options,
+        },
+        'backends': {},
+    }
+    for backend in backends:
+        result = run_isolated(backend, options)
+        report['backends'][backend] = result
+        if 'error' in result:
+            print(f"[X] {backend}: {result['error']}")
+            continue
+        overall = result['overall']
+        print(f"[OK] {backend}: p50 {overall['p50_ms']} ms, p95 {overall['p95_ms']} ms, "
+              f"p99 {overall['p99_ms']} ms, {result['throughput_rps']} req/s, "
+              f"peak RSS {result['peak_rss_mb']} MB")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
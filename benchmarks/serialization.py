@@ -0,0 +1,123 @@
+"""
+Microbenchmark: Python-side row shaping + JSON encoding, before and after
+moving the conversions into the databases.
+
+"before" replays the old per-row conversion (Decimal -> float and dates ->
+str for MySQL rows, _id/isoformat mutation for MongoDB documents) followed by
+jsonify; "after" encodes rows as the shaped SELECT / aggregation now returns
+them. Database-side cost is not included - run benchmarks.run for that.
+
+Usage:
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from bson import ObjectId
+from flask import Flask
+
+from benchmarks.datagen import generate_cards
+from serialization import CardJSONProvider
+
+
+def _raw_mysql_rows(cards, created):
+    """Rows as PyMySQL returns them for plain column names"""
+    return [dict(card, id=i + 1, price_usd=Decimal(f"{card['price_usd']:.2f}"),
+                 created_at=created, updated_at=created)
+            for i, card in enumerate(cards)]
+
+
+def _shaped_mysql_rows(cards, created):
+    """Rows as PyMySQL returns them for serialization.MYSQL_SHAPED_COLUMNS"""
+    stamp = str(created)
+    return [dict(card, id=i + 1, release_date=card['release_date'].isoformat(),
+                 created_at=stamp, updated_at=stamp)
+            for i, card in enumerate(cards)]
+
+
+def _raw_mongodb_docs(cards, created):
+    return [dict(card, _id=ObjectId(), release_date=card['release_date'].isoformat(),
+                 created_at=created, updated_at=created)
+            for card in cards]
+
+
+def _shaped_mongodb_docs(cards, created):
+    stamp = created.isoformat(timespec='milliseconds')
+    return [dict(card, id=str(ObjectId()), release_date=card['release_date'].isoformat(),
+                 created_at=stamp, updated_at=stamp)
+            for card in cards]
+
+
+def _legacy_mysql(rows):
+    for card in rows:
+        if 'price_usd' in card and card['price_usd'] is not None:
+            card['price_usd'] = float(card['price_usd'])
+        if 'release_date' in card and card['release_date']:
+            card['release_date'] = str(card['release_date'])
+        if 'created_at' in card and card['created_at']:
+            card['created_at'] = str(card['created_at'])
+        if 'updated_at' in card and card['updated_at']:
+            card['updated_at'] = str(card['updated_at'])
+    return rows
+
+
+def _legacy_mongodb(docs):
+    for doc in docs:
+        doc['id'] = str(doc['_id'])
+        del doc['_id']
+        doc['created_at'] = doc['created_at'].isoformat()
+        doc['updated_at'] = doc['updated_at'].isoformat()
+    return docs
+
+
+def _rows_per_second(make_rows, shape, dumps, repeat):
+    """Best-of-`repeat` rows/sec for shaping + encoding a fresh batch"""
+    best = None
+    count = 0
+    for _ in range(repeat):
+        rows = make_rows()
+        count = len(rows)
+        start = time.perf_counter()
+        dumps({'success': True, 'data': shape(rows), 'next_cursor': None})
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best if best else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = app.json
+    card_provider = CardJSONProvider(app)
+    cards = list(generate_cards(args.rows))
+    created = datetime(2024, 1, 1, 12, 0, 0) + timedelta(microseconds=123000)
+
+    def unchanged(rows):
+        return rows
+
+    cases = [
+        ('mysql', 'before', lambda: _raw_mysql_rows(cards, created), _legacy_mysql, default_provider.dumps),
+        ('mysql', 'after', lambda: _shaped_mysql_rows(cards, created), unchanged, card_provider.dumps),
+        ('mongodb', 'before', lambda: _raw_mongodb_docs(cards, created), _legacy_mongodb, default_provider.dumps),
+        ('mongodb', 'after', lambda: _shaped_mongodb_docs(cards, created), unchanged, card_provider.dumps),
+    ]
+    results = {}
+    for backend, variant, make_rows, shape, dumps in cases:
+        results[(backend, variant)] = _rows_per_second(make_rows, shape, dumps, args.repeat)
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for backend in ('mysql', 'mongodb'):
+        before = results[(backend, 'before')]
+        after = results[(backend, 'after')]
+        print(f"{backend:8} before {before:12,.0f} rows/s   after {after:12,.0f} rows/s   "
+              f"({after / before:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Cold-start benchmark: how long a fresh worker takes to be ready and to serve
+its first requests.
+
+Each run starts a new interpreter that imports app and calls create_app()
+(what a worker does at boot), then sends two listing requests per backend
+through the Flask test client. The first request of a backend pays for its lazy connection and
+schema-version check; the second shows the warm cost for comparison.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--backend both|mysql|mongodb|none]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child; prints one JSON line of timings in seconds
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+application = create_app()
+result = {'import_s': time.perf_counter() - start, 'ready_at': time.time()}
+client = application.test_client()
+for backend in sys.argv[1:]:
+    for label in ('first', 'second'):
+        began = time.perf_counter()
+        status = client.get(f'/api/{backend}/cards?limit=1').status_code
+        result[f'{backend}_{label}_s'] = time.perf_counter() - began
+        result[f'{backend}_status'] = status
+print(json.dumps(result))
+'''
+
+
+def run_once(backends):
+    """Timings of one cold worker start, including interpreter startup (spawn_s)"""
+    spawned = time.time()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, *backends],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    # Connection messages are printed too; the timings are the last line
+    result = json.loads(output.strip().splitlines()[-1])
+    result['spawn_s'] = result.pop('ready_at') - spawned
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--backend', choices=('both', 'mysql', 'mongodb', 'none'), default='both')
+    args = parser.parse_args()
+    backends = {'both': ['mysql', 'mongodb'], 'none': []}.get(args.backend, [args.backend])
+
+    runs = [run_once(backends) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts, median (max)")
+    print(f"  {'worker ready (spawn + import)':34} {_ms(runs, 'spawn_s')}")
+    print(f"  {'import app + create_app()':34} {_ms(runs, 'import_s')}")
+    for backend in backends:
+        statuses = sorted({run[f'{backend}_status'] for run in runs})
+        print(f"  {backend + ' first request':34} {_ms(runs, backend + '_first_s')}   status {statuses}")
+        print(f"  {backend + ' second request':34} {_ms(runs, backend + '_second_s')}")
+
+
+def _ms(runs, key):
+    values = [run[key] * 1000 for run in runs]
+    return f"{statistics.median(values):9.1f} ms ({max(values):.1f})"
+
+
+if __name__ == '__main__':
+    main()
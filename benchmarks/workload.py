@@ -0,0 +1,158 @@
+"""
+Mixed read/filter/search/write workload and the drivers that execute it
+"""
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.datagen import DEFAULT_MANUFACTURERS, MEMORY_TYPES, generate_cards
+
+# Operation -> share of requests
+DEFAULT_MIX = {'list': 0.4, 'filter': 0.3, 'search': 0.2, 'write': 0.1}
+
+SEARCH_TERMS = ('geforce', 'radeon', 'rtx 40', 'rx 7', 'arc', 'nvidia', 'amd rx', '4090')
+
+
+def build_requests(backend, count, mix=None, seed=7):
+    """Deterministic list of (operation, method, path, json_body) tuples"""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    operations = list(mix)
+    weights = list(mix.values())
+    new_cards = generate_cards(count, seed=seed + 1)
+    base = f'/api/{backend}/cards'
+    requests = []
+    for _ in range(count):
+        operation = rng.choices(operations, weights)[0]
+        if operation == 'list':
+            requests.append((operation, 'GET', base, None))
+        elif operation == 'filter':
+            params = {}
+            if rng.random() < 0.6:
+                params['manufacturer'] = rng.choice(list(DEFAULT_MANUFACTURERS))
+            if rng.random() < 0.4:
+                params['memory_type'] = rng.choice(MEMORY_TYPES)
+            if rng.random() < 0.5:
+                params['memory_min'] = rng.choice([8, 12, 16])
+            if rng.random() < 0.5:
+                low = rng.choice([200, 400, 600])
+                params['price_min'] = low
+                params['price_max'] = low + rng.choice([200, 500, 1000])
+            requests.append((operation, 'GET', f"{base}?{urllib.parse.urlencode(params)}", None))
+        elif operation == 'search':
+            query = urllib.parse.urlencode({'search': rng.choice(SEARCH_TERMS)})
+            requests.append((operation, 'GET', f"{base}?{query}", None))
+        else:
+            card = next(new_cards)
+            card['release_date'] = card['release_date'].isoformat()
+            requests.append((operation, 'POST', base, card))
+    return requests
+
+
+class ClientDriver:
+    """Sends requests through Flask's test client (no network, no server)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HttpDriver:
+    """Sends requests to a running server over real HTTP"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, method, path, body):
+        data = None
+        headers = {}
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def run_workload(driver, requests, concurrency=1):
+    """Execute requests with `concurrency` threads.
+    Returns (samples, elapsed_seconds); samples are (operation, latency_ms, ok).
+    """
+    samples = []
+    lock = threading.Lock()
+
+    def execute(item):
+        operation, method, path, body = item
+        start = time.perf_counter()
+        try:
+            ok = driver.send(method, path, body) < 400
+        except Exception:
+            ok = False
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        with lock:
+            samples.append((operation, latency_ms, ok))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        list(executor.map(execute, requests))
+    return samples, time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles per operation and overall"""
+    def stats(latencies, errors):
+        latencies = sorted(latencies)
+        return {
+            'count': len(latencies),
+            'errors': errors,
+            'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50_ms': _round(percentile(latencies, 0.50)),
+            'p95_ms': _round(percentile(latencies, 0.95)),
+            'p99_ms': _round(percentile(latencies, 0.99)),
+            'max_ms': _round(latencies[-1] if latencies else None),
+        }
+
+    by_operation = {}
+    for operation, latency, ok in samples:
+        entry = by_operation.setdefault(operation, ([], [0]))
+        entry[0].append(latency)
+        if not ok:
+            entry[1][0] += 1
+    summary = {
+        'operations': {op: stats(latencies, errors[0]) for op, (latencies, errors) in sorted(by_operation.items())},
+        'overall': stats([s[1] for s in samples], sum(1 for s in samples if not s[2])),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+    }
+    return summary
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
@@ -0,0 +1,133 @@
+"""
+Shared description of the graphics_cards schema used by both backends
+"""
+from datetime import date
+
+# Columns written on insert, in INSERT statement order
+INSERT_COLUMNS = (
+    'name', 'manufacturer', 'model', 'memory_gb', 'memory_type',
+    'core_clock_mhz', 'boost_clock_mhz', 'price_usd', 'release_date'
+)
+
+# Every column of graphics_cards; the whitelist for ?fields= projections
+CARD_FIELDS = ('id',) + INSERT_COLUMNS + ('created_at', 'updated_at')
+
+# What the dashboard renders and edits; the default projection for listings
+LIST_FIELDS = ('id',) + INSERT_COLUMNS
+
+# Price band edges (USD) for the facets endpoints: under 250, 250-500, ..., 2000 and up
+PRICE_BANDS = (250, 500, 750, 1000, 1500, 2000)
+
+# Columns that must be present (and not null) on every card
+REQUIRED_FIELDS = ('name', 'manufacturer', 'model', 'memory_gb', 'memory_type', 'core_clock_mhz')
+
+
+def validate_card(data):
+    """Return an error message if `data` cannot be inserted as a card, else None"""
+    if not isinstance(data, dict):
+        return 'Card must be a JSON object'
+    missing = [field for field in REQUIRED_FIELDS if data.get(field) in (None, '')]
+    if missing:
+        return f"Missing required field(s): {', '.join(missing)}"
+    return None
+
+
+# Type checks for fields a filter-based bulk update may $set
+_INT_FIELDS = ('memory_gb', 'core_clock_mhz', 'boost_clock_mhz')
+_NUMBER_FIELDS = ('price_usd',)
+
+
+def validate_changes(changes):
+    """Return an error message if `changes` is not a valid $set payload, else None.
+    Only INSERT_COLUMNS may be set; required fields cannot be cleared.
+    """
+    if not isinstance(changes, dict) or not changes:
+        return '$set must be a non-empty JSON object'
+    unknown = [field for field in changes if field not in INSERT_COLUMNS]
+    if unknown:
+        return f"Cannot set field(s): {', '.join(unknown)}"
+    for field, value in changes.items():
+        if value is None or value == '':
+            if field in REQUIRED_FIELDS:
+                return f"{field} is required and cannot be cleared"
+            continue
+        if field in _INT_FIELDS and (isinstance(value, bool) or not isinstance(value, int)):
+            return f"{field} must be an integer"
+        if field in _NUMBER_FIELDS and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return f"{field} must be a number"
+        if field not in _INT_FIELDS + _NUMBER_FIELDS and not isinstance(value, str):
+            return f"{field} must be a string"
+    return None
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError('boolean')
+    if isinstance(value, int):
+        return value
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError('not a whole number')
+    return int(number)
+
+
+def coerce_card(record):
+    """Build an insertable card from a loosely typed record (CSV strings or
+    JSON values), e.g. one row of an import file.
+    Strings are stripped and empty values become None, numeric columns are
+    parsed, release_date must be YYYY-MM-DD (a longer ISO timestamp is cut to
+    its date). Columns outside INSERT_COLUMNS - such as id and the timestamps
+    of an export - are ignored.
+    Returns (card, None), or (None, error message) for a row to reject.
+    """
+    if not isinstance(record, dict):
+        return None, 'Card must be a JSON object'
+    card = {}
+    for column in INSERT_COLUMNS:
+        value = record.get(column)
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is not None:
+            try:
+                if column in _INT_FIELDS:
+                    value = _to_int(value)
+                elif column in _NUMBER_FIELDS:
+                    if isinstance(value, bool):
+                        raise ValueError('boolean')
+                    value = float(value)
+                elif column == 'release_date':
+                    value = date.fromisoformat(str(value)[:10])
+                elif not isinstance(value, str):
+                    raise ValueError('not a string')
+            except (TypeError, ValueError):
+                return None, f"{column}: invalid value {value!r}"
+        card[column] = value
+    error = validate_card(card)
+    if error:
+        return None, error
+    return card, None
+
+
+def parse_fields(value):
+    """Parse a comma-separated ?fields= value into a tuple of card fields.
+    'id' is always included so results stay addressable and pageable;
+    'all' or '*' selects every field. Raises ValueError for unknown fields.
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    if not names:
+        raise ValueError('fields must name at least one field')
+    if names in (['all'], ['*']):
+        return CARD_FIELDS
+    unknown = [name for name in names if name not in CARD_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(name for name in CARD_FIELDS if name == 'id' or name in names)
+
+
+def price_band_facets(counts):
+    """Turn {band index: count} into the facets price band list.
+    Band i covers [PRICE_BANDS[i - 1], PRICE_BANDS[i]); missing bands count 0.
+    """
+    edges = (None,) + PRICE_BANDS + (None,)
+    return [{'min': edges[i], 'max': edges[i + 1], 'count': counts.get(i, 0)}
+            for i in range(len(PRICE_BANDS) + 1)]
@@ -0,0 +1,289 @@
+"""
+Query plan regression check for the card listing query.
+
+Loads a generated dataset into scratch copies of the graphics_cards table and
+collection (same indexes as the real ones), captures EXPLAIN / explain() for
+every filter combination _parse_filters() can produce - first page and a
+cursor page - and fails when a combination falls back to a full scan, or to
+an in-memory sort where the index design promises index order.
+
+Equality-only combinations (manufacturer / memory_type) must be served in id
+order straight from an index. First pages with a search term or a
+memory/price range may sort the rows an index narrowed down (relevance order,
+or a range index chosen by the optimizer), but never scan the whole table.
+On MySQL, cursor (keyset) pages must also seek in id order unless they
+search, and no query may read a whole index except the unfiltered first page,
+which walks the primary key and stops at LIMIT.
+Short search terms use substring matching, which cannot be indexed by design,
+and are not checked.
+
+Usage:
+    python check_query_plans.py [--rows 50000] [--backend both|mysql|mongodb]
+                                [--report plans.json] [--keep]
+"""
+import argparse
+import itertools
+import json
+import sys
+
+import pymysql
+
+from config import (
+    MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE,
+    MONGODB_DATABASE, API_DEFAULT_PAGE_SIZE
+)
+from card_schema import INSERT_COLUMNS, LIST_FIELDS
+from benchmarks.datagen import generate_cards
+
+SCRATCH_SUFFIX = '_plan_check'
+
+# One value per filter dimension; None leaves the filter out
+FILTER_VALUES = {
+    'search': [None, 'geforce'],
+    'manufacturer': [None, 'NVIDIA'],
+    'memory_type': [None, 'GDDR6X'],
+    'memory': [None, (8, 16)],
+    'price': [None, (300.0, 900.0)],
+}
+
+RANGE_KEYS = ('memory_min', 'memory_max', 'price_min', 'price_max')
+
+
+def filter_combinations():
+    """Every combination of the filter dimensions, as _parse_filters() dicts"""
+    for search, manufacturer, memory_type, memory, price in itertools.product(*FILTER_VALUES.values()):
+        filters = {}
+        if search:
+            filters['search'] = search
+        if manufacturer:
+            filters['manufacturer'] = manufacturer
+        if memory_type:
+            filters['memory_type'] = memory_type
+        if memory:
+            filters['memory_min'], filters['memory_max'] = memory
+        if price:
+            filters['price_min'], filters['price_max'] = price
+        yield filters
+
+
+def _sort_allowed(filters, cursor_page=False):
+    """Whether the combination may sort rows an index narrowed down. Cursor
+    (keyset) pages only may when ordered by relevance.
+    """
+    if cursor_page:
+        return 'search' in filters
+    return 'search' in filters or any(key in filters for key in RANGE_KEYS)
+
+
+def _describe(filters, after_id):
+    label = ', '.join(f"{k}={v}" for k, v in filters.items()) or '(no filters)'
+    return label + (' [cursor page]' if after_id is not None else '')
+
+
+def mysql_plan_problems(filters, plan, cursor_page=False):
+    """Problems found in tabular EXPLAIN rows"""
+    problems = []
+    for row in plan:
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL':
+            problems.append('full table scan')
+        if row.get('type') == 'index' and (filters or cursor_page):
+            problems.append('full index scan')
+        if 'Using filesort' in extra and not _sort_allowed(filters, cursor_page):
+            problems.append('filesort')
+        if 'Using temporary' in extra:
+            problems.append('temporary table')
+    return problems
+
+
+def check_mysql(cards, keep=False):
+    """EXPLAIN every combination against a scratch copy of graphics_cards"""
+    from mysql_db import MySQLDatabase
+    db = MySQLDatabase()  # makes sure the real table has the current indexes
+    scratch = f"{MYSQL_DATABASE}{SCRATCH_SUFFIX}"
+    results = []
+    conn = pymysql.connect(
+        host=MYSQL_HOST,
+        port=MYSQL_PORT,
+        user=MYSQL_USER,
+        password=MYSQL_PASSWORD,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True
+    )
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {scratch} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            cursor.execute(f"DROP TABLE IF EXISTS {scratch}.graphics_cards")
+            cursor.execute(f"CREATE TABLE {scratch}.graphics_cards LIKE {MYSQL_DATABASE}.graphics_cards")
+            conn.select_db(scratch)
+            print(f"Loading {len(cards)} generated cards into {scratch}.graphics_cards...")
+            placeholders = "(" + ", ".join(["%s"] * len(INSERT_COLUMNS)) + ")"
+            for start in range(0, len(cards), 1000):
+                chunk = cards[start:start + 1000]
+                cursor.execute(
+                    f"INSERT INTO graphics_cards ({', '.join(INSERT_COLUMNS)}) VALUES "
+                    + ", ".join([placeholders] * len(chunk)),
+                    [card[column] for card in chunk for column in INSERT_COLUMNS]
+                )
+            cursor.execute("ANALYZE TABLE graphics_cards")
+            cursor.fetchall()
+            cursor.execute("SELECT MIN(id) AS low, MAX(id) AS high FROM graphics_cards")
+            bounds = cursor.fetchone()
+            middle_id = (bounds['low'] + bounds['high']) // 2
+
+            for filters in filter_combinations():
+                for after_id in (None, middle_id):
+                    sql, values = db._select_sql(filters, limit=API_DEFAULT_PAGE_SIZE + 1,
+                                                 after_id=after_id, fields=LIST_FIELDS)
+                    cursor.execute("EXPLAIN " + sql, values)
+                    plan = cursor.fetchall()
+                    problems = mysql_plan_problems(filters, plan, after_id is not None)
+                    results.append({
+                        'backend': 'mysql',
+                        'filters': filters,
+                        'cursor_page': after_id is not None,
+                        'plan': [{k: row.get(k) for k in ('table', 'type', 'key', 'rows', 'Extra')} for row in plan],
+                        'problems': problems,
+                    })
+                    _print_result(filters, after_id, problems,
+                                  '; '.join(f"{row.get('type')} on {row.get('key')} ({row.get('Extra') or ''})"
+                                            for row in plan))
+            if not keep:
+                cursor.execute(f"DROP DATABASE {scratch}")
+    finally:
+        conn.close()
+        db.close()
+    return results
+
+
+class _ExplainCollection:
+    """Stand-in collection that hands back query plans instead of results"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return self._collection.find(*args, **kwargs)
+
+    def aggregate(self, pipeline, **kwargs):
+        explain = self._collection.database.command(
+            'explain',
+            {'aggregate': self._collection.name, 'pipeline': pipeline, 'cursor': {}},
+            verbosity='queryPlanner'
+        )
+        return iter([explain])
+
+
+def _plan_stages(node, inside_plan=False):
+    """All stage names of the winning plan(s) in an explain document"""
+    stages = []
+    if isinstance(node, dict):
+        if inside_plan and 'stage' in node:
+            stages.append(node['stage'])
+        for key, value in node.items():
+            if key == 'rejectedPlans':
+                continue
+            stages.extend(_plan_stages(value, inside_plan or key == 'winningPlan'))
+    elif isinstance(node, list):
+        for item in node:
+            stages.extend(_plan_stages(item, inside_plan))
+    return stages
+
+
+def mongodb_plan_problems(filters, stages):
+    """Problems found in the winning plan's stages"""
+    problems = []
+    if 'COLLSCAN' in stages:
+        problems.append('collection scan')
+    if 'SORT' in stages and not _sort_allowed(filters):
+        problems.append('in-memory sort')
+    return problems
+
+
+def check_mongodb(cards, keep=False):
+    """explain() every combination against a scratch copy of the collection"""
+    from mongodb_db import MongoDBDatabase
+    db = MongoDBDatabase()
+    scratch_db = db.client[f"{MONGODB_DATABASE}{SCRATCH_SUFFIX}"]
+    scratch = scratch_db['graphics_cards']
+    results = []
+    try:
+        scratch.drop()
+        # Price snapshots and the collections create_indexes makes go to the
+        # scratch database too, so they are dropped with it
+        db.db = scratch_db
+        db.collection = scratch
+        db.price_history = scratch_db['price_history']
+        db.price_rollups = scratch_db['price_rollups']
+        db.price_history.drop()
+        db.price_rollups.drop()
+        db.create_indexes()
+        print(f"Loading {len(cards)} generated cards into {scratch_db.name}.graphics_cards...")
+        db.create_many(cards)
+        ids = [doc['_id'] for doc in scratch.find({}, {'_id': 1}).sort('_id', 1)]
+        middle_id = str(ids[len(ids) // 2])
+
+        db.collection = _ExplainCollection(scratch)
+        for filters in filter_combinations():
+            for after_id in (None, middle_id):
+                cursor = db._listing_cursor(filters, limit=API_DEFAULT_PAGE_SIZE + 1,
+                                            after_id=after_id, fields=LIST_FIELDS)
+                explain = cursor.explain() if hasattr(cursor, 'explain') else next(cursor)
+                stages = _plan_stages(explain)
+                problems = mongodb_plan_problems(filters, stages)
+                results.append({
+                    'backend': 'mongodb',
+                    'filters': filters,
+                    'cursor_page': after_id is not None,
+                    'plan': stages,
+                    'problems': problems,
+                })
+                _print_result(filters, after_id, problems, ' > '.join(stages))
+        if not keep:
+            db.client.drop_database(scratch_db.name)
+    finally:
+        db.close()
+    return results
+
+
+def _print_result(filters, after_id, problems, plan_summary):
+    status = '[X]' if problems else '[OK]'
+    print(f"{status} {_describe(filters, after_id)}: {plan_summary}")
+    if problems:
+        print(f"     -> {', '.join(problems)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help='generated cards to load')
+    parser.add_argument('--backend', choices=('both', 'mysql', 'mongodb'), default='both')
+    parser.add_argument('--report', help='write every captured plan to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args()
+
+    cards = list(generate_cards(args.rows))
+    results = []
+    if args.backend in ('both', 'mysql'):
+        print("=== MySQL query plans ===")
+        results.extend(check_mysql(cards, args.keep))
+    if args.backend in ('both', 'mongodb'):
+        print("\n=== MongoDB query plans ===")
+        results.extend(check_mongodb(cards, args.keep))
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\nPlans written to {args.report}")
+
+    failures = [result for result in results if result['problems']]
+    print("\n=== Summary ===")
+    print(f"{len(results) - len(failures)}/{len(results)} query plans OK")
+    if failures:
+        print("[X] Some filter combinations are not index-backed (see above)")
+        sys.exit(1)
+    print("[OK] Every filter combination is index-backed")
+
+
+if __name__ == '__main__':
+    main()
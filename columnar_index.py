@@ -0,0 +1,454 @@
+"""
+In-process columnar index of the card filter columns, so filtered listings are
+answered without a filtering query (row payloads are still fetched by id)
+"""
+import math
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from config import BULK_BATCH_SIZE
+from metrics import phase
+
+# Columns the index holds; the backends' changed_since returns them in
+# (updated_at, id) order
+INDEX_COLUMNS = ('id', 'manufacturer', 'memory_type', 'memory_gb', 'price_usd', 'updated_at')
+
+# Filters the index evaluates; listings using any other (search) go to the database
+INDEX_FILTERS = ('manufacturer', 'memory_type', 'memory_min', 'memory_max', 'price_min', 'price_max')
+
+# Rows re-read behind the newest updated_at seen: updated_at is stamped when a
+# write runs, so a transaction that commits later (a large batch insert) lands
+# behind a watermark already passed
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+# Changed rows kept beside the snapshot before it is rebuilt: at least
+# MIN_OVERLAY_ROWS, or OVERLAY_FRACTION of the snapshot
+MIN_OVERLAY_ROWS = 1000
+OVERLAY_FRACTION = 0.02
+
+# Payload fetches retried when rows changed or vanished since the last poll
+MAX_FETCH_ATTEMPTS = 3
+
+_NULL = float('nan')
+
+
+def collation_key(value):
+    """Key a string compares by under MySQL's utf8mb4_unicode_ci: case,
+    accents and trailing spaces are ignored
+    """
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold().rstrip(' ')
+
+
+class _Dictionary:
+    """Dictionary encoding of a string column: value <-> small integer code"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _Snapshot:
+    """Immutable columns of every indexed card, in ascending id order.
+
+    Equality filters read the posting list (ascending positions) of their
+    dictionary code; range filters binary-search the values sorted by memory
+    or price, whose positions are in the matching *_order array. NULLs are
+    stored as NaN, which fails every comparison, and are left out of the
+    sorted orders (NULL prices are listed separately, as price filters let
+    them through).
+    """
+
+    def __init__(self, rows, integer_ids):
+        rows = sorted(rows, key=lambda row: row[0])
+        self.integer_ids = integer_ids
+        self.ids = array('q', (row[0] for row in rows)) if integer_ids else [row[0] for row in rows]
+        self.manufacturers = _Dictionary()
+        self.memory_types = _Dictionary()
+        self.manufacturer_codes = array('I', (self.manufacturers.encode(row[1]) for row in rows))
+        self.memory_type_codes = array('I', (self.memory_types.encode(row[2]) for row in rows))
+        self.memory = array('d', (_NULL if row[3] is None else row[3] for row in rows))
+        self.price = array('d', (_NULL if row[4] is None else row[4] for row in rows))
+        self.manufacturer_postings = self._postings(self.manufacturer_codes, len(self.manufacturers.values))
+        self.memory_type_postings = self._postings(self.memory_type_codes, len(self.memory_types.values))
+        self.memory_order, self.memory_sorted = self._sorted_order(self.memory)
+        self.price_order, self.price_sorted = self._sorted_order(self.price)
+        self.price_nulls = array('i', (position for position, value in enumerate(self.price) if value != value))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _postings(codes, count):
+        postings = [array('i') for _ in range(count)]
+        for position, code in enumerate(codes):
+            postings[code].append(position)
+        return postings
+
+    @staticmethod
+    def _sorted_order(column):
+        order = array('i', sorted((position for position, value in enumerate(column) if value == value),
+                                  key=column.__getitem__))
+        return order, array('d', (column[position] for position in order))
+
+    def row(self, card_id):
+        """The card's (id, manufacturer, memory_type, memory_gb, price_usd), or None"""
+        position = bisect_left(self.ids, card_id)
+        if position == len(self.ids) or self.ids[position] != card_id:
+            return None
+        memory = self.memory[position]
+        price = self.price[position]
+        return (card_id, self.manufacturers.values[self.manufacturer_codes[position]],
+                self.memory_types.values[self.memory_type_codes[position]],
+                None if memory != memory else int(memory), None if price != price else price)
+
+    def rows(self):
+        """The snapshot's cards as (id, manufacturer, memory_type, memory_gb, price_usd)"""
+        for card_id in self.ids:
+            yield self.row(card_id)
+
+    def select(self, filters, after_id, limit, excluded):
+        """Ids (descending) of up to limit matching cards below after_id.
+
+        Picks the cheapest access path: walking the positions (all, or one
+        posting list) downward from the cursor stops after limit matches,
+        while a narrow memory/price range is read from its sorted order and
+        then sorted by id. Every other filter is checked on the columns.
+        """
+        size = len(self.ids)
+        end = size if after_id is None else bisect_left(self.ids, after_id)
+        manufacturer = memory_type = None
+        if filters.get('manufacturer'):
+            manufacturer = self.manufacturers.codes.get(filters['manufacturer'])
+            if manufacturer is None:
+                return []
+        if filters.get('memory_type'):
+            memory_type = self.memory_types.codes.get(filters['memory_type'])
+            if memory_type is None:
+                return []
+        memory_min = filters.get('memory_min')
+        memory_max = filters.get('memory_max')
+        price_min = filters.get('price_min')
+        price_max = filters.get('price_max')
+        memory_range = memory_min is not None or memory_max is not None
+        price_range = price_min is not None or price_max is not None
+        # Bounds converted the way the database queries convert them
+        memory_min = -math.inf if memory_min is None else int(memory_min)
+        memory_max = math.inf if memory_max is None else int(memory_max)
+        price_min = -math.inf if price_min is None else float(price_min)
+        price_max = math.inf if price_max is None else float(price_max)
+
+        manufacturer_codes = self.manufacturer_codes
+        memory_type_codes = self.memory_type_codes
+        memory = self.memory
+        price = self.price
+        ids = self.ids
+
+        def matches(position):
+            if manufacturer is not None and manufacturer_codes[position] != manufacturer:
+                return False
+            if memory_type is not None and memory_type_codes[position] != memory_type:
+                return False
+            if memory_range and not memory_min <= memory[position] <= memory_max:
+                return False
+            value = price[position]
+            # NaN (no price) passes price filters, as in the database queries
+            if price_range and value == value and not price_min <= value <= price_max:
+                return False
+            return not excluded or ids[position] not in excluded
+
+        # Ordered paths: every position, or the shortest posting list
+        ordered = None
+        for code, postings in ((manufacturer, self.manufacturer_postings),
+                               (memory_type, self.memory_type_postings)):
+            if code is not None and (ordered is None or len(postings[code]) < len(ordered)):
+                ordered = postings[code]
+        ordered_size = size if ordered is None else len(ordered)
+        # Range paths: a slice of a sorted order (plus NULL prices)
+        ranged = []
+        if memory_range:
+            low = bisect_left(self.memory_sorted, memory_min)
+            high = bisect_right(self.memory_sorted, memory_max)
+            ranged.append((high - low, self.memory_order, low, high, ()))
+        if price_range:
+            low = bisect_left(self.price_sorted, price_min)
+            high = bisect_right(self.price_sorted, price_max)
+            ranged.append((high - low + len(self.price_nulls), self.price_order, low, high, self.price_nulls))
+        best_range = min(ranged, key=lambda path: path[0]) if ranged else None
+
+        # Walking in id order visits about limit / selectivity positions
+        if best_range is None or min(ordered_size, limit * size / max(best_range[0], 1)) <= best_range[0]:
+            if ordered is None:
+                positions = range(end - 1, -1, -1)
+            else:
+                positions = (ordered[index] for index in range(bisect_left(ordered, end) - 1, -1, -1))
+            found = []
+            for position in positions:
+                if matches(position):
+                    found.append(ids[position])
+                    if len(found) >= limit:
+                        break
+            return found
+        _, order, low, high, extra = best_range
+        positions = [position for position in order[low:high] if position < end and matches(position)]
+        positions.extend(position for position in extra if position < end and matches(position))
+        positions.sort(reverse=True)
+        return [ids[position] for position in positions[:limit]]
+
+
+def _row_matches(row, filters):
+    """Whether an (id, manufacturer, memory_type, memory_gb, price_usd) row matches filters"""
+    _, manufacturer, memory_type, memory, price = row
+    if filters.get('manufacturer') and manufacturer != filters['manufacturer']:
+        return False
+    if filters.get('memory_type') and memory_type != filters['memory_type']:
+        return False
+    if filters.get('memory_min') is not None and (memory is None or memory < int(filters['memory_min'])):
+        return False
+    if filters.get('memory_max') is not None and (memory is None or memory > int(filters['memory_max'])):
+        return False
+    # Cards without a price pass price filters, as in the database queries
+    if price is not None:
+        if filters.get('price_min') is not None and price < float(filters['price_min']):
+            return False
+        if filters.get('price_max') is not None and price > float(filters['price_max']):
+            return False
+    return True
+
+
+class ColumnarIndex:
+    """Filter columns of one backend's cards, held in memory and kept fresh
+    by polling updated_at.
+
+    db:               backend with changed_since(..., fields), read_by_ids()
+                      and a write generation
+    integer_ids:      True for MySQL ids, False for MongoDB ObjectId strings
+    fold:             key manufacturer and memory_type are compared by, as
+                      the database's collation does (None: exact values)
+    refresh_interval: seconds between polls for rows changed since the last one
+    reload_interval:  seconds between full reloads, which also drop cards
+                      deleted by other processes
+
+    A background thread (started by the first listing) loads the snapshot,
+    then polls changed rows into an overlay that is merged into a new
+    snapshot once it grows large. Listings it answers fetch their payloads
+    with read_by_ids, which re-applies the filters, so a card that changed
+    since the last poll is never returned wrongly; cards that vanish or stop
+    matching are skipped and the page is selected again. Until the first
+    load, and after a write through this process until the next poll, the
+    listing is left to the database (read_all() returns None).
+    """
+
+    def __init__(self, name, db, integer_ids, fold=None, refresh_interval=5.0, reload_interval=600.0):
+        self.name = name
+        self.db = db
+        self.integer_ids = integer_ids
+        self.fold = fold
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self._snapshot = None
+        self._overlay = {}     # id -> row, changed since the snapshot was built
+        self._missing = set()  # ids a payload fetch no longer found (until the next reload)
+        self._watermark = None
+        self._generation = None
+        self._reload_at = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._served = 0
+        self._fallbacks = 0
+        self._loads = 0
+        self._refreshed_at = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name=f'columnar-{self.name}', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._snapshot is None or time.monotonic() >= self._reload_at:
+                    self.reload()
+                else:
+                    self.refresh()
+            except Exception as e:
+                print(f"Error refreshing the {self.name} columnar index: {e}")
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def _row(self, record):
+        card_id = record['id'] if self.integer_ids else str(record['_id'])
+        price = record.get('price_usd')
+        return (card_id, self._folded(record.get('manufacturer')), self._folded(record.get('memory_type')),
+                record.get('memory_gb'), None if price is None else float(price))
+
+    def _folded(self, value):
+        return self.fold(value) if self.fold and isinstance(value, str) else value
+
+    def _changed_rows(self, since):
+        """Rows changed at or after `since` (every row for None), oldest first"""
+        updated_at, after_id = since, 0 if self.integer_ids else None
+        if since is not None and self.integer_ids:
+            # MySQL's changed_since starts after (updated_at, after_id)
+            updated_at, after_id = since - timedelta(microseconds=1), 0
+        while True:
+            batch = self.db.changed_since(updated_at, after_id, fields=INDEX_COLUMNS)
+            yield from batch
+            if len(batch) < BULK_BATCH_SIZE:
+                return
+            last = batch[-1]
+            updated_at = last.get('updated_at')
+            after_id = last['id'] if self.integer_ids else last['_id']
+
+    def reload(self):
+        """Build a new snapshot from every row"""
+        generation = self.db.generation
+        started = time.perf_counter()
+        rows = []
+        watermark = None
+        for record in self._changed_rows(None):
+            rows.append(self._row(record))
+            if record.get('updated_at') is not None and (watermark is None or record['updated_at'] > watermark):
+                watermark = record['updated_at']
+        snapshot = _Snapshot(rows, self.integer_ids)
+        with self._lock:
+            self._snapshot, self._overlay, self._missing = snapshot, {}, set()
+            self._watermark = watermark
+            self._generation = generation
+            self._loads += 1
+            self._refreshed_at = time.time()
+        self._reload_at = time.monotonic() + self.reload_interval
+        print(f"{self.name} columnar index loaded: {len(snapshot)} cards "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    def refresh(self):
+        """Merge rows changed since the last poll into the overlay"""
+        generation = self.db.generation
+        since = None if self._watermark is None else self._watermark - REFRESH_OVERLAP
+        with self._lock:
+            snapshot, overlay = self._snapshot, self._overlay
+        changed = {}
+        watermark = self._watermark
+        for record in self._changed_rows(since):
+            row = self._row(record)
+            # The overlap re-reads rows already held; only real changes are kept
+            if overlay.get(row[0], snapshot.row(row[0])) != row:
+                changed[row[0]] = row
+            if record.get('updated_at') is not None and (watermark is None or record['updated_at'] > watermark):
+                watermark = record['updated_at']
+        with self._lock:
+            snapshot = self._snapshot
+            if changed:
+                # Replaced, not mutated, so running selects keep a consistent view
+                self._overlay = {**self._overlay, **changed}
+                self._missing = self._missing - changed.keys()
+            overlay = self._overlay
+            self._watermark = watermark
+            self._generation = generation
+            self._refreshed_at = time.time()
+        if len(overlay) > max(MIN_OVERLAY_ROWS, OVERLAY_FRACTION * len(snapshot)):
+            self._rebuild(snapshot, overlay)
+
+    def _rebuild(self, snapshot, overlay):
+        """Fold the overlay into a new snapshot"""
+        rows = {row[0]: row for row in snapshot.rows()}
+        rows.update(overlay)
+        with self._lock:
+            missing = set(self._missing)
+        rebuilt = _Snapshot([row for card_id, row in rows.items() if card_id not in missing], self.integer_ids)
+        with self._lock:
+            # Rows polled while rebuilding stay in the overlay
+            self._overlay = {card_id: row for card_id, row in self._overlay.items() if overlay.get(card_id) != row}
+            self._snapshot = rebuilt
+
+    def select(self, filters, limit, after_id=None):
+        """Ids (descending) of up to limit cards matching filters below after_id,
+        from the snapshot and the overlay
+        """
+        with self._lock:
+            snapshot, overlay, missing = self._snapshot, self._overlay, self._missing
+        if self.fold:
+            # Held folded, so compared the way the database compares them
+            filters = dict(filters)
+            for key in ('manufacturer', 'memory_type'):
+                if filters.get(key):
+                    filters[key] = self._folded(filters[key])
+        excluded = overlay.keys() | missing if overlay or missing else None
+        found = snapshot.select(filters, after_id, limit, excluded)
+        if overlay:
+            changed = sorted((card_id for card_id, row in overlay.items()
+                              if card_id not in missing and (after_id is None or card_id < after_id)
+                              and _row_matches(row, filters)), reverse=True)
+            found = sorted(found + changed[:limit], reverse=True)[:limit]
+        return found
+
+    def read_all(self, filters, limit, after_id=None, fields=None):
+        """Cards for a filtered listing page, or None when the database should
+        answer it (search, no filters, index not loaded yet or behind a write)
+        """
+        if not filters or any(key not in INDEX_FILTERS for key in filters):
+            return None
+        self._start()
+        if after_id is not None and not self.integer_ids:
+            after_id = after_id.lower()
+        if self._snapshot is None or self.db.generation != self._generation:
+            self._wake.set()
+            self._count(served=False)
+            return None
+        for _ in range(MAX_FETCH_ATTEMPTS):
+            with phase('index'):
+                ids = self.select(filters, limit, after_id)
+            if not ids:
+                self._count(served=True)
+                return []
+            cards = self.db.read_by_ids(ids, filters, fields)
+            if len(cards) == len(ids):
+                self._count(served=True)
+                return cards
+            # Changed or deleted since the last poll: skip them until it catches up
+            found = {card['id'] for card in cards}
+            with self._lock:
+                self._missing = self._missing | {card_id for card_id in ids if card_id not in found}
+            self._wake.set()
+        self._count(served=False)
+        return None
+
+    def _count(self, served):
+        with self._lock:
+            if served:
+                self._served += 1
+            else:
+                self._fallbacks += 1
+
+    def stats(self):
+        """Rows held, overlay size, age and how many listings were served"""
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'loaded': snapshot is not None,
+                'rows': len(snapshot) if snapshot is not None else 0,
+                'overlay_rows': len(self._overlay),
+                'missing_rows': len(self._missing),
+                'age_s': round(time.time() - self._refreshed_at, 3) if self._refreshed_at else None,
+                'loads': self._loads,
+                'served': self._served,
+                'fallbacks': self._fallbacks,
+            }
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,150 @@
+"""
+Negotiated response compression (gzip, plus brotli / zstd when installed)
+"""
+import gzip
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_LEVEL,
+    COMPRESSION_ZSTD_LEVEL
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Mimetypes worth compressing (streamed responses are left alone)
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css',
+                          'text/csv', 'application/javascript', 'text/javascript')
+
+
+def available_encodings():
+    """Content-Encodings this process can produce, most preferred first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def negotiate(accept_encodings):
+    """Pick a Content-Encoding from a request's parsed Accept-Encoding header.
+    Ties in client preference go to the better compressor; returns None for
+    an uncompressed response.
+    """
+    return accept_encodings.best_match(available_encodings())
+
+
+def compress(data, encoding):
+    """Compress bytes with the configured level for `encoding`"""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL)
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_LEVEL)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def should_compress(response):
+    """Whether a response is eligible for compression at all"""
+    return (response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def encode(data, encoding):
+    """Return (body, content_encoding) for data and a negotiated encoding.
+    Bodies below COMPRESSION_MIN_SIZE are left uncompressed (encoding None).
+    """
+    if encoding is None or len(data) < COMPRESSION_MIN_SIZE:
+        return data, None
+    return compress(data, encoding), encoding
+
+
+def compress_response(response, accept_encodings):
+    """Compress an eligible response body in place for the negotiated encoding"""
+    if not should_compress(response):
+        return response
+    body, content_encoding = encode(response.get_data(), negotiate(accept_encodings))
+    set_encoded_body(response, body, content_encoding)
+    return response
+
+
+def set_encoded_body(response, body, content_encoding):
+    """Replace a response body with already encoded bytes"""
+    response.set_data(body)
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    response.vary.add('Accept-Encoding')
+
+
+class PrecompressedCache:
+    """Small LRU of finished response bodies keyed by (ETag, encoding).
+
+    ETags already change with the backend's data version, so superseded
+    entries simply age out; ttl (seconds, 0 for none) bounds how long any
+    body is served for.
+    """
+
+    def __init__(self, max_entries=16, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (etag, encoding) -> (body, content_encoding, expires)
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+
+    def get(self, etag, encoding):
+        """(body, content_encoding) cached for a negotiated encoding, or None"""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get((etag, encoding))
+            if entry is None:
+                self._misses += 1
+                return None
+            body, content_encoding, expires = entry
+            if expires and expires < time.monotonic():
+                del self._entries[(etag, encoding)]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end((etag, encoding))
+            self._hits += 1
+            return body, content_encoding
+
+    def put(self, etag, encoding, body, content_encoding):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[(etag, encoding)] = (body, content_encoding, expires)
+            self._entries.move_to_end((etag, encoding))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(body) for body, _, _ in self._entries.values()),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'expirations': self._expirations,
+            }
@@ -14,3 +14,117 @@ MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'graphics_cards_db')
 MONGODB_HOST = os.getenv('MONGODB_HOST', 'localhost')
 MONGODB_PORT = int(os.getenv('MONGODB_PORT', 27017))
 MONGODB_DATABASE = os.getenv('MONGODB_DATABASE', 'graphics_cards_db')
+
+# MySQL connection pool
+MYSQL_POOL_MIN_SIZE = int(os.getenv('MYSQL_POOL_MIN_SIZE', 1))
+MYSQL_POOL_MAX_SIZE = int(os.getenv('MYSQL_POOL_MAX_SIZE', 10))
+MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 10))
+MYSQL_POOL_MAX_IDLE = float(os.getenv('MYSQL_POOL_MAX_IDLE', 300))
+MYSQL_POOL_PING_INTERVAL = float(os.getenv('MYSQL_POOL_PING_INTERVAL', 1))
+
+# MySQL read replicas ("host[:port]" list, comma separated; empty reads from MYSQL_HOST)
+MYSQL_REPLICAS = os.getenv('MYSQL_REPLICAS', '')
+MYSQL_REPLICA_STRATEGY = os.getenv('MYSQL_REPLICA_STRATEGY', 'round_robin')
+MYSQL_REPLICA_STICKY_SECONDS = float(os.getenv('MYSQL_REPLICA_STICKY_SECONDS', 5))
+MYSQL_REPLICA_MAX_LAG = float(os.getenv('MYSQL_REPLICA_MAX_LAG', 5))
+MYSQL_REPLICA_CHECK_INTERVAL = float(os.getenv('MYSQL_REPLICA_CHECK_INTERVAL', 5))
+
+# API pagination
+API_DEFAULT_PAGE_SIZE = int(os.getenv('API_DEFAULT_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 1000))
+
+# Bulk inserts (rows per INSERT statement / insert_many call)
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))
+# Most rows a filter-based PATCH/DELETE may change (requests may ask for less)
+BULK_MAX_AFFECTED_ROWS = int(os.getenv('BULK_MAX_AFFECTED_ROWS', 1000))
+
+# Bulk import (import_cards.py, POST /api/*/cards/import): rows per batch
+# transaction, batches queued per target before reading pauses, and how many
+# rejected rows are listed in the report (all of them are counted)
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+IMPORT_MAX_PENDING_BATCHES = int(os.getenv('IMPORT_MAX_PENDING_BATCHES', 4))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv('IMPORT_MAX_REPORTED_ERRORS', 100))
+
+# Group commit for single-card creates (POST /api/*/cards): 'off' writes each
+# card on its own; 'wait' queues it and answers with its id once the batch that
+# holds it is committed; 'async' answers 202 at once with a status URL. A batch
+# is flushed after WRITE_QUEUE_MAX_DELAY_MS or at WRITE_QUEUE_MAX_BATCH cards;
+# creates beyond WRITE_QUEUE_MAX_PENDING queued cards are refused with 503, as
+# are 'wait' creates not committed within WRITE_QUEUE_WAIT_TIMEOUT seconds.
+# Async statuses are kept for the last WRITE_QUEUE_STATUS_ENTRIES creates, in
+# the process that queued them: gunicorn.conf.py runs one worker in async mode
+WRITE_QUEUE_MODE = os.getenv('WRITE_QUEUE_MODE', 'off')
+WRITE_QUEUE_MAX_BATCH = int(os.getenv('WRITE_QUEUE_MAX_BATCH', 500))
+WRITE_QUEUE_MAX_DELAY_MS = float(os.getenv('WRITE_QUEUE_MAX_DELAY_MS', 5))
+WRITE_QUEUE_MAX_PENDING = int(os.getenv('WRITE_QUEUE_MAX_PENDING', 10000))
+WRITE_QUEUE_STATUS_ENTRIES = int(os.getenv('WRITE_QUEUE_STATUS_ENTRIES', 10000))
+WRITE_QUEUE_WAIT_TIMEOUT = float(os.getenv('WRITE_QUEUE_WAIT_TIMEOUT', 10))
+
+# Price history (GET /api/*/cards/<id>/prices): monthly MySQL partitions created
+# ahead of time, months of raw snapshots kept (0 = forever; hourly/daily rollups
+# are always kept), and the most points one response returns
+PRICE_HISTORY_PARTITIONS_AHEAD = int(os.getenv('PRICE_HISTORY_PARTITIONS_AHEAD', 12))
+PRICE_HISTORY_RETENTION_MONTHS = int(os.getenv('PRICE_HISTORY_RETENTION_MONTHS', 0))
+PRICE_HISTORY_MAX_POINTS = int(os.getenv('PRICE_HISTORY_MAX_POINTS', 5000))
+
+# In-memory columnar index of the filter columns (see columnar_index.py):
+# filtered listings pick their ids from it and fetch only those rows. Changed
+# rows are polled every COLUMNAR_INDEX_REFRESH_INTERVAL seconds; a full reload
+# every COLUMNAR_INDEX_RELOAD_INTERVAL seconds also drops deleted cards
+COLUMNAR_INDEX_ENABLED = os.getenv('COLUMNAR_INDEX_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+COLUMNAR_INDEX_REFRESH_INTERVAL = float(os.getenv('COLUMNAR_INDEX_REFRESH_INTERVAL', 5))
+COLUMNAR_INDEX_RELOAD_INTERVAL = float(os.getenv('COLUMNAR_INDEX_RELOAD_INTERVAL', 600))
+
+# Listing result cache (set RESULT_CACHE_MAX_ENTRIES=0 to disable)
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 256))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', 30))
+
+# Full-text search: shorter words fall back to substring matching
+# (keep in sync with MySQL's innodb_ft_min_token_size)
+SEARCH_MIN_TOKEN_LENGTH = int(os.getenv('SEARCH_MIN_TOKEN_LENGTH', 3))
+
+# Rows fetched per round trip when streaming listings/exports
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+
+# Cross-backend comparison (/api/compare/cards)
+COMPARE_MAX_WORKERS = int(os.getenv('COMPARE_MAX_WORKERS', 4))
+COMPARE_TIMEOUT = float(os.getenv('COMPARE_TIMEOUT', 5))
+
+# Conditional GET: seconds a backend's data version (newest id, updated_at
+# and tombstone on MySQL; row count and updated_at on MongoDB) is reused
+# between polls, and the Cache-Control max-age of listings
+ETAG_VERSION_TTL = float(os.getenv('ETAG_VERSION_TTL', 1))
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 0))
+
+# Response compression: bodies smaller than COMPRESSION_MIN_SIZE bytes are sent
+# as is; brotli/zstd are used when the brotli/zstandard packages are installed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_LEVEL = int(os.getenv('COMPRESSION_BROTLI_LEVEL', 5))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv('COMPRESSION_ZSTD_LEVEL', 3))
+# Finished bodies of unfiltered listings kept per data version and encoding
+PRECOMPRESSED_CACHE_ENTRIES = int(os.getenv('PRECOMPRESSED_CACHE_ENTRIES', 16))
+# Seconds a finished body may be served for (0 for no expiry)
+PRECOMPRESSED_CACHE_TTL = float(os.getenv('PRECOMPRESSED_CACHE_TTL', 30))
+
+# MySQL -> MongoDB sync (sync.py): rows per batch, seconds between runs in
+# --loop mode, seconds re-read behind the watermark (a row's updated_at is
+# set when its statement runs, so a transaction committing later lands behind
+# a watermark already passed; this should exceed the longest write
+# transaction), and how long tombstones of synced deletes are kept
+SYNC_BATCH_SIZE = int(os.getenv('SYNC_BATCH_SIZE', 1000))
+SYNC_INTERVAL = float(os.getenv('SYNC_INTERVAL', 5))
+SYNC_OVERLAP_SECONDS = int(os.getenv('SYNC_OVERLAP_SECONDS', 10))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 7))
+
+# Production server (gunicorn.conf.py): worker processes (0 = one per CPU core),
+# threads per worker, and seconds a stopping worker gets to finish its requests.
+# Every worker has its own MySQL pool, so keep WEB_THREADS + COMPARE_MAX_WORKERS
+# within MYSQL_POOL_MAX_SIZE and WEB_WORKERS * MYSQL_POOL_MAX_SIZE within the
+# server's max_connections
+WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:5000')
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 0))
+WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', 30))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
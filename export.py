@@ -0,0 +1,70 @@
+"""
+Streaming CSV / NDJSON encoders for card exports, with optional gzip
+"""
+import csv
+import io
+import json
+import zlib
+
+from config import COMPRESSION_GZIP_LEVEL, STREAM_BATCH_SIZE
+from serialization import json_default
+
+# Export format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def csv_chunks(rows, fields, batch_size=STREAM_BATCH_SIZE):
+    """Yield CSV text: a header line of `fields`, then batch_size rows per chunk.
+    Missing and null values are written as empty cells.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    # The header alone still makes a valid (empty) export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(rows, batch_size=STREAM_BATCH_SIZE):
+    """Yield newline-delimited JSON, batch_size cards per chunk"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, default=json_default))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks, level=COMPRESSION_GZIP_LEVEL):
+    """Gzip a stream of text chunks incrementally, yielding compressed bytes
+    as the compressor produces them (one gzip member for the whole stream)
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(rows, export_format, fields, gzip=False):
+    """Encoded chunks of an export: text for plain exports, bytes when gzipped"""
+    if export_format == 'csv':
+        chunks = csv_chunks(rows, fields)
+    else:
+        chunks = ndjson_chunks(rows)
+    return gzip_chunks(chunks) if gzip else chunks
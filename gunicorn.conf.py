@@ -0,0 +1,43 @@
+"""
+Gunicorn settings for serving the app on every core.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+WEB_WORKERS processes (default: one per CPU core) each run WEB_THREADS
+threads. Workers import wsgi.py after forking, so every process creates its own
+backends and pools. On SIGTERM/SIGINT (or a HUP reload) workers stop
+accepting connections, get WEB_GRACEFUL_TIMEOUT seconds to finish in-flight
+requests, then close their MySQL/MongoDB pools in worker_exit.
+
+WRITE_QUEUE_MODE=async keeps ticket statuses in the process that queued the
+card, so it runs a single worker (WEB_WORKERS=0 then means 1, more is refused).
+"""
+import multiprocessing
+
+from config import WEB_BIND, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT, WEB_GRACEFUL_TIMEOUT, WRITE_QUEUE_MODE
+
+if WRITE_QUEUE_MODE == 'async' and WEB_WORKERS > 1:
+    raise RuntimeError(f"WRITE_QUEUE_MODE=async needs a single worker (WEB_WORKERS={WEB_WORKERS}): "
+                       "ticket statuses are kept in the worker that accepted the create")
+
+bind = WEB_BIND
+workers = 1 if WRITE_QUEUE_MODE == 'async' else WEB_WORKERS or multiprocessing.cpu_count()
+threads = WEB_THREADS
+worker_class = 'gthread'
+timeout = WEB_TIMEOUT
+graceful_timeout = WEB_GRACEFUL_TIMEOUT
+# Load the app in each worker, after the fork, rather than once in the master
+preload_app = False
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s started; backends connect on first request", worker.pid)
+
+
+def worker_exit(server, worker):
+    """Close the exiting worker's connection pools once its requests are drained"""
+    from app import close_app
+    application = getattr(worker, 'wsgi', None)
+    if application is not None:
+        close_app(application)
+        server.log.info("Worker %s closed its database connections", worker.pid)
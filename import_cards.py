@@ -0,0 +1,95 @@
+"""
+Bulk import of graphics cards from CSV or NDJSON files into MySQL and/or MongoDB.
+
+Rows are streamed from the file, validated and coerced against the
+graphics_cards schema, and written in IMPORT_BATCH_SIZE batches to every
+target in parallel. Progress is checkpointed next to the file, so re-running
+the same command after a failure continues where it stopped.
+
+Usage:
+    python import_cards.py cards.csv                  # both databases
+    python import_cards.py cards.ndjson.gz --target mysql
+    python import_cards.py - --format ndjson < cards.ndjson
+    python import_cards.py cards.csv --restart        # ignore an existing checkpoint
+"""
+import argparse
+import gzip
+import io
+import os
+import sys
+
+from config import IMPORT_BATCH_SIZE, IMPORT_MAX_PENDING_BATCHES
+from importer import IMPORT_FORMATS, BulkImporter, format_for, read_records
+
+
+def open_source(path):
+    """Text stream over a file (gzip-compressed when it ends in .gz) or stdin"""
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def _describe(report):
+    written = ', '.join(f"{name} {count}" for name, count in report['written'].items())
+    return (f"{report['records']} records ({report['skipped']} skipped, {report['rejected']} rejected), "
+            f"written: {written} in {report['elapsed_s']}s ({report['rows_per_s']} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help="CSV/NDJSON file (optionally .gz), or - for stdin")
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='default: from the file extension')
+    parser.add_argument('--target', choices=('both', 'mysql', 'mongodb'), default='both')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--max-pending', type=int, default=IMPORT_MAX_PENDING_BATCHES,
+                        help='batches queued per target before reading pauses')
+    parser.add_argument('--checkpoint', help='default: <path>.checkpoint.json (none for stdin)')
+    parser.add_argument('--restart', action='store_true', help='discard an existing checkpoint first')
+    args = parser.parse_args()
+
+    import_format = args.format or format_for(args.path)
+    if import_format is None:
+        parser.error('cannot tell the format from the file name; pass --format')
+    checkpoint = args.checkpoint or (None if args.path == '-' else args.path + '.checkpoint.json')
+    if args.restart and checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    targets = {}
+    if args.target in ('both', 'mysql'):
+        from mysql_db import MySQLDatabase
+        targets['mysql'] = MySQLDatabase()
+    if args.target in ('both', 'mongodb'):
+        from mongodb_db import MongoDBDatabase
+        targets['mongodb'] = MongoDBDatabase()
+    try:
+        importer = BulkImporter(
+            targets, batch_size=args.batch_size, max_pending=args.max_pending,
+            checkpoint_path=checkpoint, source=os.path.abspath(args.path) if args.path != '-' else '-'
+        )
+        if importer.resumed:
+            print(f"Resuming from {checkpoint}: " +
+                  ', '.join(f"{name} after record {position}" for name, position in importer.position.items()))
+        with open_source(args.path) as stream:
+            report = importer.run(read_records(stream, import_format),
+                                  on_progress=lambda progress: print(f"... {_describe(progress)}"))
+    finally:
+        for db in targets.values():
+            db.close()
+
+    for error in report['errors']:
+        print(f"[X] record {error['record']}: {error['error']}")
+    if report['rejected'] > len(report['errors']):
+        print(f"    ... and {report['rejected'] - len(report['errors'])} more rejected records")
+    if 'error' in report:
+        print(f"[X] Import stopped: {report['error']}")
+        print(f"    {_describe(report)}")
+        if checkpoint:
+            print(f"    Re-run the same command to resume (checkpoint: {checkpoint})")
+        sys.exit(1)
+    print(f"[OK] {_describe(report)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Streaming bulk import of graphics cards from CSV / NDJSON into MySQL and/or MongoDB
+"""
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from config import IMPORT_BATCH_SIZE, IMPORT_MAX_PENDING_BATCHES, IMPORT_MAX_REPORTED_ERRORS
+from card_schema import coerce_card
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def read_records(stream, import_format):
+    """Yield the records of a text stream: CSV rows (first line is the header)
+    or NDJSON objects. Lines that are not valid JSON objects are yielded as
+    ValueError instances so they are rejected without stopping the import.
+    """
+    if import_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+            continue
+        yield record if isinstance(record, dict) else ValueError('Expected a JSON object')
+
+
+def format_for(name, content_type=None):
+    """Guess the import format from a file name or Content-Type, or None"""
+    name = (name or '').lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (content_type or '') \
+            or 'jsonl' in (content_type or ''):
+        return 'ndjson'
+    return None
+
+
+class BulkImporter:
+    """Writes a stream of records to one or more backends in batches.
+
+    targets:       {name: database}, e.g. {'mysql': MySQLDatabase(), ...}
+    batch_size:    valid cards per create_many call (one transaction on MySQL)
+    max_pending:   batches queued per target; reading waits while a target is
+                   this far behind, so memory stays bounded by the batch size
+    checkpoint_path: JSON file recording, per target, how many records have
+                   been written; an existing checkpoint for the same source is
+                   resumed, and the file is removed once the import completes
+    source:        identifies the input in the checkpoint (e.g. its path)
+    skip:          records to skip for every target (resuming an upload)
+
+    Each target has its own writer thread, so the backends are written in
+    parallel while the next batches are read and validated.
+    """
+
+    def __init__(self, targets, batch_size=IMPORT_BATCH_SIZE, max_pending=IMPORT_MAX_PENDING_BATCHES,
+                 checkpoint_path=None, source=None, skip=0):
+        if not targets:
+            raise ValueError('At least one import target is required')
+        self.targets = dict(targets)
+        self.batch_size = max(1, int(batch_size))
+        self.max_pending = max(1, int(max_pending))
+        self.checkpoint_path = checkpoint_path
+        self.source = source
+        # Records handled per target: written, rejected or skipped
+        self.position = {name: max(0, int(skip)) for name in self.targets}
+        self.resumed = False
+        self._load_checkpoint()
+        self.written = {name: 0 for name in self.targets}
+        self.records = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors = []
+        self.failure = None
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('source') != self.source:
+            raise ValueError(f"Checkpoint {self.checkpoint_path} belongs to {checkpoint.get('source')}, "
+                             f"not {self.source}")
+        for name in self.targets:
+            self.position[name] = max(self.position[name], checkpoint['targets'].get(name, 0))
+        self.resumed = True
+
+    def _save_checkpoint(self):
+        """Atomically record the per-target positions (called with _lock held)"""
+        if not self.checkpoint_path:
+            return
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'source': self.source, 'targets': self.position,
+                       'updated_at': datetime.utcnow().isoformat()}, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _reject(self, position, error):
+        with self._lock:
+            self.rejected += 1
+            if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+                self.errors.append({'record': position, 'error': error})
+
+    def _write_batches(self, name, batches):
+        """Writer thread: create_many each queued batch, then advance the checkpoint"""
+        db = self.targets[name]
+        start_after = self.position[name]
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if self._failed.is_set():
+                continue  # keep draining so the reader never blocks on a dead target
+            end, cards = batch
+            cards = [(position, card) for position, card in cards if position > start_after]
+            try:
+                results = db.create_many([card for _, card in cards]) if cards else []
+            except Exception as e:
+                with self._lock:
+                    self.failure = f"{name}: {e}"
+                self._failed.set()
+                continue
+            rejected = [(position, result['error'])
+                        for (position, _), result in zip(cards, results) if 'error' in result]
+            for position, error in rejected:
+                self._reject(position, f"{name}: {error}")
+            with self._lock:
+                self.written[name] += len(cards) - len(rejected)
+                self.position[name] = max(self.position[name], end)
+                self._save_checkpoint()
+
+    def run(self, records, on_progress=None, progress_interval=5.0):
+        """Import every record; returns the report (see report()).
+        on_progress(report) is called about every progress_interval seconds.
+        Failed writes stop the import with the checkpoint at the last batch
+        every target committed; see report()['error'].
+        """
+        start = time.perf_counter()
+        queues = {name: queue.Queue(maxsize=self.max_pending) for name in self.targets}
+        writers = [threading.Thread(target=self._write_batches, args=(name, queues[name]),
+                                    name=f'import-{name}', daemon=True)
+                   for name in self.targets]
+        for writer in writers:
+            writer.start()
+        resume_from = min(self.position.values())
+        pending = []
+        position = 0
+        next_progress = start + progress_interval
+        try:
+            for position, record in enumerate(records, 1):
+                if self._failed.is_set():
+                    break
+                self.records += 1
+                if position <= resume_from:
+                    self.skipped += 1
+                    continue
+                if isinstance(record, Exception):
+                    card, error = None, str(record)
+                else:
+                    card, error = coerce_card(record)
+                if error:
+                    self._reject(position, error)
+                    continue
+                pending.append((position, card))
+                if len(pending) >= self.batch_size:
+                    self._dispatch(queues, position, pending)
+                    pending = []
+                if on_progress and time.perf_counter() >= next_progress:
+                    on_progress(self.report(time.perf_counter() - start))
+                    next_progress += progress_interval
+            if not self._failed.is_set() and position > resume_from:
+                # Last partial batch; also moves the checkpoint past trailing rejects
+                self._dispatch(queues, position, pending)
+        finally:
+            for batches in queues.values():
+                batches.put(None)
+            for writer in writers:
+                writer.join()
+        report = self.report(time.perf_counter() - start)
+        if self.failure is None and self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return report
+
+    def _dispatch(self, queues, end, cards):
+        # Blocks while a target has max_pending batches queued (backpressure)
+        for batches in queues.values():
+            batches.put((end, cards))
+
+    def report(self, elapsed):
+        """Progress / final statistics of the import"""
+        with self._lock:
+            processed = self.records - self.skipped
+            report = {
+                'records': self.records,
+                'skipped': self.skipped,
+                'rejected': self.rejected,
+                'written': dict(self.written),
+                # Records handled per target; pass as skip to resume elsewhere
+                'position': dict(self.position),
+                'elapsed_s': round(elapsed, 3),
+                'rows_per_s': round(processed / elapsed, 1) if elapsed else None,
+                'errors': list(self.errors),
+            }
+            if self.failure:
+                report['error'] = self.failure
+            return report
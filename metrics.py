@@ -0,0 +1,179 @@
+"""
+Per-request phase timing and Prometheus-style request metrics
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Phase name -> accumulated seconds, for the request being handled
+_request_phases = contextvars.ContextVar('request_phases', default=None)
+
+
+def start_request():
+    """Begin collecting phase timings for the current request"""
+    _request_phases.set({})
+
+
+def request_phases():
+    """Phase timings (seconds) recorded so far for the current request"""
+    return dict(_request_phases.get() or {})
+
+
+@contextmanager
+def phase(name):
+    """Time a block and add it to the current request's `name` phase.
+    Outside a request (scripts, worker threads) the timing is discarded.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def record_phase(name, seconds):
+    """Add time measured elsewhere (e.g. on a worker thread) to a phase"""
+    phases = _request_phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+def timed(name):
+    """Decorator form of phase() for database methods"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(phases, total):
+    """Server-Timing header value, durations in milliseconds"""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(entries)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (not thread-safe on its own)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """[(le label, cumulative count)] including +Inf"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((f"{bound:g}", running))
+        result.append(('+Inf', running + self.counts[-1]))
+        return result
+
+
+class RequestMetrics:
+    """Request counts, error counts and latency histograms per route/backend"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}   # (route, backend, method, status) -> count
+        self._errors = {}     # (route, backend, method) -> count
+        self._latency = {}    # (route, backend) -> Histogram
+        self._phases = {}     # (route, backend, phase) -> Histogram
+
+    def observe(self, route, backend, method, status, duration, phases):
+        """Record one finished request"""
+        with self._lock:
+            key = (route, backend, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 500:
+                key = (route, backend, method)
+                self._errors[key] = self._errors.get(key, 0) + 1
+            self._latency.setdefault((route, backend), Histogram()).observe(duration)
+            for name, seconds in phases.items():
+                self._phases.setdefault((route, backend, name), Histogram()).observe(seconds)
+
+    def render(self, gauges=None, histograms=None):
+        """Prometheus text exposition of the collected metrics.
+        gauges: optional {metric name: (help, value or {labels tuple: value})}
+        histograms: optional {metric name: (help, {labels tuple: Histogram})}
+        """
+        lines = []
+        with self._lock:
+            lines += _header('http_requests_total', 'counter', 'Requests handled')
+            for (route, backend, method, status), count in sorted(self._requests.items()):
+                labels = _labels(route=route, backend=backend, method=method, status=status)
+                lines.append(f"http_requests_total{labels} {count}")
+            lines += _header('http_request_errors_total', 'counter', 'Requests answered with a 5xx status')
+            for (route, backend, method), count in sorted(self._errors.items()):
+                lines.append(f"http_request_errors_total{_labels(route=route, backend=backend, method=method)} {count}")
+            lines += _header('http_request_duration_seconds', 'histogram', 'Request latency')
+            for (route, backend), histogram in sorted(self._latency.items()):
+                lines += _histogram_lines('http_request_duration_seconds', histogram,
+                                          route=route, backend=backend)
+            lines += _header('http_request_phase_seconds', 'histogram',
+                             'Time spent per request phase (db, convert, serialize)')
+            for (route, backend, name), histogram in sorted(self._phases.items()):
+                lines += _histogram_lines('http_request_phase_seconds', histogram,
+                                          route=route, backend=backend, phase=name)
+        for name, (help_text, value) in (gauges or {}).items():
+            lines += _header(name, 'gauge', help_text)
+            if isinstance(value, dict):
+                for label_items, sample in sorted(value.items()):
+                    lines.append(f"{name}{_labels(**dict(label_items))} {_number(sample)}")
+            else:
+                lines.append(f"{name} {_number(value)}")
+        for name, (help_text, samples) in (histograms or {}).items():
+            lines += _header(name, 'histogram', help_text)
+            for label_items, histogram in sorted(samples.items(), key=lambda item: item[0]):
+                lines += _histogram_lines(name, histogram, **dict(label_items))
+        return '\n'.join(lines) + '\n'
+
+
+def _header(name, metric_type, help_text):
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+
+
+def _labels(**labels):
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _histogram_lines(name, histogram, **labels):
+    lines = []
+    for bound, count in histogram.cumulative():
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return f"{value:g}" if isinstance(value, float) else str(value)
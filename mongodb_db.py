@@ -1,45 +1,223 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
-from config import MONGODB_HOST, MONGODB_PORT, MONGODB_DATABASE
-from datetime import datetime
+from bson import ObjectId
+from bson.regex import Regex
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from bson.errors import InvalidDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, DocumentTooLarge, OperationFailure
+import config
+from config import BULK_BATCH_SIZE, STREAM_BATCH_SIZE, PRICE_HISTORY_RETENTION_MONTHS
+from card_schema import CARD_FIELDS, PRICE_BANDS, coerce_card, price_band_facets
+from serialization import mongodb_shape_stages
+from price_history import rollup_keys
+from metrics import timed
+from text_search import fulltext_search, mongodb_text_query, search_words, substring_search, substring_terms
+from datetime import date, datetime
+import re
+import threading
+import time
+
+# Version of the indexes create_indexes builds; bump it whenever they change
+# so the next setup_databases.py run (or first worker) rebuilds them
+SCHEMA_VERSION = 3
+SCHEMA_NAME = 'graphics_cards'
 
 class MongoDBDatabase:
-    def __init__(self):
+    # Write errors caused by the documents themselves, not by the server or
+    # connection (per-document insert errors are reported by create_many)
+    DATA_ERRORS = (InvalidDocument, DocumentTooLarge)
+    
+    def __init__(self, ensure_schema=True, settings=None):
+        # Overrides of the config.py connection and ETAG_VERSION_TTL values
+        self.settings = settings or {}
         self.client = None
         self.db = None
         self.collection = None
+        self.price_history = None
+        self.price_rollups = None
+        # Bumped on every write so caches can tell when results went stale
+        self.generation = 0
+        self._generation_lock = threading.Lock()
+        self._version = None  # (generation, computed at, token) for version()
         self.connect()
-        self.create_indexes()
+        if ensure_schema:
+            self.ensure_schema()
+    
+    def _setting(self, name):
+        """A config.py value, or its override from settings"""
+        return self.settings[name] if name in self.settings else getattr(config, name)
     
     def connect(self):
         """Establish connection to MongoDB database"""
         try:
             self.client = MongoClient(
-                host=MONGODB_HOST,
-                port=MONGODB_PORT,
+                host=self._setting('MONGODB_HOST'),
+                port=self._setting('MONGODB_PORT'),
                 serverSelectionTimeoutMS=5000
             )
             # Test connection
             self.client.admin.command('ping')
-            self.db = self.client[MONGODB_DATABASE]
+            self.db = self.client[self._setting('MONGODB_DATABASE')]
             self.collection = self.db['graphics_cards']
-            print(f"Connected to MongoDB database: {MONGODB_DATABASE}")
+            self.price_history = self.db['price_history']
+            self.price_rollups = self.db['price_rollups']
+            print(f"Connected to MongoDB database: {self._setting('MONGODB_DATABASE')}")
         except ConnectionFailure as e:
             print(f"Error connecting to MongoDB: {e}")
             raise
     
+    def schema_version(self):
+        """Index version recorded by the last migration (0 if never migrated)"""
+        marker = self.db['schema_version'].find_one({'_id': SCHEMA_NAME})
+        return marker['version'] if marker else 0
+    
+    def ensure_schema(self):
+        """Migrate unless the recorded index version is current.
+        Returns True if a migration ran.
+        """
+        current = self.schema_version()
+        if current >= SCHEMA_VERSION:
+            return False
+        print(f"MongoDB schema is at version {current}, migrating to {SCHEMA_VERSION} "
+              "(run 'python setup_databases.py' to do this before starting workers)")
+        return self.migrate()
+    
+    def migrate(self):
+        """Create the indexes and record SCHEMA_VERSION if they all succeeded"""
+        if not self.create_indexes():
+            return False
+        self.db['schema_version'].update_one(
+            {'_id': SCHEMA_NAME},
+            {'$set': {'version': SCHEMA_VERSION, 'applied_at': datetime.utcnow()}},
+            upsert=True
+        )
+        print(f"MongoDB schema migrated to version {SCHEMA_VERSION}")
+        return True
+    
     def create_indexes(self):
-        """Create indexes for better query performance"""
+        """Create indexes for better query performance; returns whether all succeeded"""
         try:
             # Create indexes on commonly queried fields
             self.collection.create_index("manufacturer")
             self.collection.create_index("memory_gb")
             self.collection.create_index("price_usd")
             self.collection.create_index("name")
+            self.collection.create_index("updated_at")
+            # Pages changed documents in order for the columnar index
+            self.collection.create_index([("updated_at", 1), ("_id", 1)], name="updated_at_id")
+            # Equality -> sort -> range indexes for the listing query: every
+            # manufacturer/memory_type combination reads documents in _id
+            # order and checks the memory/price ranges on the index keys
+            self.collection.create_index(
+                [("manufacturer", 1), ("memory_type", 1), ("_id", -1), ("memory_gb", 1), ("price_usd", 1)],
+                name="mfr_type_sort"
+            )
+            self.collection.create_index(
+                [("manufacturer", 1), ("_id", -1), ("memory_gb", 1), ("price_usd", 1)],
+                name="mfr_sort"
+            )
+            self.collection.create_index(
+                [("memory_type", 1), ("_id", -1), ("memory_gb", 1), ("price_usd", 1)],
+                name="type_sort"
+            )
+            # Documents copied from MySQL by sync.py are keyed by the MySQL id
+            self.collection.create_index(
+                "mysql_id",
+                name="mysql_id",
+                unique=True,
+                partialFilterExpression={"mysql_id": {"$exists": True}}
+            )
+            # Full-text search; 'none' keeps product codes unstemmed
+            self.collection.create_index(
+                [("name", "text"), ("manufacturer", "text"), ("model", "text")],
+                name="text_search",
+                default_language="none"
+            )
+            self.create_price_collections()
             print("MongoDB indexes created successfully")
+            return True
         except Exception as e:
             print(f"Error creating indexes: {e}")
+            return False
+    
+    def create_price_collections(self):
+        """Create the price history collections: price_history, a time-series
+        collection of snapshots (a plain collection before MongoDB 5.0), and
+        price_rollups with hourly and daily summaries
+        """
+        if 'price_history' not in self.db.list_collection_names():
+            options = {}
+            if PRICE_HISTORY_RETENTION_MONTHS > 0:
+                options['expireAfterSeconds'] = PRICE_HISTORY_RETENTION_MONTHS * 31 * 86400
+            try:
+                self.db.create_collection(
+                    'price_history',
+                    timeseries={'timeField': 'recorded_at', 'metaField': 'card_id', 'granularity': 'hours'},
+                    **options
+                )
+            except OperationFailure as e:
+                print(f"Time-series collections are not supported ({e}); using a regular price_history collection")
+                self.db.create_collection('price_history')
+        # Default name: MongoDB 6.3+ creates this index itself for time-series collections
+        self.price_history.create_index([("card_id", 1), ("recorded_at", 1)])
+        self.price_rollups.create_index(
+            [("card_id", 1), ("granularity", 1), ("bucket_start", 1)], name="card_bucket", unique=True
+        )
+    
+    def _record_prices(self, prices):
+        """Append a snapshot per (card _id, price) and fold the prices into the
+        hourly and daily rollups. The card write has already succeeded, so a
+        failure here is reported without failing it.
+        """
+        if not prices:
+            return
+        recorded_at = datetime.utcnow()
+        try:
+            self.price_history.insert_many(
+                [{'card_id': card_id, 'recorded_at': recorded_at, 'price_usd': price} for card_id, price in prices],
+                ordered=False
+            )
+            rollups = [
+                UpdateOne(
+                    {'card_id': card_id, 'granularity': granularity, 'bucket_start': start},
+                    {'$setOnInsert': {'open_usd': price}, '$set': {'close_usd': price},
+                     '$min': {'min_usd': price}, '$max': {'max_usd': price},
+                     '$inc': {'sum_usd': price, 'changes': 1}},
+                    upsert=True
+                )
+                for card_id, price in prices if price is not None
+                for granularity, start in rollup_keys(recorded_at)
+            ]
+            if rollups:
+                self.price_rollups.bulk_write(rollups, ordered=False)
+        except Exception as e:
+            print(f"Error recording price history: {e}")
     
+    @timed('db')
+    def read_prices(self, card_id, start, end, bucket, limit):
+        """A card's prices from start (inclusive) to end (exclusive): raw
+        snapshots, or hourly/daily rollups for bucket 'hour'/'day'. Returns
+        (price in effect at start, at most limit + 1 rows in time order).
+        """
+        card_id = ObjectId(card_id)
+        try:
+            before = next(self.price_history.find(
+                {'card_id': card_id, 'recorded_at': {'$lt': start}}, {'_id': 0, 'price_usd': 1}
+            ).sort('recorded_at', -1).limit(1), None)
+            if bucket == 'raw':
+                rows = self.price_history.find(
+                    {'card_id': card_id, 'recorded_at': {'$gte': start, '$lt': end}},
+                    {'_id': 0, 'recorded_at': 1, 'price_usd': 1}
+                ).sort('recorded_at', 1).limit(limit + 1)
+            else:
+                rows = self.price_rollups.find(
+                    {'card_id': card_id, 'granularity': bucket, 'bucket_start': {'$gte': start, '$lt': end}},
+                    {'_id': 0, 'card_id': 0, 'granularity': 0}
+                ).sort('bucket_start', 1).limit(limit + 1)
+            return (before['price_usd'] if before else None), list(rows)
+        except Exception as e:
+            print(f"Error reading price history: {e}")
+            raise
+    
+    @timed('db')
     def create(self, data):
         """Create a new graphics card document"""
         try:
@@ -48,105 +226,466 @@ class MongoDBDatabase:
             data['updated_at'] = datetime.utcnow()
             
             result = self.collection.insert_one(data)
+            self._record_prices([(result.inserted_id, data.get('price_usd'))])
+            self._bump_generation()
             return str(result.inserted_id)
         except Exception as e:
             print(f"Error creating document: {e}")
             raise
     
-    def read_all(self, filters=None):
+    @timed('db')
+    def create_many(self, cards, batch_size=None):
+        """Create many graphics card documents with unordered insert_many calls
+        of at most batch_size documents. Returns one result per input card, in
+        order: {'index': i, 'id': new_id} or {'index': i, 'error': message}
+        """
+        batch_size = max(1, int(batch_size or BULK_BATCH_SIZE))
+        results = [None] * len(cards)
+        docs = []
+        positions = []
+        now = datetime.utcnow()
+        for index, data in enumerate(cards):
+            # Typed the same way as on MySQL, so both store the same values
+            doc, error = coerce_card(data)
+            if error:
+                results[index] = {'index': index, 'error': error}
+                continue
+            # BSON has no plain date type; store it the way the dashboard sends it
+            if isinstance(doc.get('release_date'), date) and not isinstance(doc['release_date'], datetime):
+                doc['release_date'] = doc['release_date'].isoformat()
+            doc['created_at'] = now
+            doc['updated_at'] = now
+            docs.append(doc)
+            positions.append(index)
+        
+        try:
+            for start in range(0, len(docs), batch_size):
+                chunk = docs[start:start + batch_size]
+                chunk_positions = positions[start:start + batch_size]
+                failed = {}
+                try:
+                    self.collection.insert_many(chunk, ordered=False)
+                except BulkWriteError as e:
+                    for write_error in e.details.get('writeErrors', []):
+                        failed[write_error['index']] = write_error.get('errmsg', 'Write failed')
+                except Exception as e:
+                    print(f"Error creating documents: {e}")
+                    raise
+                # insert_many assigns _id client side, so every document has one
+                for offset, index in enumerate(chunk_positions):
+                    if offset in failed:
+                        results[index] = {'index': index, 'error': failed[offset]}
+                    else:
+                        results[index] = {'index': index, 'id': str(chunk[offset]['_id'])}
+                # Each card's history starts with its initial price
+                self._record_prices([(doc['_id'], doc.get('price_usd'))
+                                     for offset, doc in enumerate(chunk) if offset not in failed])
+        finally:
+            if docs:
+                self._bump_generation()
+        return results
+    
+    def upsert_synced(self, docs):
+        """Insert or replace documents copied from MySQL, matched on mysql_id,
+        with one unordered bulk_write. Returns (upserted, modified) counts.
+        """
+        if not docs:
+            return 0, 0
+        requests = [UpdateOne({'mysql_id': doc['mysql_id']}, {'$set': doc}, upsert=True) for doc in docs]
+        try:
+            result = self.collection.bulk_write(requests, ordered=False)
+        except Exception as e:
+            print(f"Error upserting synced documents: {e}")
+            raise
+        if result.upserted_count or result.modified_count:
+            self._bump_generation()
+        return result.upserted_count, result.modified_count
+    
+    def delete_synced(self, mysql_ids):
+        """Delete the copies of MySQL rows that were deleted; returns the count"""
+        if not mysql_ids:
+            return 0
+        try:
+            result = self.collection.delete_many({'mysql_id': {'$in': list(mysql_ids)}})
+        except Exception as e:
+            print(f"Error deleting synced documents: {e}")
+            raise
+        if result.deleted_count:
+            self._bump_generation()
+        return result.deleted_count
+    
+    def _bump_generation(self):
+        """Record that the collection changed"""
+        with self._generation_lock:
+            self.generation += 1
+    
+    @timed('db')
+    def version(self):
+        """Cheap token that changes whenever the collection changes.
+        Combines the write generation (writes through this process) with the
+        document count and latest updated_at (writes from anywhere else).
+        The lookup is reused for ETAG_VERSION_TTL seconds.
+        """
+        generation = self.generation
+        cached = self._version
+        if cached and cached[0] == generation and time.monotonic() - cached[1] < self._setting('ETAG_VERSION_TTL'):
+            return cached[2]
+        try:
+            # Count from collection metadata; latest updated_at off its index
+            count = self.collection.estimated_document_count()
+            latest = next(self.collection.find({}, {'updated_at': 1}).sort('updated_at', -1).limit(1), {})
+        except Exception as e:
+            print(f"Error reading collection version: {e}")
+            raise
+        token = f"{generation}:{count}:{latest.get('updated_at')}"
+        self._version = (generation, time.monotonic(), token)
+        return token
+    
+    def _build_query(self, filters):
+        """Translate a filters dict into a MongoDB query document"""
+        query = {}
+        if filters:
+            if fulltext_search(filters):
+                query['$text'] = {'$search': mongodb_text_query(search_words(filters['search']))}
+            elif filters.get('search'):
+                # Short terms are not in the text index (see text_search)
+                for term in substring_terms(filters['search']):
+                    pattern = re.escape(term)
+                    query.setdefault('$and', []).append({'$or': [
+                        {'name': Regex(pattern, 'i')},
+                        {'manufacturer': Regex(pattern, 'i')},
+                        {'model': Regex(pattern, 'i')}
+                    ]})
+            if filters.get('manufacturer'):
+                query['manufacturer'] = filters['manufacturer']
+            if filters.get('memory_type'):
+                query['memory_type'] = filters['memory_type']
+            mem_min = filters.get('memory_min')
+            mem_max = filters.get('memory_max')
+            if mem_min is not None or mem_max is not None:
+                query['memory_gb'] = {}
+                if mem_min is not None:
+                    query['memory_gb']['$gte'] = int(mem_min)
+                if mem_max is not None:
+                    query['memory_gb']['$lte'] = int(mem_max)
+            price_min = filters.get('price_min')
+            price_max = filters.get('price_max')
+            if price_min is not None or price_max is not None:
+                price_cond = {}
+                if price_min is not None:
+                    price_cond['$gte'] = float(price_min)
+                if price_max is not None:
+                    price_cond['$lte'] = float(price_max)
+                query.setdefault('$and', []).append(
+                    {'$or': [{'price_usd': price_cond}, {'price_usd': None}]}
+                )
+        return query
+    
+    def _projection(self, fields):
+        """$project document for a list of card fields; None returns whole documents"""
+        if fields is None:
+            return None
+        unknown = [field for field in fields if field not in CARD_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        # _id is always returned and exposed as 'id'
+        return {field: 1 for field in fields if field != 'id'} or {'_id': 1}
+    
+    def _listing_cursor(self, filters=None, limit=None, after_id=None, after_relevance=None,
+                        fields=None, batch_size=None):
+        """Open the listing cursor shared by read_all and iter_all.
+        Documents come out of the pipeline already shaped as API cards.
+        """
+        query = self._build_query(filters)
+        projection = self._projection(fields)
+        if '$text' in query:
+            # textScore is only filterable after it has been projected
+            pipeline = [
+                {'$match': query},
+                {'$addFields': {'relevance': {'$meta': 'textScore'}}}
+            ]
+            if after_id is not None:
+                if after_relevance is not None:
+                    pipeline.append({'$match': {'$or': [
+                        {'relevance': {'$lt': float(after_relevance)}},
+                        {'relevance': float(after_relevance), '_id': {'$lt': ObjectId(after_id)}}
+                    ]}})
+                else:
+                    pipeline.append({'$match': {'_id': {'$lt': ObjectId(after_id)}}})
+            pipeline.append({'$sort': {'relevance': -1, '_id': -1}})
+            if projection is not None:
+                projection = dict(projection, relevance=1)
+        else:
+            if after_id is not None:
+                query['_id'] = {'$lt': ObjectId(after_id)}
+            pipeline = [{'$match': query}, {'$sort': {'_id': -1}}]
+        if limit is not None:
+            pipeline.append({'$limit': int(limit)})
+        if projection is not None:
+            pipeline.append({'$project': projection})
+        pipeline.extend(mongodb_shape_stages(fields))
+        if batch_size:
+            return self.collection.aggregate(pipeline, batchSize=int(batch_size))
+        return self.collection.aggregate(pipeline)
+    
+    @timed('db')
+    def read_all(self, filters=None, limit=None, after_id=None, after_relevance=None,
+                 fields=None):
         """Read graphics cards with optional search and filters.
         filters: dict with optional keys: search, manufacturer, memory_type,
                  memory_min, memory_max, price_min, price_max
+        limit: maximum number of documents to return (None returns every match)
+        after_id: keyset cursor, only documents with _id < after_id are returned
+        after_relevance: text score of the cursor document for full-text
+                 searches, which are ordered by relevance (returned as 'relevance')
+        fields: fields to return, from card_schema.CARD_FIELDS (None for all)
         """
+        if fulltext_search(filters) and after_id is not None and after_relevance is None:
+            # The cursor comes from a page of the substring fallback
+            filters = substring_search(filters)
         try:
-            query = {}
-            if filters:
-                if filters.get('search'):
-                    from bson.regex import Regex
-                    term = filters['search'].strip()
-                    if term:
-                        query['$or'] = [
-                            {'name': Regex(term, 'i')},
-                            {'manufacturer': Regex(term, 'i')},
-                            {'model': Regex(term, 'i')}
-                        ]
-                if filters.get('manufacturer'):
-                    query['manufacturer'] = filters['manufacturer']
-                if filters.get('memory_type'):
-                    query['memory_type'] = filters['memory_type']
-                mem_min = filters.get('memory_min')
-                mem_max = filters.get('memory_max')
-                if mem_min is not None or mem_max is not None:
-                    query['memory_gb'] = {}
-                    if mem_min is not None:
-                        query['memory_gb']['$gte'] = int(mem_min)
-                    if mem_max is not None:
-                        query['memory_gb']['$lte'] = int(mem_max)
-                price_min = filters.get('price_min')
-                price_max = filters.get('price_max')
-                if price_min is not None or price_max is not None:
-                    price_cond = {}
-                    if price_min is not None:
-                        price_cond['$gte'] = float(price_min)
-                    if price_max is not None:
-                        price_cond['$lte'] = float(price_max)
-                    query.setdefault('$and', []).append(
-                        {'$or': [{'price_usd': price_cond}, {'price_usd': None}]}
-                    )
-            cursor = self.collection.find(query).sort('_id', -1)
-            cards = []
-            for doc in cursor:
-                doc['id'] = str(doc['_id'])
-                del doc['_id']
-                if 'created_at' in doc:
-                    doc['created_at'] = doc['created_at'].isoformat()
-                if 'updated_at' in doc:
-                    doc['updated_at'] = doc['updated_at'].isoformat()
-                cards.append(doc)
+            cards = list(self._listing_cursor(filters, limit, after_id, after_relevance, fields))
+            if not cards and after_id is None and fulltext_search(filters):
+                # $text matches whole words only: try the words as substrings
+                cards = list(self._listing_cursor(substring_search(filters), limit, None, None, fields))
             return cards
         except Exception as e:
             print(f"Error reading documents: {e}")
             raise
     
-    def read_one(self, card_id):
+    @timed('db')
+    def read_by_ids(self, ids, filters=None, fields=None):
+        """Read the cards with the given ids that still match filters, newest
+        first (for listings selected by the columnar index)
+        """
+        if not ids:
+            return []
+        try:
+            query = self._build_query(filters)
+            query['_id'] = {'$in': [ObjectId(card_id) for card_id in ids]}
+            pipeline = [{'$match': query}, {'$sort': {'_id': -1}}]
+            projection = self._projection(fields)
+            if projection is not None:
+                pipeline.append({'$project': projection})
+            pipeline.extend(mongodb_shape_stages(fields))
+            return list(self.collection.aggregate(pipeline))
+        except Exception as e:
+            print(f"Error reading documents: {e}")
+            raise
+    
+    def changed_since(self, updated_at=None, after_id=None, limit=None, fields=None):
+        """Documents changed after the (updated_at, _id) position, in that
+        order (for the columnar index). None starts from the beginning, and
+        updated_at without after_id includes documents changed at updated_at.
+        """
+        if updated_at is None:
+            # Documents without updated_at sort first
+            query = {} if after_id is None else {'$or': [
+                {'updated_at': None, '_id': {'$gt': after_id}}, {'updated_at': {'$ne': None}}
+            ]}
+        elif after_id is None:
+            query = {'updated_at': {'$gte': updated_at}}
+        else:
+            query = {'$or': [{'updated_at': {'$gt': updated_at}}, {'updated_at': updated_at, '_id': {'$gt': after_id}}]}
+        projection = None if fields is None else {field: 1 for field in fields if field != 'id'}
+        try:
+            cursor = self.collection.find(query, projection).sort([('updated_at', 1), ('_id', 1)])
+            return list(cursor.limit(int(limit or BULK_BATCH_SIZE)))
+        except Exception as e:
+            print(f"Error reading changed documents: {e}")
+            raise
+    
+    @timed('db')
+    def facets(self, filters=None):
+        """Grouped counts and price statistics for the cards matching filters,
+        computed in one $facet aggregation (same shape as MySQLDatabase.facets)
+        """
+        def grouped(field):
+            return [
+                {'$group': {'_id': f'${field}', 'count': {'$sum': 1}}},
+                {'$sort': {'_id': 1}},
+                {'$project': {'_id': 0, 'value': '$_id', 'count': 1}},
+            ]
+        
+        boundaries = [float('-inf')] + list(PRICE_BANDS) + [float('inf')]
+        pipeline = [
+            {'$match': self._build_query(filters)},
+            {'$facet': {
+                'summary': [{'$group': {
+                    '_id': None,
+                    'total': {'$sum': 1},
+                    'min_price': {'$min': '$price_usd'},
+                    'max_price': {'$max': '$price_usd'},
+                    'avg_price': {'$avg': '$price_usd'},
+                }}],
+                'manufacturers': grouped('manufacturer'),
+                'memory_types': grouped('memory_type'),
+                'memory_gb': grouped('memory_gb'),
+                # Documents without a numeric price fall into the default bucket
+                'price_bands': [{'$bucket': {
+                    'groupBy': '$price_usd',
+                    'boundaries': boundaries,
+                    'default': 'unpriced',
+                    'output': {'count': {'$sum': 1}},
+                }}],
+            }},
+        ]
+        try:
+            result = next(self.collection.aggregate(pipeline))
+        except Exception as e:
+            print(f"Error computing facets: {e}")
+            raise
+        summary = result['summary'][0] if result['summary'] else {}
+        if not summary.get('total') and fulltext_search(filters):
+            # Count what the listing's substring fallback returns
+            return self.facets(substring_search(filters))
+        band_counts = {}
+        unpriced = 0
+        for bucket in result['price_bands']:
+            if bucket['_id'] == 'unpriced':
+                unpriced = bucket['count']
+            else:
+                band_counts[boundaries.index(bucket['_id'])] = bucket['count']
+        return {
+            'total': summary.get('total', 0),
+            'price': {
+                'min': summary.get('min_price'),
+                'max': summary.get('max_price'),
+                'avg': round(summary['avg_price'], 2) if summary.get('avg_price') is not None else None,
+                'unpriced': unpriced,
+            },
+            'manufacturers': sorted(result['manufacturers'], key=lambda row: -row['count']),
+            'memory_types': sorted(result['memory_types'], key=lambda row: -row['count']),
+            'memory_gb': result['memory_gb'],
+            'price_bands': price_band_facets(band_counts),
+        }
+    
+    def iter_all(self, filters=None, limit=None, after_id=None, after_relevance=None,
+                 fields=None, batch_size=None):
+        """Yield the cards read_all would return without building a list.
+        Documents are fetched from the server batch_size at a time.
+        """
+        batch_size = max(1, int(batch_size or STREAM_BATCH_SIZE))
+        if fulltext_search(filters) and after_id is not None and after_relevance is None:
+            filters = substring_search(filters)
+        try:
+            cursor = self._listing_cursor(filters, limit, after_id, after_relevance, fields,
+                                          batch_size)
+            with cursor:
+                first = next(cursor, None)
+                if first is not None:
+                    yield first
+                    yield from cursor
+                    return
+            if after_id is None and fulltext_search(filters):
+                # Nothing matched the whole words: stream the substring fallback
+                cursor = self._listing_cursor(substring_search(filters), limit, None, None, fields,
+                                              batch_size)
+                with cursor:
+                    yield from cursor
+        except Exception as e:
+            print(f"Error streaming documents: {e}")
+            raise
+    
+    @timed('db')
+    def read_one(self, card_id, fields=None):
         """Read a single graphics card by ID"""
         try:
-            from bson import ObjectId
-            doc = self.collection.find_one({'_id': ObjectId(card_id)})
-            if doc:
-                doc['id'] = str(doc['_id'])
-                del doc['_id']
-                # Convert datetime objects to strings
-                if 'created_at' in doc:
-                    doc['created_at'] = doc['created_at'].isoformat()
-                if 'updated_at' in doc:
-                    doc['updated_at'] = doc['updated_at'].isoformat()
-            return doc
+            pipeline = [{'$match': {'_id': ObjectId(card_id)}}]
+            projection = self._projection(fields)
+            if projection is not None:
+                pipeline.append({'$project': projection})
+            pipeline.extend(mongodb_shape_stages(fields))
+            return next(self.collection.aggregate(pipeline), None)
         except Exception as e:
             print(f"Error reading document: {e}")
             raise
     
+    @timed('db')
     def update(self, card_id, data):
         """Update a graphics card document"""
         try:
-            from bson import ObjectId
             # Add updated_at timestamp
             data['updated_at'] = datetime.utcnow()
             
-            result = self.collection.update_one(
+            if data.get('price_usd') is None:
+                result = self.collection.update_one(
+                    {'_id': ObjectId(card_id)},
+                    {'$set': data}
+                )
+                self._bump_generation()
+                return result.modified_count > 0
+            # Read the replaced price in the same operation to see whether it changed
+            before = self.collection.find_one_and_update(
                 {'_id': ObjectId(card_id)},
-                {'$set': data}
+                {'$set': data},
+                projection={'price_usd': 1},
+                return_document=ReturnDocument.BEFORE
             )
-            return result.modified_count > 0
+            if before is not None and before.get('price_usd') != data['price_usd']:
+                self._record_prices([(before['_id'], data['price_usd'])])
+            self._bump_generation()
+            # updated_at always changes, so every matched card is modified
+            return before is not None
         except Exception as e:
             print(f"Error updating document: {e}")
             raise
     
+    @timed('db')
+    def update_where(self, filters, changes, max_rows, dry_run=False):
+        """Apply `changes` (validated with card_schema.validate_changes) to every
+        card matching filters with one update_many. Nothing is changed if more
+        than max_rows cards match, or for a dry run. Without a transaction the
+        cap is checked against the count taken just before the update, and
+        the cards whose price changes are the ones found just before it.
+        Returns {'matched': n, 'affected': n, 'applied': bool}.
+        """
+        query = self._build_query(filters)
+        try:
+            matched = self.collection.count_documents(query)
+            if dry_run or matched > max_rows:
+                return {'matched': matched, 'affected': 0, 'applied': False}
+            repriced = []
+            if 'price_usd' in changes:
+                repriced = [doc['_id'] for doc in self.collection.find(
+                    {'$and': [query, {'price_usd': {'$ne': changes['price_usd']}}]}, {'_id': 1}
+                )]
+            result = self.collection.update_many(
+                query, {'$set': dict(changes, updated_at=datetime.utcnow())}
+            )
+        except Exception as e:
+            print(f"Error updating documents: {e}")
+            raise
+        self._record_prices([(card_id, changes['price_usd']) for card_id in repriced])
+        if result.modified_count:
+            self._bump_generation()
+        return {'matched': result.matched_count, 'affected': result.modified_count, 'applied': True}
+    
+    @timed('db')
+    def delete_where(self, filters, max_rows, dry_run=False):
+        """Delete every card matching filters with one delete_many. Nothing is
+        deleted if more than max_rows cards match, or for a dry run.
+        Returns {'matched', 'affected', 'applied'}.
+        """
+        query = self._build_query(filters)
+        try:
+            matched = self.collection.count_documents(query)
+            if dry_run or matched > max_rows:
+                return {'matched': matched, 'affected': 0, 'applied': False}
+            result = self.collection.delete_many(query)
+        except Exception as e:
+            print(f"Error deleting documents: {e}")
+            raise
+        if result.deleted_count:
+            self._bump_generation()
+        return {'matched': matched, 'affected': result.deleted_count, 'applied': True}
+    
+    @timed('db')
     def delete(self, card_id):
         """Delete a graphics card document"""
         try:
-            from bson import ObjectId
             result = self.collection.delete_one({'_id': ObjectId(card_id)})
+            self._bump_generation()
             return result.deleted_count > 0
         except Exception as e:
             print(f"Error deleting document: {e}")
@@ -1,54 +1,208 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
 import pymysql
-from config import MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+import config
+from config import (
+    BULK_BATCH_SIZE, STREAM_BATCH_SIZE, PRICE_HISTORY_PARTITIONS_AHEAD, PRICE_HISTORY_RETENTION_MONTHS
+)
+from mysql_pool import ConnectionPool
+from mysql_replicas import (
+    REPLICA_ERRORS, Replica, ReplicaRouter, note_replica_version, parse_endpoints, replica_version
+)
+from metrics import timed
+from card_schema import CARD_FIELDS, INSERT_COLUMNS, PRICE_BANDS, coerce_card, price_band_facets
+from serialization import mysql_select_list
+from price_history import expired_partitions, month_partitions, rollup_keys
+from text_search import (
+    fulltext_search, like_pattern, mysql_boolean_query, search_words, substring_search, substring_terms
+)
+
+# Indexes added to existing tables by create_table (name -> definition).
+# The *_sort indexes follow equality -> sort -> range for the listing query:
+# each equality-filter combination read_all can produce gets an index whose
+# prefix matches it and continues with id, so "ORDER BY id DESC" (and the
+# id < cursor seek) is read straight off the index while the memory/price
+# ranges are checked on the index entries instead of after a filesort.
+SECONDARY_INDEXES = {
+    'ft_search': "FULLTEXT INDEX ft_search (name, manufacturer, model)",
+    'idx_mfr_type_sort': "INDEX idx_mfr_type_sort (manufacturer, memory_type, id, memory_gb, price_usd)",
+    'idx_mfr_sort': "INDEX idx_mfr_sort (manufacturer, id, memory_gb, price_usd)",
+    'idx_type_sort': "INDEX idx_type_sort (memory_type, id, memory_gb, price_usd)",
+    'idx_updated_at': "INDEX idx_updated_at (updated_at)",
+}
+
+# Change timestamps kept to the microsecond, so version() sees two changes
+# within the same second (table -> column definition)
+MICROSECOND_COLUMNS = {
+    'graphics_cards': "updated_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+    'graphics_cards_tombstones': "deleted_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6)",
+}
+
+# Widths of the graphics_cards VARCHAR columns, and the largest INT / DECIMAL(10, 2)
+# values, checked per card by create_many: a value MySQL rejects would roll
+# back the whole batch's transaction
+VARCHAR_LENGTHS = {'name': 255, 'manufacturer': 100, 'model': 100, 'memory_type': 50}
+MAX_INT = 2 ** 31 - 1
+MAX_PRICE = 99999999.99
+
+
+def _column_error(card):
+    """Return an error message if a coerced card does not fit the columns, else None"""
+    for column, length in VARCHAR_LENGTHS.items():
+        if card[column] is not None and len(card[column]) > length:
+            return f"{column} is longer than {length} characters"
+    for column in ('memory_gb', 'core_clock_mhz', 'boost_clock_mhz'):
+        if card[column] is not None and not 0 <= card[column] <= MAX_INT:
+            return f"{column} is out of range"
+    if card['price_usd'] is not None and not 0 <= card['price_usd'] <= MAX_PRICE:
+        return "price_usd is out of range"
+    return None
+
+# Version of the schema create_table builds. Bump it whenever create_table
+# changes: the recorded version then falls behind and the migration runs
+# again (from setup_databases.py, or from the first worker to start)
+SCHEMA_VERSION = 3
+SCHEMA_NAME = 'graphics_cards'
+# Named lock keeping concurrently starting workers from migrating twice
+MIGRATION_LOCK = 'graphics_cards_migration'
+
+# Folds one price snapshot into an hourly/daily rollup row
+PRICE_ROLLUP_SQL = """
+    INSERT INTO price_rollups
+    (card_id, granularity, bucket_start, open_usd, close_usd, min_usd, max_usd, sum_usd, changes)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE close_usd = VALUES(close_usd), min_usd = LEAST(min_usd, VALUES(min_usd)),
+        max_usd = GREATEST(max_usd, VALUES(max_usd)), sum_usd = sum_usd + VALUES(sum_usd),
+        changes = changes + VALUES(changes)
+"""
+
+# Data part of version(): the ends of the id, updated_at and tombstone indexes
+VERSION_SQL = """
+    SELECT (SELECT MAX(id) FROM graphics_cards) AS last_id,
+           (SELECT MAX(updated_at) FROM graphics_cards) AS latest,
+           (SELECT MAX(deleted_at) FROM graphics_cards_tombstones) AS last_deleted
+"""
+
+# Relevance of a full-text match; takes the boolean-mode query string
+RELEVANCE_SQL = "MATCH(name, manufacturer, model) AGAINST (%s IN BOOLEAN MODE)"
 
 class MySQLDatabase:
-    def __init__(self):
-        self.connection = None
+    """graphics_cards on a MySQL primary, with reads optionally spread over replicas.
+    primary: (host, port), default MYSQL_HOST/MYSQL_PORT
+    replicas: [(host, port)] serving read_all/read_one/iter_all/facets,
+              default parsed from MYSQL_REPLICAS (empty: everything on the primary)
+    ensure_schema: migrate the schema if its recorded version is behind
+              SCHEMA_VERSION (a single SELECT when it is current)
+    settings: overrides of the config.py connection, pool, replica and
+              ETAG_VERSION_TTL values (e.g. an app's config)
+    """
+    # Write errors caused by the rows themselves, not by the server or connection
+    DATA_ERRORS = (pymysql.err.IntegrityError, pymysql.err.DataError)
+    
+    def __init__(self, primary=None, replicas=None, ensure_schema=True, settings=None):
+        self.settings = settings or {}
+        self.database = self._setting('MYSQL_DATABASE')
+        self.host, self.port = primary or (self._setting('MYSQL_HOST'), self._setting('MYSQL_PORT'))
+        self.replica_endpoints = parse_endpoints(self._setting('MYSQL_REPLICAS')) if replicas is None else list(replicas)
+        self.pool = None
+        self.replicas = None
+        # Bumped on every write so caches can tell when results went stale
+        self.generation = 0
+        self._generation_lock = threading.Lock()
+        self._version = None  # (generation, computed at, token) for version()
         self.connect()
-        self.create_table()
+        if ensure_schema:
+            self.ensure_schema()
+    
+    def _setting(self, name):
+        """A config.py value, or its override from settings"""
+        return self.settings[name] if name in self.settings else getattr(config, name)
+    
+    def _open_connection(self, host=None, port=None):
+        """Open a new connection to the configured database (on the primary by default)"""
+        return pymysql.connect(
+            host=host or self.host,
+            port=port or self.port,
+            user=self._setting('MYSQL_USER'),
+            password=self._setting('MYSQL_PASSWORD'),
+            database=self.database,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            # Pooled connections must not carry a REPEATABLE READ snapshot
+            # from one borrower to the next
+            autocommit=True,
+            # TIMESTAMP values in UTC, as the naive utcnow() datetimes stored
+            # in MongoDB (and compared against them by sync.py)
+            init_command="SET time_zone = '+00:00'"
+        )
+    
+    def _new_pool(self, connect_func):
+        return ConnectionPool(
+            connect_func,
+            min_size=self._setting('MYSQL_POOL_MIN_SIZE'),
+            max_size=self._setting('MYSQL_POOL_MAX_SIZE'),
+            timeout=self._setting('MYSQL_POOL_TIMEOUT'),
+            max_idle=self._setting('MYSQL_POOL_MAX_IDLE'),
+            ping_interval=self._setting('MYSQL_POOL_PING_INTERVAL')
+        )
     
     def connect(self):
-        """Establish connection to MySQL database"""
-        try:
-            self.connection = pymysql.connect(
-                host=MYSQL_HOST,
-                port=MYSQL_PORT,
-                user=MYSQL_USER,
-                password=MYSQL_PASSWORD,
-                database=MYSQL_DATABASE,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
-            )
-            print(f"Connected to MySQL database: {MYSQL_DATABASE}")
+        """Create the connection pools and open their initial connections"""
+        self.pool = self._new_pool(self._open_connection)
+        self._connect_primary()
+        if self.replica_endpoints:
+            self._connect_replicas()
+    
+    def _connect_replicas(self):
+        """Create a pool per replica; unreachable replicas start out unhealthy"""
+        replicas = []
+        for host, port in self.replica_endpoints:
+            pool = self._new_pool(lambda host=host, port=port: self._open_connection(host, port))
+            try:
+                pool.fill()
+            except pymysql.Error:
+                pass  # reported by the first health check below
+            replicas.append(Replica(host, port, pool))
+        self.replicas = ReplicaRouter(
+            replicas,
+            strategy=self._setting('MYSQL_REPLICA_STRATEGY'),
+            sticky_seconds=self._setting('MYSQL_REPLICA_STICKY_SECONDS'),
+            max_lag=self._setting('MYSQL_REPLICA_MAX_LAG'),
+            check_interval=self._setting('MYSQL_REPLICA_CHECK_INTERVAL')
+        )
+        self.replicas.start()
+        usable = sum(1 for replica in replicas if replica.healthy)
+        print(f"MySQL read replicas: {usable}/{len(replicas)} healthy "
+              f"({self._setting('MYSQL_REPLICA_STRATEGY')}, {', '.join(replica.name for replica in replicas)})")
+    
+    def _connect_primary(self):
+        try:
+            self.pool.fill()
+            print(f"Connected to MySQL database: {self.database} "
+                  f"(pool {self._setting('MYSQL_POOL_MIN_SIZE')}-{self._setting('MYSQL_POOL_MAX_SIZE')})")
         except pymysql.Error as e:
             # If database doesn't exist, try to create it
             if "Unknown database" in str(e) or 1049 in str(e):
-                print(f"Database '{MYSQL_DATABASE}' not found. Attempting to create it...")
+                print(f"Database '{self.database}' not found. Attempting to create it...")
                 try:
                     # Connect without database
                     temp_conn = pymysql.connect(
-                        host=MYSQL_HOST,
-                        port=MYSQL_PORT,
-                        user=MYSQL_USER,
-                        password=MYSQL_PASSWORD,
+                        host=self.host,
+                        port=self.port,
+                        user=self._setting('MYSQL_USER'),
+                        password=self._setting('MYSQL_PASSWORD'),
                         charset='utf8mb4'
                     )
                     with temp_conn.cursor() as cursor:
-                        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_DATABASE} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+                        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
                         temp_conn.commit()
                     temp_conn.close()
-                    print(f"Database '{MYSQL_DATABASE}' created successfully")
+                    print(f"Database '{self.database}' created successfully")
                     # Retry connection
-                    self.connection = pymysql.connect(
-                        host=MYSQL_HOST,
-                        port=MYSQL_PORT,
-                        user=MYSQL_USER,
-                        password=MYSQL_PASSWORD,
-                        database=MYSQL_DATABASE,
-                        charset='utf8mb4',
-                        cursorclass=pymysql.cursors.DictCursor
-                    )
-                    print(f"Connected to MySQL database: {MYSQL_DATABASE}")
+                    self.pool.fill()
+                    print(f"Connected to MySQL database: {self.database}")
                 except Exception as create_error:
                     print(f"Error creating database: {create_error}")
                     print("Please run 'python setup_databases.py' first or create the database manually")
@@ -57,10 +211,85 @@ class MySQLDatabase:
                 print(f"Error connecting to MySQL: {e}")
                 raise
     
-    def create_table(self):
+    @contextmanager
+    def _borrow(self, conn=None):
+        """The given connection, or one borrowed from the pool for the block"""
+        if conn is not None:
+            yield conn
+            return
+        with self.pool.connection() as conn:
+            yield conn
+    
+    def schema_version(self, conn=None):
+        """Schema version recorded by the last migration (0 if never migrated)"""
+        try:
+            with self._borrow(conn) as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT version FROM schema_version WHERE name = %s", (SCHEMA_NAME,))
+                row = cursor.fetchone()
+        except pymysql.err.ProgrammingError as e:
+            if e.args and e.args[0] == 1146:  # no schema_version table yet
+                return 0
+            raise
+        return row['version'] if row else 0
+    
+    def ensure_schema(self):
+        """Migrate unless the recorded schema version is current.
+        Returns True if a migration ran. The migration runs on the connection
+        holding the lock, so it needs no second connection from the pool.
+        """
+        if self.schema_version() >= SCHEMA_VERSION:
+            return False
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (MIGRATION_LOCK, 60))
+                locked = cursor.fetchone()['locked']
+                if locked != 1:
+                    # 0: timed out behind another worker's migration; NULL: error
+                    raise RuntimeError(f"Could not take the '{MIGRATION_LOCK}' lock "
+                                       f"(GET_LOCK returned {locked}); is another migration stuck?")
+                try:
+                    # Another worker may have migrated while we waited
+                    current = self.schema_version(conn)
+                    if current >= SCHEMA_VERSION:
+                        return False
+                    print(f"MySQL schema is at version {current}, migrating to {SCHEMA_VERSION} "
+                          "(run 'python setup_databases.py' to do this before starting workers)")
+                    self.migrate(conn)
+                    return True
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+        except (pymysql.Error, RuntimeError) as e:
+            print(f"Error migrating schema: {e}")
+            raise
+    
+    def migrate(self, conn=None):
+        """Create/upgrade the tables and indexes and record SCHEMA_VERSION
+        (on conn if given, otherwise on connections from the pool)
+        """
+        self.create_table(conn)
+        self.create_price_tables(conn)
+        try:
+            with self._borrow(conn) as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        name VARCHAR(64) PRIMARY KEY,
+                        version INT NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                    ) ENGINE=InnoDB
+                """)
+                cursor.execute(
+                    "REPLACE INTO schema_version (name, version) VALUES (%s, %s)",
+                    (SCHEMA_NAME, SCHEMA_VERSION)
+                )
+        except pymysql.Error as e:
+            print(f"Error recording schema version: {e}")
+            raise
+        print(f"MySQL schema migrated to version {SCHEMA_VERSION}")
+    
+    def create_table(self, conn=None):
         """Create graphics_cards table if it doesn't exist"""
         try:
-            with self.connection.cursor() as cursor:
+            with self._borrow(conn) as conn, conn.cursor() as cursor:
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS graphics_cards (
                         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -74,22 +303,145 @@ class MySQLDatabase:
                         price_usd DECIMAL(10, 2),
                         release_date DATE,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
                         INDEX idx_manufacturer (manufacturer),
                         INDEX idx_memory (memory_gb),
-                        INDEX idx_price (price_usd)
+                        INDEX idx_price (price_usd),
+                        INDEX idx_mfr_type_sort (manufacturer, memory_type, id, memory_gb, price_usd),
+                        INDEX idx_mfr_sort (manufacturer, id, memory_gb, price_usd),
+                        INDEX idx_type_sort (memory_type, id, memory_gb, price_usd),
+                        INDEX idx_updated_at (updated_at),
+                        FULLTEXT INDEX ft_search (name, manufacturer, model)
                     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
                 """)
-                self.connection.commit()
+                # Deleted ids, read by sync.py to delete the synced MongoDB copies
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS graphics_cards_tombstones (
+                        id INT PRIMARY KEY,
+                        deleted_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+                        INDEX idx_deleted_at (deleted_at)
+                    ) ENGINE=InnoDB
+                """)
+                # Tables created by older versions lack the newer indexes
+                cursor.execute("""
+                    SELECT DISTINCT index_name AS name FROM information_schema.statistics
+                    WHERE table_schema = DATABASE() AND table_name = 'graphics_cards'
+                """)
+                existing = {row['name'] for row in cursor.fetchall()}
+                for name, definition in SECONDARY_INDEXES.items():
+                    if name not in existing:
+                        print(f"Adding index '{name}' to graphics_cards...")
+                        cursor.execute(f"ALTER TABLE graphics_cards ADD {definition}")
+                # ...and second-resolution change timestamps
+                for table, definition in MICROSECOND_COLUMNS.items():
+                    column = definition.split()[0]
+                    cursor.execute("""
+                        SELECT datetime_precision AS digits FROM information_schema.columns
+                        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+                    """, (table, column))
+                    if cursor.fetchone()['digits'] < 6:
+                        print(f"Storing {table}.{column} to the microsecond...")
+                        cursor.execute(f"ALTER TABLE {table} MODIFY {definition}")
+                conn.commit()
                 print("MySQL table 'graphics_cards' created/verified successfully")
         except pymysql.Error as e:
             print(f"Error creating table: {e}")
             raise
     
+    def create_price_tables(self, conn=None):
+        """Create the price history tables. price_history takes an append-only
+        snapshot per price change, range-partitioned by month so old months
+        are dropped whole; price_rollups keeps hourly and daily summaries.
+        """
+        try:
+            with self._borrow(conn) as conn, conn.cursor() as cursor:
+                # Every unique key of a partitioned table must hold recorded_at
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS price_history (
+                        card_id INT NOT NULL,
+                        recorded_at DATETIME(3) NOT NULL,
+                        price_usd DECIMAL(10, 2),
+                        PRIMARY KEY (card_id, recorded_at)
+                    ) ENGINE=InnoDB
+                    PARTITION BY RANGE COLUMNS (recorded_at) (
+                        PARTITION pmax VALUES LESS THAN (MAXVALUE)
+                    )
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS price_rollups (
+                        card_id INT NOT NULL,
+                        granularity ENUM('hour', 'day') NOT NULL,
+                        bucket_start DATETIME NOT NULL,
+                        open_usd DECIMAL(10, 2) NOT NULL,
+                        close_usd DECIMAL(10, 2) NOT NULL,
+                        min_usd DECIMAL(10, 2) NOT NULL,
+                        max_usd DECIMAL(10, 2) NOT NULL,
+                        sum_usd DECIMAL(16, 2) NOT NULL,
+                        changes INT NOT NULL,
+                        PRIMARY KEY (card_id, granularity, bucket_start)
+                    ) ENGINE=InnoDB
+                """)
+                conn.commit()
+            print("MySQL price history tables created/verified successfully")
+        except pymysql.Error as e:
+            print(f"Error creating price history tables: {e}")
+            raise
+        self.maintain_price_partitions(conn=conn)
+    
+    def maintain_price_partitions(self, ahead=PRICE_HISTORY_PARTITIONS_AHEAD,
+                                  retention_months=PRICE_HISTORY_RETENTION_MONTHS, conn=None):
+        """Split monthly partitions off pmax through `ahead` months from now and
+        drop those older than retention_months (0 keeps them).
+        Returns {'added': [...], 'dropped': [...]} partition names.
+        """
+        try:
+            with self._borrow(conn) as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT partition_name AS name FROM information_schema.partitions
+                    WHERE table_schema = DATABASE() AND table_name = 'price_history'
+                      AND partition_name IS NOT NULL
+                """)
+                existing = sorted(row['name'] for row in cursor.fetchall() if row['name'] != 'pmax')
+                # New partitions can only be split off the top, above the newest one
+                added = [(name, bound) for name, bound in month_partitions(date.today(), ahead)
+                         if not existing or name > existing[-1]]
+                if added:
+                    definitions = ", ".join(f"PARTITION {name} VALUES LESS THAN ('{bound.isoformat()}')"
+                                            for name, bound in added)
+                    cursor.execute(f"ALTER TABLE price_history REORGANIZE PARTITION pmax INTO "
+                                   f"({definitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+                dropped = expired_partitions(existing, date.today(), retention_months)
+                if dropped:
+                    cursor.execute(f"ALTER TABLE price_history DROP PARTITION {', '.join(dropped)}")
+        except pymysql.Error as e:
+            print(f"Error maintaining price history partitions: {e}")
+            raise
+        return {'added': [name for name, _ in added], 'dropped': dropped}
+    
+    def _record_prices(self, cursor, prices):
+        """Append a snapshot per (card_id, price) and fold the prices into the
+        hourly and daily rollups, inside the caller's transaction
+        """
+        if not prices:
+            return
+        recorded_at = datetime.utcnow()
+        cursor.executemany(
+            "INSERT INTO price_history (card_id, recorded_at, price_usd) VALUES (%s, %s, %s)"
+            " ON DUPLICATE KEY UPDATE price_usd = VALUES(price_usd)",
+            [(card_id, recorded_at, price) for card_id, price in prices]
+        )
+        # A cleared price is kept in the history but has nothing to summarize
+        rollups = [(card_id, granularity, start, price, price, price, price, price, 1)
+                   for card_id, price in prices if price is not None
+                   for granularity, start in rollup_keys(recorded_at)]
+        if rollups:
+            cursor.executemany(PRICE_ROLLUP_SQL, rollups)
+    
+    @timed('db')
     def create(self, data):
         """Create a new graphics card entry"""
         try:
-            with self.connection.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 sql = """
                     INSERT INTO graphics_cards 
                     (name, manufacturer, model, memory_gb, memory_type, core_clock_mhz, boost_clock_mhz, price_usd, release_date)
@@ -106,65 +458,422 @@ class MySQLDatabase:
                     data.get('price_usd'),
                     data.get('release_date')
                 ))
-                self.connection.commit()
-                return cursor.lastrowid
+                card_id = cursor.lastrowid
+                self._record_prices(cursor, [(card_id, data.get('price_usd'))])
+                conn.commit()
+                self._bump_generation()
+                return card_id
         except pymysql.Error as e:
             print(f"Error creating record: {e}")
             raise
     
-    def read_all(self, filters=None):
+    @timed('db')
+    def create_many(self, cards, batch_size=None):
+        """Create many graphics card entries in a single transaction.
+        Each card is typed and checked first (coerce_card, _column_error), so a
+        bad one is reported on its own; the valid cards are written with
+        multi-row INSERT statements of at most batch_size rows. Returns one
+        result per input card, in order:
+        {'index': i, 'id': new_id} or {'index': i, 'error': message}
+        """
+        batch_size = max(1, int(batch_size or BULK_BATCH_SIZE))
+        results = [None] * len(cards)
+        valid = []
+        rows = []
+        positions = []
+        for index, data in enumerate(cards):
+            card, error = coerce_card(data)
+            error = error or _column_error(card)
+            if error:
+                results[index] = {'index': index, 'error': error}
+                continue
+            valid.append(card)
+            rows.append(tuple(card[column] for column in INSERT_COLUMNS))
+            positions.append(index)
+        if not rows:
+            return results
+        
+        placeholders = "(" + ", ".join(["%s"] * len(INSERT_COLUMNS)) + ")"
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                # A multi-row INSERT reserves a consecutive block of ids starting
+                # at LAST_INSERT_ID(), stepped by auto_increment_increment
+                cursor.execute("SELECT @@auto_increment_increment AS step")
+                step = int(cursor.fetchone()['step'])
+                conn.begin()
+                for start in range(0, len(rows), batch_size):
+                    chunk = rows[start:start + batch_size]
+                    sql = (
+                        f"INSERT INTO graphics_cards ({', '.join(INSERT_COLUMNS)}) VALUES "
+                        + ", ".join([placeholders] * len(chunk))
+                    )
+                    cursor.execute(sql, [value for row in chunk for value in row])
+                    first_id = cursor.lastrowid
+                    for offset, index in enumerate(positions[start:start + batch_size]):
+                        results[index] = {'index': index, 'id': first_id + offset * step}
+                # Each card's history starts with its initial price
+                self._record_prices(cursor, [(results[index]['id'], card['price_usd'])
+                                             for index, card in zip(positions, valid)])
+                conn.commit()
+            self._bump_generation()
+            return results
+        except pymysql.Error as e:
+            print(f"Error creating records: {e}")
+            raise
+    
+    def _bump_generation(self):
+        """Record that the table changed"""
+        with self._generation_lock:
+            self.generation += 1
+        if self.replicas:
+            self.replicas.note_write()
+    
+    def _read(self, query, versioned=False):
+        """Run query(cursor) on a replica when one should serve the read,
+        otherwise on the primary. A replica failing at the connection level is
+        marked unhealthy and the read is retried on the primary.
+        versioned: on a replica, run the query in one snapshot with VERSION_SQL
+        and remember the version it saw, for replica_behind()
+        """
+        replica = self.replicas.choose() if self.replicas else None
+        if replica is not None:
+            start = time.perf_counter()
+            try:
+                with replica.pool.connection() as conn, conn.cursor() as cursor:
+                    if not versioned:
+                        result = query(cursor)
+                    else:
+                        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+                        cursor.execute(VERSION_SQL)
+                        seen = self._data_version(cursor.fetchone())
+                        result = query(cursor)
+                        conn.commit()
+                        note_replica_version(seen)
+            except REPLICA_ERRORS as e:
+                self.replicas.mark_down(replica, e)
+            else:
+                self.replicas.record(replica, time.perf_counter() - start)
+                return result
+        if versioned:
+            note_replica_version(None)
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            return query(cursor)
+    
+    def replica_behind(self, version):
+        """Whether this context's last listing or facets read came from a
+        replica at another data version than `version` (from version()), so
+        its result must not be cached under it
+        """
+        seen = replica_version()
+        return seen is not None and seen != version.split(':', 1)[1]
+    
+    @staticmethod
+    def _data_version(row):
+        return f"{row['last_id']}:{row['latest']}:{row['last_deleted']}"
+    
+    @timed('db')
+    def version(self):
+        """Cheap token that changes whenever graphics_cards changes.
+        Combines the write generation (writes through this process) with the
+        highest id (inserts), latest updated_at (updates, to the microsecond)
+        and latest tombstone (deletes) - writes from anywhere else. Each is
+        the end of an index, so no rows are scanned. Read on the primary and
+        reused for ETAG_VERSION_TTL seconds; see replica_behind() for
+        listings served by a replica.
+        """
+        generation = self.generation
+        cached = self._version
+        if cached and cached[0] == generation and time.monotonic() - cached[1] < self._setting('ETAG_VERSION_TTL'):
+            return cached[2]
+        
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(VERSION_SQL)
+                row = cursor.fetchone()
+        except pymysql.Error as e:
+            print(f"Error reading table version: {e}")
+            raise
+        token = f"{generation}:{self._data_version(row)}"
+        self._version = (generation, time.monotonic(), token)
+        return token
+    
+    def _build_where(self, filters):
+        """Translate a filters dict into a WHERE clause and its parameters.
+        Returns (where_sql, values, relevance_query); relevance_query is the
+        boolean-mode string for RELEVANCE_SQL when the search uses the
+        full-text index, otherwise None.
+        """
+        sql = " WHERE 1=1"
+        values = []
+        relevance_query = None
+        if filters:
+            if fulltext_search(filters):
+                relevance_query = mysql_boolean_query(search_words(filters['search']))
+                sql += f" AND {RELEVANCE_SQL}"
+                values.append(relevance_query)
+            elif filters.get('search'):
+                # Short terms are not in the full-text index (see text_search)
+                for term in substring_terms(filters['search']):
+                    sql += " AND (name LIKE %s OR manufacturer LIKE %s OR model LIKE %s)"
+                    values.extend([like_pattern(term)] * 3)
+            if filters.get('manufacturer'):
+                sql += " AND manufacturer = %s"
+                values.append(filters['manufacturer'])
+            if filters.get('memory_type'):
+                sql += " AND memory_type = %s"
+                values.append(filters['memory_type'])
+            if filters.get('memory_min') is not None:
+                sql += " AND memory_gb >= %s"
+                values.append(int(filters['memory_min']))
+            if filters.get('memory_max') is not None:
+                sql += " AND memory_gb <= %s"
+                values.append(int(filters['memory_max']))
+            if filters.get('price_min') is not None:
+                sql += " AND (price_usd IS NULL OR price_usd >= %s)"
+                values.append(float(filters['price_min']))
+            if filters.get('price_max') is not None:
+                sql += " AND (price_usd IS NULL OR price_usd <= %s)"
+                values.append(float(filters['price_max']))
+        return sql, values, relevance_query
+    
+    def _column_list(self, fields):
+        """SELECT list for a projection (None selects every column), with
+        prices and dates converted to their JSON form by MySQL itself
+        """
+        return mysql_select_list(fields)
+    
+    def _select_sql(self, filters=None, limit=None, after_id=None, after_relevance=None,
+                    fields=None):
+        """Build the listing SELECT shared by read_all and iter_all"""
+        where, values, relevance_query = self._build_where(filters)
+        columns = self._column_list(fields)
+        order = " ORDER BY id DESC"
+        if relevance_query is not None:
+            columns += f", {RELEVANCE_SQL} AS relevance"
+            values.insert(0, relevance_query)
+            order = " ORDER BY relevance DESC, id DESC"
+        if after_id is not None:
+            if relevance_query is not None and after_relevance is not None:
+                where += f" AND ({RELEVANCE_SQL} < %s OR ({RELEVANCE_SQL} = %s AND id < %s))"
+                values.extend([relevance_query, float(after_relevance),
+                               relevance_query, float(after_relevance), int(after_id)])
+            else:
+                where += " AND id < %s"
+                values.append(int(after_id))
+        sql = f"SELECT {columns} FROM graphics_cards" + where + order
+        if limit is not None:
+            sql += " LIMIT %s"
+            values.append(int(limit))
+        return sql, values
+    
+    @timed('db')
+    def read_all(self, filters=None, limit=None, after_id=None, after_relevance=None,
+                 fields=None):
         """Read graphics cards with optional search and filters.
         filters: dict with optional keys: search, manufacturer, memory_type,
                  memory_min, memory_max, price_min, price_max
+        limit: maximum number of rows to return (None returns every match)
+        after_id: keyset cursor, only rows with id < after_id are returned
+        after_relevance: relevance of the cursor row for full-text searches,
+                 which are ordered by relevance (returned as 'relevance')
+        fields: columns to return, from card_schema.CARD_FIELDS (None for all)
         """
+        def query(cursor):
+            cursor.execute(sql, values or None)
+            return cursor.fetchall()
+        
+        if fulltext_search(filters) and after_id is not None and after_relevance is None:
+            # The cursor comes from a page of the substring fallback
+            filters = substring_search(filters)
+        sql, values = self._select_sql(filters, limit, after_id, after_relevance, fields)
         try:
-            with self.connection.cursor() as cursor:
-                sql = "SELECT * FROM graphics_cards WHERE 1=1"
-                values = []
-                if filters:
-                    if filters.get('search'):
-                        sql += " AND (name LIKE %s OR manufacturer LIKE %s OR model LIKE %s)"
-                        term = f"%{filters['search']}%"
-                        values.extend([term, term, term])
-                    if filters.get('manufacturer'):
-                        sql += " AND manufacturer = %s"
-                        values.append(filters['manufacturer'])
-                    if filters.get('memory_type'):
-                        sql += " AND memory_type = %s"
-                        values.append(filters['memory_type'])
-                    if filters.get('memory_min') is not None:
-                        sql += " AND memory_gb >= %s"
-                        values.append(int(filters['memory_min']))
-                    if filters.get('memory_max') is not None:
-                        sql += " AND memory_gb <= %s"
-                        values.append(int(filters['memory_max']))
-                    if filters.get('price_min') is not None:
-                        sql += " AND (price_usd IS NULL OR price_usd >= %s)"
-                        values.append(float(filters['price_min']))
-                    if filters.get('price_max') is not None:
-                        sql += " AND (price_usd IS NULL OR price_usd <= %s)"
-                        values.append(float(filters['price_max']))
-                sql += " ORDER BY id DESC"
-                cursor.execute(sql, values or None)
-                return cursor.fetchall()
+            rows = self._read(query, versioned=True)
+            if not rows and after_id is None and fulltext_search(filters):
+                sql, values = self._select_sql(substring_search(filters), limit, None, None, fields)
+                rows = self._read(query, versioned=True)
+            return rows
         except pymysql.Error as e:
             print(f"Error reading records: {e}")
             raise
     
-    def read_one(self, card_id):
+    @timed('db')
+    def read_by_ids(self, ids, filters=None, fields=None):
+        """Read the cards with the given ids that still match filters, newest
+        first (for listings selected by the columnar index)
+        """
+        if not ids:
+            return []
+        def query(cursor):
+            cursor.execute(sql, values)
+            return cursor.fetchall()
+        
+        where, values, _ = self._build_where(filters)
+        sql = (f"SELECT {self._column_list(fields)} FROM graphics_cards{where}"
+               f" AND id IN ({', '.join(['%s'] * len(ids))}) ORDER BY id DESC")
+        values.extend(int(card_id) for card_id in ids)
+        try:
+            return self._read(query, versioned=True)
+        except pymysql.Error as e:
+            print(f"Error reading records: {e}")
+            raise
+    
+    @timed('db')
+    def facets(self, filters=None):
+        """Grouped counts and price statistics for the cards matching filters.
+        Returns total, price min/max/avg, counts per manufacturer, memory type
+        and memory size, and counts per price band (see card_schema.PRICE_BANDS).
+        """
+        where, values, _ = self._build_where(filters)
+        bands = ', '.join(str(edge) for edge in PRICE_BANDS)
+        def query(cursor):
+            def grouped(expression):
+                cursor.execute(
+                    f"SELECT {expression} AS value, COUNT(*) AS count FROM graphics_cards"
+                    f"{where} GROUP BY value ORDER BY value",
+                    values or None
+                )
+                return cursor.fetchall()
+            
+            cursor.execute(
+                "SELECT COUNT(*) AS total, MIN(price_usd) AS min_price, MAX(price_usd) AS max_price,"
+                " AVG(price_usd) AS avg_price FROM graphics_cards" + where,
+                values or None
+            )
+            summary = cursor.fetchone()
+            # INTERVAL() gives the band index, or -1 for a NULL price
+            return (summary, grouped("manufacturer"), grouped("memory_type"),
+                    grouped("memory_gb"), grouped(f"INTERVAL(price_usd, {bands})"))
+        
+        try:
+            summary, manufacturers, memory_types, memory_sizes, band_rows = self._read(
+                query, versioned=True)
+        except pymysql.Error as e:
+            print(f"Error computing facets: {e}")
+            raise
+        if not summary['total'] and fulltext_search(filters):
+            # Count what the listing's substring fallback returns
+            return self.facets(substring_search(filters))
+        band_counts = {row['value']: row['count'] for row in band_rows}
+        return {
+            'total': summary['total'],
+            'price': {
+                'min': float(summary['min_price']) if summary['min_price'] is not None else None,
+                'max': float(summary['max_price']) if summary['max_price'] is not None else None,
+                'avg': round(float(summary['avg_price']), 2) if summary['avg_price'] is not None else None,
+                'unpriced': band_counts.pop(-1, 0),
+            },
+            'manufacturers': sorted(manufacturers, key=lambda row: -row['count']),
+            'memory_types': sorted(memory_types, key=lambda row: -row['count']),
+            'memory_gb': memory_sizes,
+            'price_bands': price_band_facets(band_counts),
+        }
+    
+    def iter_all(self, filters=None, limit=None, after_id=None, after_relevance=None,
+                 fields=None, batch_size=None):
+        """Yield the rows read_all would return without buffering the result set.
+        Rows come from an unbuffered server-side cursor, batch_size at a time,
+        so memory use does not depend on the number of matches.
+        """
+        if fulltext_search(filters) and after_id is not None and after_relevance is None:
+            filters = substring_search(filters)
+        rows = self._stream(filters, limit, after_id, after_relevance, fields, batch_size)
+        if after_id is not None or not fulltext_search(filters):
+            yield from rows
+            return
+        first = next(rows, None)
+        if first is None:
+            # Nothing in the full-text index: stream the substring fallback
+            yield from self._stream(substring_search(filters), limit, None, None, fields, batch_size)
+            return
+        yield first
+        yield from rows
+    
+    def _stream(self, filters, limit, after_id, after_relevance, fields, batch_size):
+        batch_size = max(1, int(batch_size or STREAM_BATCH_SIZE))
+        sql, values = self._select_sql(filters, limit, after_id, after_relevance, fields)
+        pool, conn = self._acquire_for_read()
+        finished = False
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute(sql, values or None)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            cursor.close()
+            finished = True
+        except pymysql.Error as e:
+            print(f"Error streaming records: {e}")
+            raise
+        finally:
+            # A stream abandoned midway leaves unread rows on the connection;
+            # closing it is cheaper than draining them
+            pool.release(conn, discard=not finished)
+    
+    def _acquire_for_read(self):
+        """(pool, connection) for a streamed read, preferring a healthy replica"""
+        replica = self.replicas.choose() if self.replicas else None
+        if replica is not None:
+            try:
+                return replica.pool, replica.pool.acquire()
+            except REPLICA_ERRORS as e:
+                self.replicas.mark_down(replica, e)
+        return self.pool, self.pool.acquire()
+    
+    @timed('db')
+    def read_one(self, card_id, fields=None):
         """Read a single graphics card by ID"""
+        def query(cursor):
+            cursor.execute(f"SELECT {columns} FROM graphics_cards WHERE id = %s", (card_id,))
+            return cursor.fetchone()
+        
+        columns = self._column_list(fields)
         try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM graphics_cards WHERE id = %s", (card_id,))
-                return cursor.fetchone()
+            return self._read(query)
         except pymysql.Error as e:
             print(f"Error reading record: {e}")
             raise
     
+    @timed('db')
+    def read_prices(self, card_id, start, end, bucket, limit):
+        """A card's prices from start (inclusive) to end (exclusive): raw
+        snapshots, or hourly/daily rollups for bucket 'hour'/'day'. Returns
+        (price in effect at start, at most limit + 1 rows in time order).
+        Raw reads are pruned to the partitions covering the range.
+        """
+        def query(cursor):
+            cursor.execute(
+                "SELECT price_usd FROM price_history WHERE card_id = %s AND recorded_at < %s"
+                " ORDER BY recorded_at DESC LIMIT 1", (card_id, start)
+            )
+            before = cursor.fetchone()
+            if bucket == 'raw':
+                cursor.execute(
+                    "SELECT recorded_at, price_usd FROM price_history"
+                    " WHERE card_id = %s AND recorded_at >= %s AND recorded_at < %s"
+                    " ORDER BY recorded_at LIMIT %s", (card_id, start, end, limit + 1)
+                )
+            else:
+                cursor.execute(
+                    "SELECT bucket_start, open_usd, close_usd, min_usd, max_usd, sum_usd, changes"
+                    " FROM price_rollups WHERE card_id = %s AND granularity = %s"
+                    " AND bucket_start >= %s AND bucket_start < %s"
+                    " ORDER BY bucket_start LIMIT %s", (card_id, bucket, start, end, limit + 1)
+                )
+            return (before['price_usd'] if before else None), cursor.fetchall()
+        
+        try:
+            return self._read(query)
+        except pymysql.Error as e:
+            print(f"Error reading price history: {e}")
+            raise
+    
+    @timed('db')
     def update(self, card_id, data):
         """Update a graphics card entry"""
         try:
-            with self.connection.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 # Build dynamic update query
                 fields = []
                 values = []
@@ -178,26 +887,197 @@ class MySQLDatabase:
                 
                 values.append(card_id)
                 sql = f"UPDATE graphics_cards SET {', '.join(fields)} WHERE id = %s"
+                pricing = data.get('price_usd') is not None
+                conn.begin()
+                if pricing:
+                    cursor.execute("SELECT price_usd FROM graphics_cards WHERE id = %s FOR UPDATE", (card_id,))
+                    before = cursor.fetchone()
                 cursor.execute(sql, values)
-                self.connection.commit()
-                return cursor.rowcount > 0
+                updated = cursor.rowcount > 0
+                if pricing and before:
+                    # Compare what was stored, after DECIMAL rounding
+                    cursor.execute("SELECT price_usd FROM graphics_cards WHERE id = %s", (card_id,))
+                    price = cursor.fetchone()['price_usd']
+                    if price != before['price_usd']:
+                        self._record_prices(cursor, [(card_id, price)])
+                conn.commit()
+                self._bump_generation()
+                return updated
         except pymysql.Error as e:
             print(f"Error updating record: {e}")
             raise
     
+    @timed('db')
+    def update_where(self, filters, changes, max_rows, dry_run=False):
+        """Apply `changes` (validated with card_schema.validate_changes) to every
+        card matching filters in one UPDATE. Nothing is changed if more than
+        max_rows cards match, or for a dry run.
+        Returns {'matched': n, 'affected': n, 'applied': bool}.
+        """
+        where, values, _ = self._build_where(filters)
+        assignments = ", ".join(f"{column} = %s" for column in changes)
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                conn.begin()
+                # Locks the matching rows so the count still holds for the UPDATE
+                locking = "" if dry_run else " FOR UPDATE"
+                cursor.execute(f"SELECT COUNT(*) AS matched FROM graphics_cards{where}{locking}", values)
+                matched = cursor.fetchone()['matched']
+                if dry_run or matched > max_rows:
+                    conn.rollback()
+                    return {'matched': matched, 'affected': 0, 'applied': False}
+                repriced = []
+                if 'price_usd' in changes:
+                    cursor.execute(f"SELECT id FROM graphics_cards{where}"
+                                   " AND NOT (price_usd <=> CAST(%s AS DECIMAL(10, 2)))",
+                                   values + [changes['price_usd']])
+                    repriced = [row['id'] for row in cursor.fetchall()]
+                cursor.execute(f"UPDATE graphics_cards SET {assignments}{where}",
+                               list(changes.values()) + values)
+                affected = cursor.rowcount
+                if repriced:
+                    cursor.execute("SELECT id, price_usd FROM graphics_cards WHERE id IN ("
+                                   + ", ".join(["%s"] * len(repriced)) + ")", repriced)
+                    self._record_prices(cursor, [(row['id'], row['price_usd']) for row in cursor.fetchall()])
+                conn.commit()
+            if affected:
+                self._bump_generation()
+            return {'matched': matched, 'affected': affected, 'applied': True}
+        except pymysql.Error as e:
+            print(f"Error updating records: {e}")
+            raise
+    
+    @timed('db')
+    def delete_where(self, filters, max_rows, dry_run=False):
+        """Delete every card matching filters in one DELETE, recording
+        tombstones for sync.py. Nothing is deleted if more than max_rows cards
+        match, or for a dry run. Returns {'matched', 'affected', 'applied'}.
+        """
+        where, values, _ = self._build_where(filters)
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                conn.begin()
+                locking = "" if dry_run else " FOR UPDATE"
+                cursor.execute(f"SELECT COUNT(*) AS matched FROM graphics_cards{where}{locking}", values)
+                matched = cursor.fetchone()['matched']
+                if dry_run or matched > max_rows:
+                    conn.rollback()
+                    return {'matched': matched, 'affected': 0, 'applied': False}
+                cursor.execute(f"REPLACE INTO graphics_cards_tombstones (id) SELECT id FROM graphics_cards{where}",
+                               values)
+                cursor.execute(f"DELETE FROM graphics_cards{where}", values)
+                affected = cursor.rowcount
+                conn.commit()
+            if affected:
+                self._bump_generation()
+            return {'matched': matched, 'affected': affected, 'applied': True}
+        except pymysql.Error as e:
+            print(f"Error deleting records: {e}")
+            raise
+    
+    @timed('db')
     def delete(self, card_id):
         """Delete a graphics card entry"""
         try:
-            with self.connection.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                conn.begin()
                 cursor.execute("DELETE FROM graphics_cards WHERE id = %s", (card_id,))
-                self.connection.commit()
-                return cursor.rowcount > 0
+                deleted = cursor.rowcount > 0
+                if deleted:
+                    cursor.execute("REPLACE INTO graphics_cards_tombstones (id) VALUES (%s)", (card_id,))
+                conn.commit()
+                self._bump_generation()
+                return deleted
         except pymysql.Error as e:
             print(f"Error deleting record: {e}")
             raise
     
+    def changed_since(self, updated_at=None, after_id=0, limit=None, fields=None):
+        """Rows changed after the (updated_at, id) position, in that order,
+        with their stored column types (for sync.py and the columnar index).
+        None starts from the beginning of the table; fields limits the
+        columns (from card_schema.CARD_FIELDS, None for all).
+        """
+        if fields is not None:
+            unknown = [field for field in fields if field not in CARD_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        sql = f"SELECT {', '.join(fields) if fields else '*'} FROM graphics_cards"
+        values = []
+        if updated_at is not None:
+            sql += " WHERE updated_at > %s OR (updated_at = %s AND id > %s)"
+            values.extend([updated_at, updated_at, int(after_id)])
+        # Served in order by idx_updated_at (which ends with the primary key)
+        sql += " ORDER BY updated_at, id LIMIT %s"
+        values.append(int(limit or BULK_BATCH_SIZE))
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(sql, values)
+                return cursor.fetchall()
+        except pymysql.Error as e:
+            print(f"Error reading changed records: {e}")
+            raise
+    
+    def deleted_since(self, deleted_at=None, after_id=0, limit=None):
+        """Tombstones recorded after the (deleted_at, id) position, in that order"""
+        sql = "SELECT id, deleted_at FROM graphics_cards_tombstones"
+        values = []
+        if deleted_at is not None:
+            sql += " WHERE deleted_at > %s OR (deleted_at = %s AND id > %s)"
+            values.extend([deleted_at, deleted_at, int(after_id)])
+        sql += " ORDER BY deleted_at, id LIMIT %s"
+        values.append(int(limit or BULK_BATCH_SIZE))
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(sql, values)
+                return cursor.fetchall()
+        except pymysql.Error as e:
+            print(f"Error reading tombstones: {e}")
+            raise
+    
+    def latest_change(self):
+        """Newest updated_at / deleted_at, to measure how far a sync lags"""
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT (SELECT MAX(updated_at) FROM graphics_cards) AS updated_at,
+                           (SELECT MAX(deleted_at) FROM graphics_cards_tombstones) AS deleted_at
+                """)
+                return cursor.fetchone()
+        except pymysql.Error as e:
+            print(f"Error reading latest change: {e}")
+            raise
+    
+    def prune_tombstones(self, before):
+        """Drop tombstones older than `before`; returns how many were removed"""
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute("DELETE FROM graphics_cards_tombstones WHERE deleted_at < %s", (before,))
+                conn.commit()
+                return cursor.rowcount
+        except pymysql.Error as e:
+            print(f"Error pruning tombstones: {e}")
+            raise
+    
+    def pool_stats(self):
+        """Connection pool usage (in use, waiting, wait-time histogram)"""
+        return self.pool.stats() if self.pool else None
+    
+    def replica_stats(self):
+        """Replica health, lag, latency and read counts, or None without replicas"""
+        if not self.replicas:
+            return None
+        stats = self.replicas.stats()
+        for replica, entry in zip(self.replicas.replicas, stats['replicas']):
+            entry['pool'] = replica.pool.stats()
+        return stats
+    
     def close(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
-            print("MySQL connection closed")
+        """Close all pooled database connections"""
+        if self.replicas:
+            self.replicas.stop()
+            for replica in self.replicas.replicas:
+                replica.pool.close()
+        if self.pool:
+            self.pool.close()
+            print("MySQL connection pool closed")
@@ -0,0 +1,289 @@
+"""
+Bounded, thread-safe connection pool for PyMySQL
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+
+# Upper bounds (milliseconds) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be borrowed within the timeout"""
+
+
+class ConnectionPool:
+    """Pool of PyMySQL connections shared by all request threads.
+
+    connect_func: callable returning a new open connection
+    min_size:     connections kept open even when idle
+    max_size:     hard cap on open connections (in use + idle)
+    timeout:      seconds a borrower waits for a free connection
+    max_idle:     seconds an idle connection is kept before being reaped
+    ping_interval: connections idle for longer than this are pinged
+                   (and reconnected if dead) before being handed out
+    """
+
+    def __init__(self, connect_func, min_size=1, max_size=10, timeout=10.0,
+                 max_idle=300.0, ping_interval=1.0, reap_interval=30.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect_func
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+        self.reap_interval = reap_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used_monotonic)
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._created = 0
+        self._discarded = 0
+        self._reaped = 0
+        self._reconnects = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_total_ms = 0.0
+
+        self._reaper = None
+        self._reaper_stop = threading.Event()
+
+    def fill(self):
+        """Open connections until min_size is reached"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    break
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created += 1
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+        self._start_reaper()
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, waiting up to `timeout` seconds for one to free up"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            conn = None
+            idle_for = 0.0
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"Timed out after {timeout:.1f}s waiting for a MySQL connection "
+                            f"(pool size {self.max_size}, in use {self._in_use})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    idle_for = time.monotonic() - last_used
+                else:
+                    self._size += 1
+                    create = True
+                self._in_use += 1
+
+            try:
+                if create:
+                    conn = self._connect()
+                    with self._cond:
+                        self._created += 1
+                elif idle_for > self.max_idle:
+                    # Stale connection: drop it and try again
+                    self._discard(conn)
+                    continue
+                elif idle_for >= self.ping_interval:
+                    self._check_alive(conn)
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._size -= 1
+                    self._cond.notify()
+                if conn is not None:
+                    self._close_quietly(conn)
+                raise
+
+            self._record_wait((time.monotonic() - start) * 1000.0)
+            return conn
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection; broken connections are closed instead"""
+        if not discard and not getattr(conn, 'open', False):
+            discard = True
+        if discard:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._in_use -= 1
+            if self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection for the duration of a `with` block.
+
+        Open transactions are rolled back if the block raises, and
+        connections that failed at the protocol level are not reused.
+        """
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def reap(self):
+        """Close connections idle for longer than max_idle, keeping min_size open"""
+        now = time.monotonic()
+        stale = []
+        with self._cond:
+            keep = deque()
+            while self._idle:
+                conn, last_used = self._idle.popleft()
+                if now - last_used > self.max_idle and self._size > self.min_size:
+                    self._size -= 1
+                    self._reaped += 1
+                    stale.append(conn)
+                else:
+                    keep.append((conn, last_used))
+            self._idle = keep
+            if stale:
+                self._cond.notify_all()
+        for conn in stale:
+            self._close_quietly(conn)
+        return len(stale)
+
+    def stats(self):
+        """Snapshot of pool usage for sizing decisions"""
+        with self._cond:
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(WAIT_BUCKETS_MS, self._wait_buckets):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets['+Inf'] = cumulative + self._wait_buckets[-1]
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'reaped': self._reaped,
+                'reconnects': self._reconnects,
+                'wait_ms': {
+                    'count': self._checkouts,
+                    'sum': round(self._wait_total_ms, 3),
+                    'buckets': buckets,
+                },
+            }
+
+    def close(self):
+        """Close idle connections and refuse further checkouts.
+        Connections still in use are closed when they are released.
+        """
+        self._reaper_stop.set()
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def _check_alive(self, conn):
+        """Ping the server, transparently reconnecting a dead connection"""
+        try:
+            conn.ping(reconnect=False)
+        except Exception:
+            conn.ping(reconnect=True)
+            with self._cond:
+                self._reconnects += 1
+
+    def _discard(self, conn):
+        with self._cond:
+            self._in_use -= 1
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    def _record_wait(self, wait_ms):
+        index = len(WAIT_BUCKETS_MS)
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                index = i
+                break
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total_ms += wait_ms
+            self._wait_buckets[index] += 1
+
+    def _start_reaper(self):
+        if self._reaper is not None or self.reap_interval <= 0:
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name='mysql-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._reaper_stop.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Error reaping idle MySQL connections: {e}")
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
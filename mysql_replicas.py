@@ -0,0 +1,249 @@
+"""
+Read replica routing for MySQLDatabase: replica choice, health and stickiness
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+import pymysql
+
+from mysql_pool import PoolTimeout
+
+STRATEGIES = ('round_robin', 'least_latency')
+
+# Weight of the newest sample in a replica's moving-average latency
+LATENCY_ALPHA = 0.2
+
+# Errors that mean the replica itself is unusable rather than the query
+REPLICA_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError, PoolTimeout)
+
+# Set per request: whether this context's reads must see its own recent writes
+_read_from_primary = ContextVar('read_from_primary', default=False)
+
+# Set per request: data version a replica served the last versioned read at
+# (None when the primary served it)
+_replica_version = ContextVar('replica_version', default=None)
+
+
+def read_from_primary(flag=True):
+    """Route the current request's reads to the primary (read-your-writes).
+    Called as each request starts, so it also forgets the last replica version.
+    """
+    _read_from_primary.set(flag)
+    _replica_version.set(None)
+
+
+def note_replica_version(version):
+    """Remember the data version the current context's last read was served at"""
+    _replica_version.set(version)
+
+
+def replica_version():
+    """Data version of the current context's last replica read, or None"""
+    return _replica_version.get()
+
+
+def parse_endpoints(spec, default_port=3306):
+    """[(host, port)] from a comma-separated 'host[:port]' list"""
+    endpoints = []
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        endpoints.append((host, int(port) if port else default_port))
+    return endpoints
+
+
+def replication_lag(cursor):
+    """Seconds the server trails its source, or None when it is not a replica.
+    A replica whose replication threads are stopped reports infinity.
+    """
+    for statement, column in (("SHOW REPLICA STATUS", 'Seconds_Behind_Source'),
+                              ("SHOW SLAVE STATUS", 'Seconds_Behind_Master')):
+        try:
+            cursor.execute(statement)
+        except pymysql.err.ProgrammingError:
+            # SHOW REPLICA STATUS needs MySQL 8.0.22+
+            continue
+        except pymysql.err.OperationalError as e:
+            if e.args and e.args[0] == 1227:
+                # No REPLICATION CLIENT privilege: lag is unknown, not a failure
+                return None
+            raise
+        row = cursor.fetchone()
+        if not row:
+            return None
+        lag = row.get(column)
+        return float('inf') if lag is None else float(lag)
+    return None
+
+
+class Replica:
+    """A replica endpoint with its own connection pool"""
+
+    def __init__(self, host, port, pool):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.name = f"{host}:{port}"
+        self.healthy = True
+        self.latency = None  # moving average, seconds
+        self.lag = None
+        self.reads = 0
+        self.failures = 0
+        self.last_error = None
+
+
+class ReplicaRouter:
+    """Chooses the replica for each read, or the primary when none should be used.
+
+    strategy:       'round_robin' or 'least_latency' (lowest moving-average latency)
+    sticky_seconds: how long after a write through this process replicas may
+                    still miss it (see settling()); reads of the writing request
+                    itself go to the primary
+    max_lag:        replicas further behind their source than this are skipped
+    check_interval: seconds between background health checks; replicas marked
+                    unhealthy are only used again after a check succeeds
+    """
+
+    def __init__(self, replicas, strategy='round_robin', sticky_seconds=5.0,
+                 max_lag=5.0, check_interval=5.0):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy '{strategy}' (use {' or '.join(STRATEGIES)})")
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next = 0
+        self._last_write = None
+        self._primary_reads = 0
+        self._checker = None
+        self._stop = threading.Event()
+
+    def note_write(self):
+        """Record a write: the rest of the writing request reads from the
+        primary (other clients are covered by their own mysql_wrote_at cookie)
+        """
+        self._last_write = time.monotonic()
+        _read_from_primary.set(True)
+
+    def settling(self):
+        """Whether a write through this process is recent enough that replica
+        reads may not include it yet (their results should not be cached)
+        """
+        last_write = self._last_write
+        return last_write is not None and time.monotonic() - last_write < self.sticky_seconds
+
+    def choose(self):
+        """Replica for the next read, or None to read from the primary"""
+        if _read_from_primary.get():
+            self._count_primary_read()
+            return None
+        with self._lock:
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            if not healthy:
+                self._primary_reads += 1
+                return None
+            if self.strategy == 'least_latency':
+                # Replicas without a sample yet go first so each gets measured
+                return min(healthy, key=lambda r: -1.0 if r.latency is None else r.latency)
+            replica = healthy[self._next % len(healthy)]
+            self._next += 1
+            return replica
+
+    def record(self, replica, seconds):
+        """Record a successful read and its duration"""
+        with self._lock:
+            replica.reads += 1
+            self._observe_latency(replica, seconds)
+
+    def mark_down(self, replica, error):
+        """Stop using a replica until a health check succeeds"""
+        with self._lock:
+            was_healthy = replica.healthy
+            replica.healthy = False
+            replica.failures += 1
+            replica.last_error = str(error)
+            # The read that failed is retried on the primary
+            self._primary_reads += 1
+        if was_healthy:
+            print(f"MySQL replica {replica.name} marked unhealthy, reading from the primary: {error}")
+
+    def check(self, replica):
+        """Ping a replica and read its replication lag; returns whether it is usable"""
+        start = time.perf_counter()
+        try:
+            with replica.pool.connection() as conn, conn.cursor() as cursor:
+                lag = replication_lag(cursor)
+        except Exception as e:
+            with self._lock:
+                was_healthy = replica.healthy
+                replica.healthy = False
+                replica.last_error = str(e)
+            if was_healthy:
+                print(f"MySQL replica {replica.name} failed its health check: {e}")
+            return False
+        healthy = lag is None or lag <= self.max_lag
+        with self._lock:
+            was_healthy = replica.healthy
+            replica.lag = lag
+            replica.healthy = healthy
+            replica.last_error = None if healthy else f"replication lag {lag}s exceeds {self.max_lag}s"
+            self._observe_latency(replica, time.perf_counter() - start)
+        if healthy != was_healthy:
+            state = 'healthy again' if healthy else f"lagging ({lag}s), reading from the primary"
+            print(f"MySQL replica {replica.name} is {state}")
+        return healthy
+
+    def check_all(self):
+        for replica in self.replicas:
+            self.check(replica)
+
+    def start(self):
+        """Check every replica now, then keep checking in the background"""
+        self.check_all()
+        if self._checker is not None or self.check_interval <= 0 or not self.replicas:
+            return
+        self._checker = threading.Thread(target=self._check_loop, name='mysql-replica-check', daemon=True)
+        self._checker.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        """Per-replica health, lag, latency and read counts"""
+        with self._lock:
+            return {
+                'strategy': self.strategy,
+                'primary_reads': self._primary_reads,
+                'replicas': [{
+                    'name': replica.name,
+                    'healthy': replica.healthy,
+                    # Infinite lag (replication stopped) has no JSON form
+                    'lag_s': replica.lag if replica.lag != float('inf') else None,
+                    'latency_ms': round(replica.latency * 1000, 3) if replica.latency is not None else None,
+                    'reads': replica.reads,
+                    'failures': replica.failures,
+                    'last_error': replica.last_error,
+                } for replica in self.replicas],
+            }
+
+    def _count_primary_read(self):
+        with self._lock:
+            self._primary_reads += 1
+
+    def _observe_latency(self, replica, seconds):
+        if replica.latency is None:
+            replica.latency = seconds
+        else:
+            replica.latency += LATENCY_ALPHA * (seconds - replica.latency)
+
+    def _check_loop(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check_all()
+            except Exception as e:
+                print(f"Error checking MySQL replicas: {e}")
@@ -0,0 +1,150 @@
+"""
+Price history: range/bucket parsing, rollup buckets and MySQL month partitions
+
+Run it (e.g. monthly from cron) to add upcoming MySQL partitions and drop
+expired ones:
+    python price_history.py [--ahead 12] [--retention-months 0]
+"""
+import argparse
+import re
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from config import PRICE_HISTORY_PARTITIONS_AHEAD, PRICE_HISTORY_RETENTION_MONTHS
+
+# Rollup granularities kept by both backends, finest first
+GRANULARITIES = ('hour', 'day')
+BUCKETS = ('auto', 'raw') + GRANULARITIES
+
+# bucket=auto: raw snapshots for ranges up to AUTO_RAW_MAX, hourly rollups up
+# to AUTO_HOURLY_MAX, daily rollups beyond
+AUTO_RAW_MAX = timedelta(days=2)
+AUTO_HOURLY_MAX = timedelta(days=90)
+
+# Range returned when ?from= is not given
+DEFAULT_RANGE = timedelta(days=30)
+
+# Monthly MySQL partitions are named p<YYYYMM>; pmax catches anything later
+PARTITION_NAME = re.compile(r'^p(\d{4})(\d{2})$')
+
+
+def bucket_start(moment, granularity):
+    """Start of the hour/day bucket holding `moment`"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _parse_moment(value, name):
+    """UTC naive datetime from an ISO date or date-time (offsets converted to UTC)"""
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or date-time") from None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def parse_price_query(args, now=None):
+    """(start, end, bucket) for a price history request from ?from=&to=&bucket=.
+    `to` defaults to now and `from` to DEFAULT_RANGE before it; bucket 'auto'
+    picks raw, hour or day from the range length. Rollup ranges are widened
+    to whole buckets. Raises ValueError for invalid values.
+    """
+    end = _parse_moment(args['to'], 'to') if args.get('to') else (now or datetime.utcnow())
+    start = _parse_moment(args['from'], 'from') if args.get('from') else end - DEFAULT_RANGE
+    if start >= end:
+        raise ValueError('from must be before to')
+    bucket = args.get('bucket') or 'auto'
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    if bucket == 'auto':
+        span = end - start
+        bucket = 'raw' if span <= AUTO_RAW_MAX else 'hour' if span <= AUTO_HOURLY_MAX else 'day'
+    if bucket != 'raw':
+        start = bucket_start(start, bucket)
+    return start, end, bucket
+
+
+def rollup_keys(recorded_at):
+    """[(granularity, bucket start)] a snapshot taken at recorded_at is folded into"""
+    return [(granularity, bucket_start(recorded_at, granularity)) for granularity in GRANULARITIES]
+
+
+def _price(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def history_result(start_price, rows, bucket, limit):
+    """Response data of a price history query. rows are raw snapshots
+    (recorded_at, price_usd) or rollups (bucket_start, open_usd, close_usd,
+    min_usd, max_usd, sum_usd, changes), at most limit + 1 of them.
+    """
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+    if bucket == 'raw':
+        points = [{'at': row['recorded_at'], 'price_usd': _price(row['price_usd'])} for row in rows]
+    else:
+        points = [{
+            'at': row['bucket_start'],
+            'open': _price(row['open_usd']),
+            'close': _price(row['close_usd']),
+            'min': _price(row['min_usd']),
+            'max': _price(row['max_usd']),
+            'avg': round(float(row['sum_usd']) / row['changes'], 2),
+            'changes': row['changes'],
+        } for row in rows]
+    # The price in effect when the range starts, carried into it
+    return {'start_price': _price(start_price), 'points': points, 'truncated': truncated}
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partitions(today, ahead):
+    """[(name, exclusive upper bound)] of the monthly partitions from today's
+    month through `ahead` months later
+    """
+    first = today.replace(day=1)
+    return [(f"p{month:%Y%m}", _add_months(month, 1))
+            for month in (_add_months(first, offset) for offset in range(ahead + 1))]
+
+
+def expired_partitions(names, today, retention_months):
+    """Monthly partitions whose every row is older than retention_months
+    (0 keeps everything)
+    """
+    if retention_months <= 0:
+        return []
+    cutoff = _add_months(today.replace(day=1), -retention_months)
+    expired = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match and _add_months(date(int(match.group(1)), int(match.group(2)), 1), 1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add upcoming price history partitions and drop expired ones')
+    parser.add_argument('--ahead', type=int, default=PRICE_HISTORY_PARTITIONS_AHEAD,
+                        help='months of partitions to create ahead of the current one')
+    parser.add_argument('--retention-months', type=int, default=PRICE_HISTORY_RETENTION_MONTHS,
+                        help='drop raw snapshots older than this many months (0 keeps them)')
+    args = parser.parse_args()
+
+    from mysql_db import MySQLDatabase
+    mysql_db = MySQLDatabase()
+    try:
+        result = mysql_db.maintain_price_partitions(args.ahead, args.retention_months)
+    finally:
+        mysql_db.close()
+    print(f"[OK] Partitions added: {', '.join(result['added']) or 'none'}; "
+          f"dropped: {', '.join(result['dropped']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
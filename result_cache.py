@@ -0,0 +1,139 @@
+"""
+In-process LRU/TTL cache for card listing results
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Bounded cache of read_all results, partitioned by backend.
+
+    Every entry remembers the backend write generation it was computed at.
+    Backends bump their generation on create/update/delete, so an entry is
+    only ever served while the data it was built from is unchanged; the
+    first lookup that sees a newer generation drops the backend's entries.
+
+    max_entries: maximum number of cached results (0 disables the cache)
+    max_bytes:   approximate upper bound on the JSON size of cached results
+    ttl:         seconds an entry may be served for (0 for no expiry)
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (backend, key) -> (generation, expires, size, value)
+        self._generations = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(filters, *extra):
+        """Normalize a _parse_filters() dict (plus paging arguments) into a hashable key"""
+        items = []
+        for name, value in sorted((filters or {}).items()):
+            if name == 'search' and isinstance(value, str):
+                # Both backends match search terms case-insensitively
+                value = value.strip().lower()
+            elif isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+            items.append((name, value))
+        return (tuple(items),) + extra
+
+    def get(self, backend, generation, key):
+        """Return the cached value or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._observe_generation(backend, generation)
+            entry = self._entries.get((backend, key))
+            if entry is None:
+                self._misses += 1
+                return None
+            entry_generation, expires, size, value = entry
+            if entry_generation != generation:
+                self._remove((backend, key))
+                self._invalidations += 1
+                self._misses += 1
+                return None
+            if expires and expires < time.monotonic():
+                self._remove((backend, key))
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end((backend, key))
+            self._hits += 1
+            return value
+
+    def put(self, backend, generation, key, value, size):
+        """Cache `value`, computed while the backend was at `generation`.
+        size: bytes of its serialized response, which the caller already has
+        """
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            self._observe_generation(backend, generation)
+            if generation != self._generations[backend]:
+                # A write landed while this result was being computed
+                return
+            if (backend, key) in self._entries:
+                self._remove((backend, key))
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[(backend, key)] = (generation, expires, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate(self, backend=None):
+        """Drop every entry for one backend (or all backends)"""
+        with self._lock:
+            for cache_key in [k for k in self._entries if backend is None or k[0] == backend]:
+                self._remove(cache_key)
+                self._invalidations += 1
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else None,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+                'generations': dict(self._generations),
+            }
+
+    def _observe_generation(self, backend, generation):
+        # Caller holds the lock
+        current = self._generations.get(backend)
+        if current is None or generation > current:
+            self._generations[backend] = generation
+            if current is not None:
+                for cache_key in [k for k in self._entries if k[0] == backend]:
+                    self._remove(cache_key)
+                    self._invalidations += 1
+
+    def _remove(self, cache_key):
+        # Caller holds the lock
+        entry = self._entries.pop(cache_key)
+        self._bytes -= entry[2]
@@ -1,8 +1,10 @@
 """
-Script to seed sample graphics cards data into both MySQL and MongoDB databases
+Script to seed sample graphics cards data into MySQL and sync it to MongoDB
 """
 from mysql_db import MySQLDatabase
 from mongodb_db import MongoDBDatabase
+from importer import BulkImporter
+from sync import MySQLToMongoSync
 from datetime import date
 
 # Sample graphics cards data
@@ -76,36 +78,28 @@ sample_cards = [
 ]
 
 def seed_databases():
-    """Seed both MySQL and MongoDB with sample data"""
+    """Seed MySQL with sample data (in batches), then copy it to MongoDB with
+    one sync run, so each card has a single MongoDB document keyed by mysql_id
+    """
     mysql_db = MySQLDatabase()
     mongodb_db = MongoDBDatabase()
-    
-    print("\n=== Seeding MySQL Database ===")
-    mysql_count = 0
-    for card in sample_cards:
-        try:
-            mysql_db.create(card)
-            mysql_count += 1
-            print(f"✓ Added to MySQL: {card['name']}")
-        except Exception as e:
-            print(f"✗ Error adding {card['name']} to MySQL: {e}")
-    
-    print(f"\n=== Seeding MongoDB Database ===")
-    mongodb_count = 0
-    for card in sample_cards:
-        try:
-            mongodb_db.create(card.copy())
-            mongodb_count += 1
-            print(f"✓ Added to MongoDB: {card['name']}")
-        except Exception as e:
-            print(f"✗ Error adding {card['name']} to MongoDB: {e}")
-    
+
+    print("\n=== Seeding MySQL and MongoDB ===")
+    try:
+        report = BulkImporter({'mysql': mysql_db}).run(sample_cards)
+        synced = MySQLToMongoSync(mysql_db, mongodb_db).run_once()
+    finally:
+        mysql_db.close()
+        mongodb_db.close()
+
+    for error in report['errors']:
+        print(f"✗ Card {error['record']}: {error['error']}")
+    if 'error' in report:
+        print(f"✗ Error adding cards: {report['error']}")
+
     print(f"\n=== Summary ===")
-    print(f"MySQL: {mysql_count}/{len(sample_cards)} cards added")
-    print(f"MongoDB: {mongodb_count}/{len(sample_cards)} cards added")
-    
-    mysql_db.close()
-    mongodb_db.close()
+    print(f"MySQL: {report['written']['mysql']}/{len(sample_cards)} cards added")
+    print(f"MongoDB: {synced['rows_upserted']} cards synced from MySQL")
 
 if __name__ == '__main__':
     seed_databases()
@@ -0,0 +1,68 @@
+"""
+Shared JSON shaping for cards: database-side conversions and the JSON provider
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+from card_schema import CARD_FIELDS
+
+# MySQL SELECT expressions that return columns already in their JSON form,
+# so rows need no per-row conversion in Python. CAST(... AS CHAR) formats
+# dates as 'YYYY-MM-DD' and timestamps as 'YYYY-MM-DD HH:MM:SS'; adding a
+# float literal turns the DECIMAL price into a DOUBLE, read as a float.
+MYSQL_SHAPED_COLUMNS = {
+    'price_usd': "price_usd + 0e0 AS price_usd",
+    'release_date': "CAST(release_date AS CHAR) AS release_date",
+    'created_at': "CAST(created_at AS CHAR) AS created_at",
+    'updated_at': "CAST(updated_at AS CHAR) AS updated_at",
+}
+
+# Timestamps are stored as BSON dates; emitted as ISO 8601 with milliseconds
+MONGODB_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%L'
+MONGODB_DATE_FIELDS = ('created_at', 'updated_at')
+
+
+def mysql_select_list(fields=None):
+    """SELECT list returning `fields` (None for every column) in JSON form"""
+    fields = CARD_FIELDS if fields is None else fields
+    unknown = [field for field in fields if field not in CARD_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return ", ".join(MYSQL_SHAPED_COLUMNS.get(field, field) for field in fields)
+
+
+def mongodb_shape_stages(fields=None):
+    """Final aggregation stages turning stored documents into API cards:
+    _id becomes the string 'id' and timestamps become ISO strings.
+    fields: the projected card fields, or None for whole documents
+    """
+    shaped = {'id': {'$toString': '$_id'}}
+    for field in MONGODB_DATE_FIELDS:
+        if fields is None or field in fields:
+            shaped[field] = {'$dateToString': {
+                'date': f'${field}', 'format': MONGODB_DATE_FORMAT, 'onNull': '$$REMOVE'
+            }}
+    return [{'$addFields': shaped}, {'$project': {'_id': 0}}]
+
+
+def json_default(value):
+    """Encode the driver types that can still reach a response"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class CardJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes Decimal, dates and ObjectId directly
+    (Flask's default turns dates into HTTP date strings and Decimals into strings)
+    """
+    default = staticmethod(json_default)
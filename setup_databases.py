@@ -1,5 +1,9 @@
 """
-Setup script to create databases if they don't exist
+Setup script to create databases if they don't exist and migrate their schema.
+
+The migrations (MySQL tables and indexes, MongoDB indexes) record a schema
+version in each database; app workers only check that marker at startup, so
+run this before deploying a version that bumps SCHEMA_VERSION.
 """
 import pymysql
 from pymongo import MongoClient
@@ -7,6 +11,8 @@ from config import (
     MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE,
     MONGODB_HOST, MONGODB_PORT, MONGODB_DATABASE
 )
+import mysql_db
+import mongodb_db
 
 def setup_mysql():
     """Create MySQL database if it doesn't exist"""
@@ -55,13 +61,40 @@ def setup_mongodb():
         print(f"  Make sure MongoDB is running and accessible")
         return False
 
+def migrate(name, open_database, schema_version):
+    """Run a backend's migration unless its recorded schema version is current"""
+    try:
+        db = open_database()
+        try:
+            before = db.schema_version()
+            if before >= schema_version:
+                print(f"[OK] {name} schema already at version {before}")
+                return True
+            db.ensure_schema()
+            if db.schema_version() < schema_version:
+                print(f"[X] {name} schema migration to version {schema_version} failed")
+                return False
+            print(f"[OK] {name} schema migrated from version {before} to {schema_version}")
+            return True
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"[X] Error migrating {name} schema: {e}")
+        return False
+
 if __name__ == '__main__':
     print("=== Database Setup ===")
     print("\nSetting up MySQL...")
-    mysql_ok = setup_mysql()
+    mysql_ok = setup_mysql() and migrate(
+        'MySQL', lambda: mysql_db.MySQLDatabase(replicas=[], ensure_schema=False),
+        mysql_db.SCHEMA_VERSION
+    )
     
     print("\nSetting up MongoDB...")
-    mongodb_ok = setup_mongodb()
+    mongodb_ok = setup_mongodb() and migrate(
+        'MongoDB', lambda: mongodb_db.MongoDBDatabase(ensure_schema=False),
+        mongodb_db.SCHEMA_VERSION
+    )
     
     print("\n=== Setup Summary ===")
     if mysql_ok and mongodb_ok:
@@ -1,6 +1,8 @@
 let currentDb = 'mysql';
 let currentMode = 'create';
 let currentCardId = null;
+// Keyset cursor for the next page of each database tab (null when exhausted)
+const nextCursors = { mysql: null, mongodb: null };
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -73,9 +75,12 @@ function clearFilters(db) {
 async function loadCards(db) {
     const container = document.getElementById(`${db}-cards`);
     container.innerHTML = '<div class="loading">Loading cards...</div>';
+    nextCursors[db] = null;
+    updateLoadMore(db);
     
     const queryString = getFilters(db);
     const url = queryString ? `/api/${db}/cards?${queryString}` : `/api/${db}/cards`;
+    loadFacets(db, queryString);
     
     try {
         const response = await fetch(url);
@@ -83,6 +88,8 @@ async function loadCards(db) {
         
         if (result.success) {
             displayCards(db, result.data);
+            nextCursors[db] = result.next_cursor || null;
+            updateLoadMore(db);
         } else {
             container.innerHTML = `<div class="empty-state"><h3>Error</h3><p>${result.error}</p></div>`;
         }
@@ -91,6 +98,61 @@ async function loadCards(db) {
     }
 }
 
+// Load counts and price statistics for the current filters (computed server-side)
+async function loadFacets(db, queryString) {
+    const summary = document.getElementById(`${db}-facets`);
+    if (!summary) return;
+    
+    try {
+        const response = await fetch(`/api/${db}/cards/facets${queryString ? '?' + queryString : ''}`);
+        const result = await response.json();
+        if (!result.success) {
+            summary.textContent = '';
+            return;
+        }
+        const facets = result.data;
+        const parts = [`${facets.total} card${facets.total === 1 ? '' : 's'}`];
+        facets.manufacturers.forEach(item => parts.push(`${escapeHtml(item.value)}: ${item.count}`));
+        if (facets.price.avg !== null) {
+            parts.push(`$${facets.price.min.toFixed(2)} - $${facets.price.max.toFixed(2)} (avg $${facets.price.avg.toFixed(2)})`);
+        }
+        summary.innerHTML = parts.join(' &middot; ');
+    } catch (error) {
+        summary.textContent = '';
+    }
+}
+
+// Append the next page of cards using the cursor from the previous response
+async function loadMoreCards(db) {
+    const cursor = nextCursors[db];
+    if (!cursor) return;
+    
+    const params = new URLSearchParams(getFilters(db));
+    params.set('cursor', cursor);
+    
+    try {
+        const response = await fetch(`/api/${db}/cards?${params.toString()}`);
+        const result = await response.json();
+        
+        if (result.success) {
+            const container = document.getElementById(`${db}-cards`);
+            container.insertAdjacentHTML('beforeend', result.data.map(card => createCardHTML(db, card)).join(''));
+            nextCursors[db] = result.next_cursor || null;
+            updateLoadMore(db);
+        } else {
+            alert('Error: ' + result.error);
+        }
+    } catch (error) {
+        alert('Failed to load more cards: ' + error.message);
+    }
+}
+
+// Show the "Load more" button only while there are further pages
+function updateLoadMore(db) {
+    const button = document.getElementById(`${db}-load-more`);
+    if (button) button.style.display = nextCursors[db] ? '' : 'none';
+}
+
 // Display cards in grid
 function displayCards(db, cards) {
     const container = document.getElementById(`${db}-cards`);
@@ -0,0 +1,191 @@
+"""
+Incremental MySQL -> MongoDB synchronisation.
+
+Pulls graphics_cards rows changed since a persisted (updated_at, id) watermark
+in batches, upserts them into the MongoDB collection keyed by mysql_id, and
+applies deletes recorded in graphics_cards_tombstones. The watermarks and the
+statistics of the last run are stored in MongoDB's sync_state collection, so
+every run continues where the previous one stopped.
+
+Usage:
+    python sync.py             # one-shot: sync everything pending, then exit
+    python sync.py --loop      # keep syncing every SYNC_INTERVAL seconds
+    python sync.py --reset     # forget the watermarks (full resync)
+"""
+import argparse
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from config import (
+    SYNC_BATCH_SIZE, SYNC_INTERVAL, SYNC_OVERLAP_SECONDS, SYNC_TOMBSTONE_RETENTION_DAYS
+)
+from card_schema import INSERT_COLUMNS
+
+STATE_ID = 'mysql_to_mongodb'
+
+
+def to_document(row):
+    """MongoDB document for a MySQL row, in the shape the API stores cards"""
+    doc = {'mysql_id': row['id']}
+    for column in INSERT_COLUMNS + ('created_at', 'updated_at'):
+        value = row.get(column)
+        if isinstance(value, Decimal):
+            value = float(value)
+        elif isinstance(value, date) and not isinstance(value, datetime):
+            value = value.isoformat()
+        doc[column] = value
+    return doc
+
+
+def _seconds_behind(latest, watermark):
+    if latest is None or watermark is None:
+        return 0.0 if latest is None else None
+    return max(0.0, (latest - watermark).total_seconds())
+
+
+class MySQLToMongoSync:
+    """One-way sync of graphics_cards from a MySQLDatabase to a MongoDBDatabase"""
+
+    def __init__(self, mysql_db, mongodb_db, batch_size=SYNC_BATCH_SIZE,
+                 overlap_seconds=SYNC_OVERLAP_SECONDS):
+        self.mysql_db = mysql_db
+        self.mongodb_db = mongodb_db
+        self.batch_size = batch_size
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.state = mongodb_db.db['sync_state']
+
+    def load_state(self):
+        return self.state.find_one({'_id': STATE_ID}) or {'_id': STATE_ID}
+
+    def reset(self):
+        """Forget the watermarks so the next run copies every row"""
+        self.state.delete_one({'_id': STATE_ID})
+
+    def _save(self, fields):
+        self.state.update_one({'_id': STATE_ID}, {'$set': fields}, upsert=True)
+
+    def _start(self, watermark):
+        # Re-read a short window behind the watermark: upserts are idempotent
+        if not watermark or watermark.get('at') is None:
+            return None, 0
+        return watermark['at'] - self.overlap, 0
+
+    def sync_changes(self, state):
+        """Upsert every row changed since the watermark; returns rows applied"""
+        at, after_id = self._start(state.get('watermark'))
+        applied = 0
+        while True:
+            rows = self.mysql_db.changed_since(at, after_id, self.batch_size)
+            if not rows:
+                break
+            self.mongodb_db.upsert_synced([to_document(row) for row in rows])
+            applied += len(rows)
+            at, after_id = rows[-1]['updated_at'], rows[-1]['id']
+            state['watermark'] = {'at': at, 'id': after_id}
+            self._save({'watermark': state['watermark']})
+            if len(rows) < self.batch_size:
+                break
+        return applied
+
+    def sync_deletes(self, state):
+        """Apply tombstones recorded since the watermark; returns ids processed"""
+        at, after_id = self._start(state.get('tombstone_watermark'))
+        applied = 0
+        while True:
+            rows = self.mysql_db.deleted_since(at, after_id, self.batch_size)
+            if not rows:
+                break
+            self.mongodb_db.delete_synced([row['id'] for row in rows])
+            applied += len(rows)
+            at, after_id = rows[-1]['deleted_at'], rows[-1]['id']
+            state['tombstone_watermark'] = {'at': at, 'id': after_id}
+            self._save({'tombstone_watermark': state['tombstone_watermark']})
+            if len(rows) < self.batch_size:
+                break
+        if state.get('tombstone_watermark'):
+            # Tombstones well behind the watermark will never be read again
+            cutoff = state['tombstone_watermark']['at'] - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+            self.mysql_db.prune_tombstones(cutoff)
+        return applied
+
+    def run_once(self):
+        """Sync all pending changes and deletes; returns the run's statistics"""
+        start = time.perf_counter()
+        state = self.load_state()
+        upserted = self.sync_changes(state)
+        deleted = self.sync_deletes(state)
+        elapsed = time.perf_counter() - start
+        latest = self.mysql_db.latest_change() or {}
+        lags = [
+            _seconds_behind(latest.get('updated_at'), (state.get('watermark') or {}).get('at')),
+            _seconds_behind(latest.get('deleted_at'), (state.get('tombstone_watermark') or {}).get('at')),
+        ]
+        stats = {
+            'finished_at': datetime.utcnow(),
+            'rows_upserted': upserted,
+            'rows_deleted': deleted,
+            'elapsed_s': round(elapsed, 3),
+            'rows_per_s': round((upserted + deleted) / elapsed, 1) if elapsed else None,
+            'lag_s': None if None in lags else max(lags),
+        }
+        self._save({'last_run': stats})
+        return stats
+
+    def run_forever(self, interval=SYNC_INTERVAL, stop=None):
+        """Run a sync every `interval` seconds until `stop` (an Event) is set"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                stats = self.run_once()
+                if stats['rows_upserted'] or stats['rows_deleted']:
+                    print(_describe(stats))
+            except Exception as e:
+                print(f"Sync run failed: {e}")
+            stop.wait(interval)
+
+
+def sync_status(mongodb_db):
+    """Statistics of the last sync run, or None if no sync has run yet"""
+    state = mongodb_db.db['sync_state'].find_one({'_id': STATE_ID}, {'last_run': 1})
+    return (state or {}).get('last_run')
+
+
+def _describe(stats):
+    return (f"[OK] {stats['rows_upserted']} rows upserted, {stats['rows_deleted']} deletes applied "
+            f"in {stats['elapsed_s']}s ({stats['rows_per_s']} rows/s), lag {stats['lag_s']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--loop', action='store_true', help='keep syncing every --interval seconds')
+    parser.add_argument('--interval', type=float, default=SYNC_INTERVAL)
+    parser.add_argument('--batch-size', type=int, default=SYNC_BATCH_SIZE)
+    parser.add_argument('--reset', action='store_true', help='forget the watermarks first (full resync)')
+    args = parser.parse_args()
+
+    from mysql_db import MySQLDatabase
+    from mongodb_db import MongoDBDatabase
+    mysql_db = MySQLDatabase()
+    mongodb_db = MongoDBDatabase()
+    try:
+        sync = MySQLToMongoSync(mysql_db, mongodb_db, batch_size=args.batch_size)
+        if args.reset:
+            sync.reset()
+            print("Sync watermarks cleared")
+        if args.loop:
+            print(f"Syncing MySQL -> MongoDB every {args.interval:g}s (Ctrl+C to stop)...")
+            try:
+                sync.run_forever(args.interval)
+            except KeyboardInterrupt:
+                pass
+        else:
+            print(_describe(sync.run_once()))
+    finally:
+        mysql_db.close()
+        mongodb_db.close()
+
+
+if __name__ == '__main__':
+    main()
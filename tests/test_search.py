@@ -0,0 +1,54 @@
+"""
+Search matching on both backends, against the databases in config.py.
+
+    python -m unittest discover tests
+
+Skipped when a database is not reachable.
+"""
+import unittest
+import uuid
+
+from seed_data import sample_cards
+
+
+def _connect(backend):
+    try:
+        if backend == 'mysql':
+            from mysql_db import MySQLDatabase
+            return MySQLDatabase()
+        from mongodb_db import MongoDBDatabase
+        return MongoDBDatabase()
+    except Exception as e:
+        raise unittest.SkipTest(f"{backend} is not reachable: {e}")
+
+
+class PartialWordSearchTest(unittest.TestCase):
+    """A partial word finds the card on both backends, as a whole word does"""
+
+    def setUp(self):
+        # A word no other card contains, so only the test card can match it
+        self.word = f"zq{uuid.uuid4().hex[:10]}"
+        self.card = dict(sample_cards[0], name=f"{self.word.title()} Test Card", release_date=None)
+
+    def _check(self, backend):
+        db = _connect(backend)
+        card_id = db.create(dict(self.card))
+        try:
+            for term in (self.word, self.word[:6], f"{self.word[:5]} test"):
+                with self.subTest(backend=backend, search=term):
+                    cards = db.read_all({'search': term}, limit=10, fields=['id', 'name'])
+                    self.assertEqual([str(card['id']) for card in cards], [str(card_id)])
+                    self.assertEqual(db.facets({'search': term})['total'], 1)
+        finally:
+            db.delete(card_id)
+            db.close()
+
+    def test_mysql(self):
+        self._check('mysql')
+
+    def test_mongodb(self):
+        self._check('mongodb')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Search term handling shared by the MySQL and MongoDB full-text paths.
+
+Every word of a search is required. MySQL's full-text index matches each
+as a word prefix, MongoDB's $text as a whole word. When the index finds
+nothing - a partial word on MongoDB, a stopword on MySQL - or a word is too
+short to be indexed, both backends match every word as a substring instead.
+"""
+import re
+from config import SEARCH_MIN_TOKEN_LENGTH
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_words(term):
+    """Split a search term into lowercase words, dropping punctuation"""
+    return WORD_RE.findall((term or '').lower())
+
+
+def use_fulltext(words):
+    """Whether the full-text index can answer a search for `words`.
+
+    Words shorter than the index's minimum token length are never indexed
+    (innodb_ft_min_token_size defaults to 3), so such searches fall back to
+    substring matching.
+    """
+    return bool(words) and all(len(word) >= SEARCH_MIN_TOKEN_LENGTH for word in words)
+
+
+def fulltext_search(filters):
+    """Whether the search in `filters` goes to the full-text index"""
+    return bool(filters) and filters.get('search_mode') != 'substring' \
+        and use_fulltext(search_words(filters.get('search')))
+
+
+def substring_search(filters):
+    """Copy of `filters` whose search matches every word as a substring: the
+    fallback for a full-text search that found nothing
+    """
+    return dict(filters, search_mode='substring')
+
+
+def substring_terms(term):
+    """Terms the substring match requires: each word, or the whole term when
+    it has no word characters
+    """
+    return search_words(term) or [(term or '').strip()]
+
+
+def mysql_boolean_query(words):
+    """Boolean-mode AGAINST() string requiring every word, matched as a prefix"""
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def like_pattern(term):
+    """LIKE pattern matching `term` as a literal substring, as MongoDB's
+    escaped regex does
+    """
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def mongodb_text_query(words):
+    """$text search string requiring every word (each quoted as a phrase)"""
+    return ' '.join(f'"{word}"' for word in words)
@@ -0,0 +1,235 @@
+"""
+Group commit for single-card creates: queued cards are written in batches
+"""
+import copy
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metrics import Histogram
+
+WRITE_QUEUE_MODES = ('off', 'wait', 'async')
+
+# Upper bounds of the flush size histogram (cards per batch)
+FLUSH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class WriteQueueFull(Exception):
+    """Raised when a card cannot be queued because too many are waiting"""
+
+
+class WriteQueueUnavailable(Exception):
+    """Set on a queued card when its batch failed as a whole (e.g. the database
+    is unreachable), rather than because of the card itself
+    """
+
+
+class _Pending:
+    __slots__ = ('card', 'future', 'queued_at')
+
+    def __init__(self, card):
+        self.card = card
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class WriteQueue:
+    """Collects creates from concurrent requests and writes them together.
+
+    db:          backend with create_many(cards) and create(card)
+    max_batch:   most cards per flush
+    max_delay:   seconds a flush waits for more cards after the first one
+    max_pending: cards that may be queued; submit() raises WriteQueueFull beyond
+    status_entries: outcomes of tracked (async) creates kept for status()
+    data_errors: exceptions of create_many caused by the cards themselves
+
+    One background thread (started on first use) takes the first queued card,
+    keeps collecting until max_delay has passed or max_batch cards are in hand,
+    then writes them with one create_many call: a single transaction on MySQL,
+    one unordered insert_many on MongoDB. Every card gets its own result. If the
+    batch fails with one of data_errors (e.g. one card breaks a MySQL constraint
+    and rolls the transaction back), its cards are retried one by one so only
+    the offending card fails. Any other error (connection lost, pool timeout)
+    fails every card of the batch at once with WriteQueueUnavailable.
+    """
+
+    def __init__(self, name, db, max_batch=500, max_delay=0.005, max_pending=10000, status_entries=10000,
+                 data_errors=()):
+        self.name = name
+        self.db = db
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max(0.0, float(max_delay))
+        self.status_entries = max(0, int(status_entries))
+        self.data_errors = tuple(data_errors)
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        self._statuses = OrderedDict()  # ticket -> status dict
+        self._in_flight = 0
+        self._flush_sizes = Histogram(FLUSH_SIZE_BUCKETS)
+        self._flush_seconds = Histogram()
+        self._wait_seconds = Histogram()
+        self._written = 0
+        self._failed = 0
+        self._rejected = 0
+        self._fallbacks = 0
+
+    def submit(self, card):
+        """Queue a card; returns a Future resolving to its id (or raising its error)"""
+        pending = _Pending(card)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} write queue is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f'write-queue-{self.name}', daemon=True)
+                self._worker.start()
+            try:
+                self._queue.put_nowait(pending)
+            except queue.Full:
+                self._rejected += 1
+                raise WriteQueueFull(f"{self.name} write queue is full "
+                                     f"({self._queue.maxsize} cards waiting)") from None
+        return pending.future
+
+    def submit_tracked(self, card):
+        """Queue a card without waiting for it; returns a ticket for status()"""
+        future = self.submit(card)
+        ticket = uuid.uuid4().hex
+        with self._lock:
+            self._statuses[ticket] = {'status': 'queued'}
+            while len(self._statuses) > self.status_entries:
+                self._statuses.popitem(last=False)
+        future.add_done_callback(lambda done: self._record_status(ticket, done))
+        return ticket
+
+    def status(self, ticket):
+        """{'status': 'queued'|'created'|'failed', 'id'?, 'error'?} or None if unknown"""
+        with self._lock:
+            status = self._statuses.get(ticket)
+            return dict(status) if status is not None else None
+
+    def _record_status(self, ticket, future):
+        error = future.exception()
+        status = {'status': 'failed', 'error': str(error)} if error else {'status': 'created', 'id': future.result()}
+        with self._lock:
+            # Dropped already if more than status_entries creates came after it
+            if ticket in self._statuses:
+                self._statuses[ticket] = status
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Once the delay is up, still take whatever is already queued
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        with self._lock:
+            self._in_flight = len(batch)
+        cards = [pending.card for pending in batch]
+        try:
+            results = self.db.create_many(cards)
+        except self.data_errors as e:
+            print(f"Error writing {len(batch)} queued {self.name} cards, retrying one by one: {e}")
+            results = self._create_each(cards)
+            with self._lock:
+                self._fallbacks += 1
+        except Exception as e:
+            print(f"Error writing {len(batch)} queued {self.name} cards: {e}")
+            results = [{'index': index, 'error': str(e), 'unavailable': True} for index in range(len(cards))]
+        finished = time.perf_counter()
+        written = 0
+        for pending, result in zip(batch, results):
+            if result.get('unavailable'):
+                pending.future.set_exception(WriteQueueUnavailable(f"{self.name} is unavailable: {result['error']}"))
+            elif 'error' in result:
+                pending.future.set_exception(ValueError(result['error']))
+            else:
+                written += 1
+                pending.future.set_result(result['id'])
+        with self._lock:
+            self._in_flight = 0
+            self._written += written
+            self._failed += len(batch) - written
+            self._flush_sizes.observe(len(batch))
+            self._flush_seconds.observe(finished - start)
+            for pending in batch:
+                self._wait_seconds.observe(finished - pending.queued_at)
+
+    def _create_each(self, cards):
+        results = []
+        for index, card in enumerate(cards):
+            try:
+                results.append({'index': index, 'id': self.db.create(dict(card))})
+            except self.data_errors as e:
+                results.append({'index': index, 'error': str(e)})
+            except Exception as e:
+                # The database went away: fail the rest without trying each
+                results.extend({'index': rest, 'error': str(e), 'unavailable': True}
+                               for rest in range(index, len(cards)))
+                break
+        return results
+
+    def close(self, timeout=10.0):
+        """Write the cards still queued, then stop the worker. Gives up after
+        timeout seconds (e.g. the database is down) rather than hang shutdown.
+        """
+        with self._lock:
+            self._closed = True
+            worker = self._worker
+        if worker is None:
+            return
+        deadline = time.monotonic() + timeout
+        # The queue is bounded, so the stop marker may have to wait for the
+        # worker to make room; submit() refuses new cards from here on
+        while worker.is_alive():
+            try:
+                self._queue.put(None, timeout=max(0.0, min(0.1, deadline - time.monotonic())))
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    break
+        worker.join(max(0.0, deadline - time.monotonic()))
+        if worker.is_alive():
+            print(f"Error closing {self.name} write queue: {self._queue.qsize() + self._in_flight} "
+                  f"cards still unwritten after {timeout}s")
+
+    def stats(self):
+        """Queue depth, outcome counts and flush size / duration histograms"""
+        with self._lock:
+            return {
+                'depth': self._queue.qsize() + self._in_flight,
+                'capacity': self._queue.maxsize,
+                'written': self._written,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'fallbacks': self._fallbacks,
+                'flushes': self._flush_sizes.count,
+                'avg_flush_size': round(self._flush_sizes.sum / self._flush_sizes.count, 1)
+                if self._flush_sizes.count else None,
+                # Copies, so they can be rendered while flushes go on
+                'flush_size': copy.deepcopy(self._flush_sizes),
+                'flush_seconds': copy.deepcopy(self._flush_seconds),
+                'wait_seconds': copy.deepcopy(self._wait_seconds),
+            }
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Each worker process builds its own app (and with it its own connection pools)
+after the fork; see gunicorn.conf.py for worker/thread counts and shutdown.
+"""
+from app import create_app
+
+application = create_app()